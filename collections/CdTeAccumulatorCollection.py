@@ -0,0 +1,186 @@
+"""
+CdTe collection that accumulates spectrograms and lightcurves over time.
+"""
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTeHitList
+from FoGSE.telemetry_tools.collections.CdTeCollection import channel_bins, grid_histogram
+from FoGSE.telemetry_tools.collections.CdTeRateCollection import LIVETIME_CLOCK_INT
+
+class CdTeAccumulatorCollection:
+    """
+    A ring of time bins that CdTe data is added to as it is parsed.
+
+    Every time bin keeps a strip-by-ADC histogram, the number of hits
+    on each strip, the number of events and their livetime. New data
+    is only binned once, when it is added, and spectrograms or
+    lightcurves over any recent stretch of time are then sums of the
+    bins. Once the ring is full the oldest bin is reused so the memory
+    is fixed (~1 MB a bin).
+
+    Times come from the event frame `unixtime`. Padding in the parser
+    arrays is not counted.
+
+    Paramters
+    ---------
+    n_bins : `int`
+            The number of time bins kept.
+            Default: 60
+
+    bin_seconds : `int`
+            The width of each time bin in seconds.
+            Default: 1
+
+    cmn_sub : `bool`
+            Defines whether the histograms use the common mode
+            subtracted ADC values.
+            Default: True
+
+    Example
+    -------
+    accumulator = CdTeAccumulatorCollection(n_bins=300, bin_seconds=1)
+    # on every refresh
+    accumulator.add(decoder.feed_file())
+    counts = accumulator.spectrogram(last_seconds=30)
+    times, counts, livetime = accumulator.lightcurve(cadence=5)
+    """
+
+    def __init__(self, n_bins=60, bin_seconds=1, cmn_sub=True):
+        self.n_bins = n_bins
+        self.bin_seconds = bin_seconds
+        self.cmn_sub = cmn_sub
+
+        self.strip_bins, self.side_strip_bins, self.adc_bins = channel_bins()
+        n_strips, n_adc = len(self.strip_bins)-1, len(self.adc_bins)-1
+
+        # everything is allocated up front and reused
+        self.spectrograms = np.zeros((n_bins, n_strips, n_adc), dtype=np.uint32)
+        self.strip_counts = np.zeros((n_bins, n_strips), dtype=np.uint32)
+        self.event_counts = np.zeros(n_bins, dtype=np.uint32)
+        self.livetimes = np.zeros(n_bins, dtype=np.float64)
+
+        # the time bin (unixtime//bin_seconds) each slot holds, -1 if empty
+        self.bin_numbers = np.full(n_bins, -1, dtype=np.int64)
+
+        # events too old for the ring when they were added
+        self.dropped_events = 0
+
+    def add(self, parsed_data):
+        """
+        Bin new CdTe data.
+
+        Parameters
+        ----------
+        parsed_data : `tuple`, length 3
+                Contains `Flags`, `event_df`, `all_hkdicts` as returned
+                from the parser, `event_df` being padded or a
+                `CdTeHitList`.
+        """
+        _, event_dataframe, _ = parsed_data
+        if len(event_dataframe)==0:
+            return
+        hit_list = event_dataframe if isinstance(event_dataframe, CdTeHitList) else CdTeHitList.from_padded(event_dataframe)
+
+        event_bins = hit_list['unixtime'].astype(np.int64)//self.bin_seconds
+        self._claim_slots(np.unique(event_bins))
+        event_slots = event_bins%self.n_bins
+        kept = self.bin_numbers[event_slots]==event_bins
+        self.dropped_events += int(np.sum(~kept))
+
+        self.event_counts += np.bincount(event_slots[kept], minlength=self.n_bins).astype(np.uint32)
+        self.livetimes += np.bincount(event_slots[kept], weights=hit_list['livetime'][kept]*LIVETIME_CLOCK_INT, minlength=self.n_bins)
+
+        hits = hit_list.hits[kept[hit_list.hits['event_id']]]
+        hit_slots = event_slots[hits['event_id']]
+        strips = hits['strip']+(len(self.side_strip_bins)-1)*hits['side'].astype(np.int64)
+        adc = (hits['adc_cmn'] if self.cmn_sub else hits['adc']).astype(np.int64)
+
+        # histogram only the slots touched, not the whole ring
+        slots, slot_index = np.unique(hit_slots, return_inverse=True)
+        n_strips, n_adc = self.spectrograms.shape[1:]
+        self.strip_counts[slots] += grid_histogram((slot_index, strips), (len(slots), n_strips)).astype(np.uint32)
+        self.spectrograms[slots] += grid_histogram((slot_index, strips, adc), (len(slots), n_strips, n_adc)).astype(np.uint32)
+
+    def _claim_slots(self, time_bins):
+        """ Point the ring slots at new time bins, clearing what they held. """
+        for time_bin in time_bins:
+            slot = time_bin%self.n_bins
+            if self.bin_numbers[slot]<time_bin:
+                self.spectrograms[slot] = 0
+                self.strip_counts[slot] = 0
+                self.event_counts[slot] = 0
+                self.livetimes[slot] = 0
+                self.bin_numbers[slot] = time_bin
+
+    def _recent_slots(self, last_seconds=None):
+        """ 
+        Mask of the slots within `last_seconds` of the latest bin, and 
+        never older than the length of the ring (slots not reused 
+        after a gap in the data still hold old bins).
+        """
+        filled = self.bin_numbers>=0
+        if not np.any(filled):
+            return filled
+        n_bins = self.n_bins if last_seconds is None else min(self.n_bins, int(np.ceil(last_seconds/self.bin_seconds)))
+        return filled & (self.bin_numbers>np.max(self.bin_numbers)-n_bins)
+
+    def latest_unixtime(self):
+        """ The start of the latest time bin, `None` if nothing has been added. """
+        return int(np.max(self.bin_numbers))*self.bin_seconds if np.any(self.bin_numbers>=0) else None
+
+    def spectrogram(self, last_seconds=None):
+        """
+        The strip-by-ADC counts over recent time.
+
+        Parameters
+        ----------
+        last_seconds : `int`, `float`
+                Only the time bins this long before the latest, all if
+                `None`.
+                Default: None
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            The counts, as `CdTeCollection.spectrogram`.
+        """
+        return np.sum(self.spectrograms[self._recent_slots(last_seconds)], axis=0)
+
+    def lightcurve(self, cadence=None, strips=None, last_seconds=None):
+        """
+        The counts over time.
+
+        Parameters
+        ----------
+        cadence : `int`, `float`
+                Seconds per lightcurve bin, rounded to a whole number of
+                time bins. One time bin if `None`.
+                Default: None
+
+        strips : `list[int]`, `numpy.ndarray`
+                Count the hits on these strips (Pt: 0-127, Al: 128-255)
+                instead of the events.
+                Default: None
+
+        last_seconds : `int`, `float`
+                Only the time bins this long before the latest, all if
+                `None`.
+                Default: None
+
+        Returns
+        -------
+        `numpy.ndarray`, `numpy.ndarray`, `numpy.ndarray` :
+            The unixtime each lightcurve bin starts, the counts in it,
+            and the livetime (seconds) in it.
+        """
+        step = max(1, int(round(cadence/self.bin_seconds))) if cadence is not None else 1
+
+        slots = np.flatnonzero(self._recent_slots(last_seconds))
+        slots = slots[np.argsort(self.bin_numbers[slots])]
+        counts = self.event_counts[slots] if strips is None else np.sum(self.strip_counts[slots][:, strips], axis=1)
+
+        groups, group_index = np.unique(self.bin_numbers[slots]//step, return_inverse=True)
+        return (groups*step*self.bin_seconds,
+                np.bincount(group_index, weights=counts, minlength=len(groups)),
+                np.bincount(group_index, weights=self.livetimes[slots], minlength=len(groups)))
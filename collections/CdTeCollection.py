@@ -3,28 +3,29 @@ CdTe collection to handle the read-in CdTe data.
 """
 
 from copy import copy
+from functools import lru_cache
+import warnings
 
 import numpy as np
 import matplotlib.pyplot as plt
 
-try:
-    from FoGSE.utils import get_system_value
-    TI_CLOCK_INT = get_system_value("gse", "display_settings", "cdte", "pc", "collections", "ti_clock_interval")
-except ImportError:
-    print("ImportError, defaulting to `TI_CLOCK_INT = 160e-9`.")
-    TI_CLOCK_INT = 160e-9
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTeHitList
+from FoGSE.telemetry_tools.collections.CdTeRateCollection import CdTeRateCollection, TI_CLOCK_INT
 
-class CdTeCollection:
+class CdTeCollection(CdTeRateCollection):
     """
     A container for CdTe data after being parsed.
     
-    Can be used to generate spectrograms or images.
+    Can be used to generate spectrograms or images. The count rate and 
+    livetime methods come from `CdTeRateCollection`.
     
     Paramters
     ---------
     parsed_data : `tuple`, length 3
             Contains `Flags`, `event_df`, `all_hkdicts` as returned from 
-            the parser.
+            the parser. The compact event array (parser `compact=True`) 
+            is used as it is and a `CdTeHitList` (parser `sparse=True`) 
+            is filtered and histogrammed from its hits.
 
     old_data_time : `int`, `float`
             The last time of the last data point previously extracted and 
@@ -34,14 +35,33 @@ class CdTeCollection:
     bad_strips : `dict(\"pt\":list[int], \"al\":list[int])`
             A list of any bad strips for the Pt- and Al-side to be filtered out.
 
+    good_strips : `dict(\"pt\":list[int], \"al\":list[int])`
+            The strips of the Pt- (0-127) and Al-side (128-255) that can 
+            be counted, as read out, for detectors that need different 
+            strips than `CDTE_GOOD_STRIPS` (used if `None`).
+            Default: None
+
+    workspace : `CdTeWorkspace`
+            Scratch arrays to work in, pass the same one to the 
+            collection of every refresh so they are not allocated 
+            again. A new one is made if `None`.
+            Default: None
+
+    ti_anchor : `tuple(int, float)`
+            A 64-bit `ti` value and the unixtime it was at to pin the 
+            event timeline to, see `cdte_timeline`.
+            Default: None
+
+    adc_thresholds : `CdTeThresholdCollection`
+            Running ADC distributions for `single_event` to take the 
+            thresholds from (`style="running"`) instead of working them 
+            out from this data alone.
+            Default: None
+
     Example
     -------
     with readBackwards.BackwardsReader(file=directory+raw_file, blksize=20_000_000, forward=True) as f:
-        iterative_unpack=struct.iter_unpack("<I",f.read_block())
-        datalist=[]
-        for ndata,data in enumerate(iterative_unpack):
-            datalist.append(data[0])
-        Flags, event_df, all_hkdicts = CdTeparser.CdTerawalldata2parser(datalist)
+        Flags, event_df, all_hkdicts = CdTeparser.CdTerawalldata2parser(f.read_block())
         
     cdte_data = CdTeCollection((Flags, event_df, all_hkdicts))
     
@@ -54,22 +74,28 @@ class CdTeCollection:
     plt.show()
     """
     
-    def __init__(self, parsed_data, old_data_time=0, bad_strips=None):
+    def __init__(self, parsed_data, old_data_time=0, bad_strips=None, good_strips=None, workspace=None, ti_anchor=None, adc_thresholds=None):
         # bring in the parsed data
-        _, self.event_dataframe, _ = parsed_data
+        super().__init__(parsed_data, old_data_time=old_data_time, ti_anchor=ti_anchor)
+        self.workspace = workspace if workspace is not None else CdTeWorkspace()
+        self.adc_thresholds = adc_thresholds
         
         # define all the strip sizes in CdTe detectors
         self.strip_bins, self.side_strip_bins, self.adc_bins = self.channel_bins()
         
         # for easy remapping of channels
         self.channel_map = self.remap_strip_dict()
+        self.channel_lut = self.remap_strip_lut()
+
+        self.bad_pt_strips = list(self.channel_lut[bad_strips.get("pt", [])]) if bad_strips is not None else None
+        self.bad_al_strips = list(self.channel_lut[bad_strips.get("al", [])]) if bad_strips is not None else None
 
-        self.bad_pt_strips = [self.channel_map[p] for p in bad_strips.get("pt", None)] if bad_strips is not None else None
-        self.bad_al_strips = [self.channel_map[a] for a in bad_strips.get("al", None)] if bad_strips is not None else None
+        # which strips to count on each side, looked up by the parser strip index
+        self.good_strips = good_strips if good_strips is not None else CDTE_GOOD_STRIPS
+        self.strip_lut = self.good_strip_lut()
 
         # dont include data more than a second older than the previous frames latest data
         self.new_entries = self.event_dataframe['ti']>=0#old_data_time
-        self.latest_data_time = np.max(self.event_dataframe['ti'])
         # self.latest_data_time = np.max(self.event_dataframe['ti'][np.where(self.event_dataframe['unixtime']==self.latest_unixtime)])
         
         # filter the counts somehow, go for crude single strip right now
@@ -93,6 +119,8 @@ class CdTeCollection:
                 
         style : `str`
                 Sets the style to be used to obtain single count events.
+                "running" is "simple1" over all the data given to 
+                `adc_thresholds` so far.
                 Default: 'simple1'
 
         Returns
@@ -124,6 +152,10 @@ class CdTeCollection:
         elif style=="simple3":
             # same as oldest selection
             return self.get_pt_cmn(), self.get_al_cmn()
+        elif style=="running":
+            # "simple1" read from the running distributions, nothing to go through here
+            pt_min_adc, al_min_adc = self.adc_thresholds.thresholds(n_sigma=1, sides=True)
+            return pt_min_adc, al_min_adc
         else:
             return 0, 0
 
@@ -159,7 +191,7 @@ class CdTeCollection:
         pt_adc = event_dataframe['adc_cmn_pt'][new]
         al_adc = event_dataframe['adc_cmn_al'][new]
 
-        pt_min_adc, al_min_adc = self.single_event(pt_adc, al_adc, style="simple1")
+        pt_min_adc, al_min_adc = self.single_event(pt_adc, al_adc, style="simple1" if self.adc_thresholds is None else "running")
     
         pt_selection = ((pt<59) | (pt>68)) & (pt_adc>pt_min_adc) & (pt_adc<800)
         al_selection = ((al>131) & (al<252)) & (al_adc>al_min_adc) & (al_adc<800)
@@ -198,56 +230,284 @@ class CdTeCollection:
                     * "2" = double strip events
                     * "1and2" = single and double strip events
                     "max_adc" = max of each trigger is kept
+                    * "2sum", "1and2sum" = as "2" and "1and2" but with 
+                      the ADC values of the two strips of a double 
+                      summed (shared charge)
+                Any other grade raises a `ValueError`.
                 Defaults: "max_adc", "max_adc"
 
         Returns
         -------
         `dict`:
             Dictionary of the times, adc value, and strip number of all 
-            filtered data.
+            filtered data. With a summed grade, also the ADC weighted 
+            strip position ("pt_strip_positions" or 
+            "al_strip_positions", numbered as the strips) of each count.
         """
 
         new = self.new_entries #event_dataframe['ti']>self.last_data_time
         
         if np.all(~new):
-            return {'times':self.empty(), 
-                    'pt_strip_adc':self.empty(), 
-                    'al_strip_adc':self.empty(), 
-                    'pt_strips':self.empty(), 
-                    'al_strips':self.empty()}
+            counts = {'times':self.empty(), 
+                      'pt_strip_adc':self.empty(), 
+                      'al_strip_adc':self.empty(), 
+                      'pt_strips':self.empty(), 
+                      'al_strips':self.empty()}
+            for side, grade in (("pt", grade_pt), ("al", grade_al)):
+                if grade in CDTE_SUMMED_GRADES:
+                    counts[side+'_strip_positions'] = self.empty()
+            return counts
+        
+        return self.graded_counts(self.classify_counts(event_dataframe), grade_al=grade_al, grade_pt=grade_pt)
 
-        trig_times = event_dataframe['ti'][new]
+    def filter_counts_all_grades(self, event_dataframe, grades=None):
+        """
+        As `filter_counts_grades` for a number of grades at once, the 
+        events only being classified once (see `classify_counts`).
+
+        Paramters
+        ---------
+        event_dataframe : numpy structured array or `CdTeHitList`
+                The data returned from the parser.
+
+        grades : `list[str]`
+                The grades to filter to on both sides, all of 
+                `CDTE_GRADES` if `None`.
+                Default: None
+
+        Returns
+        -------
+        `dict`:
+            The `filter_counts_grades` dictionary for each grade.
+        """
+        grades = CDTE_GRADES if grades is None else grades
+
+        if np.all(~self.new_entries):
+            return {g:self.filter_counts_grades(event_dataframe, grade_al=g, grade_pt=g) for g in grades}
+
+        classified = self.classify_counts(event_dataframe)
+        return {g:self.graded_counts(classified, grade_al=g, grade_pt=g) for g in grades}
+
+    def classify_counts(self, event_dataframe):
+        """
+        Select the good strips on each side of every new event and 
+        classify the events with `classify_events`.
+
+        Paramters
+        ---------
+        event_dataframe : numpy structured array or `CdTeHitList`
+                The data returned from the parser.
+
+        Returns
+        -------
+        `dict`:
+            The event times, strips and ADC values on each side, and the 
+            `CDTE_EVENT_CLASS_DTYPE` classes of each side ("pt_classes" 
+            and "al_classes"), for `graded_counts`.
+        """
+        if isinstance(event_dataframe, CdTeHitList):
+            return self._classify_hits(event_dataframe)
+
+        # views of the events, not copies, if they are all new
+        new = slice(None) if np.all(self.new_entries) else self.new_entries
         pt = event_dataframe['index_pt'][new]
-        al = event_dataframe['index_al'][new]+128
+        al = event_dataframe['index_al'][new]
         pt_adc = event_dataframe['adc_cmn_pt'][new]
         al_adc = event_dataframe['adc_cmn_al'][new]
 
-        # get bad strip values, else return that there aren't any
-        bad_pt_indices = np.isin(pt, self.bad_pt_strips) if self.bad_pt_strips is not None else False
-        bad_al_indices = np.isin(al, self.bad_al_strips) if self.bad_al_strips is not None else False
-
+        # good strips that are not bad, the padding (strip 128) never is
         # for more filtering `pt_min_adc, al_min_adc = self.single_event(pt_adc, al_adc, style="simple1")`
-        pt_selection = ((pt<59) | (pt>68)) & ~bad_pt_indices #& (pt_adc>pt_min_adc) & (pt_adc<800)
-        al_selection = ((al>131) & (al<252)) & ~bad_al_indices #& (al_adc>al_min_adc) & (al_adc<800)
+        # (indexing only allocates the masks, `np.take` would make `intp` copies of the indices)
+        pt_selection = self.strip_lut[0][pt] #& (pt_adc>pt_min_adc) & (pt_adc<800)
+        al_selection = self.strip_lut[1][al] #& (al_adc>al_min_adc) & (al_adc<800)
+
+        return {'times':event_dataframe['ti'][new], 
+                'pt_strips':pt, 
+                'al_strips':al, 
+                'pt_strip_adc':pt_adc, 
+                'al_strip_adc':al_adc, 
+                'pt_classes':self.classify_events(pt_selection, pt, pt_adc), 
+                'al_classes':self.classify_events(al_selection, al, al_adc)}
+
+    def _classify_hits(self, hit_list):
+        """ 
+        `classify_counts` for a `CdTeHitList`, working on the hit 
+        table rather than the padded strip arrays. 
+        """
+        hits = hit_list.hits
+        event_ids = hits['event_id']
+        strips = hits['strip']
+
+        # good strips that are not bad, for both sides at once
+        good = self.strip_lut[hits['side'], strips]
+        if not np.all(self.new_entries):
+            good &= self.new_entries[event_ids]
+        pt_selection = good & (hits['side']==0)
+        al_selection = good & (hits['side']==1)
+
+        return {'times':hit_list['ti'], 
+                'pt_strips':hits['strip'], 
+                'al_strips':hits['strip'], 
+                'pt_strip_adc':hits['adc_cmn'], 
+                'al_strip_adc':hits['adc_cmn'], 
+                'pt_classes':self.classify_hits(pt_selection, event_ids, strips, hits['adc_cmn']), 
+                'al_classes':self.classify_hits(al_selection, event_ids, strips, hits['adc_cmn'])}
+
+    def graded_counts(self, classified, grade_al="max_adc", grade_pt="max_adc"):
+        """
+        The counts of a grade from the `classify_counts` output, only 
+        events with a count on both sides are kept.
 
-        # get matrices for Pt and Al that have a single True value for every readout
-        pt_selection_new = self.get_event_grade(event_selection=pt_selection, grade=grade_pt, data_indices=pt, data_adc=pt_adc)
-        al_selection_new = self.get_event_grade(event_selection=al_selection, grade=grade_al, data_indices=al, data_adc=al_adc)
+        Paramters
+        ---------
+        classified : `dict`
+                The output of `classify_counts`.
+
+        grade_al, grade_pt : `str`, `str
+                The grade for the Pt and Al side, one of `CDTE_GRADES` 
+                (see `filter_counts_grades`).
+                Defaults: "max_adc", "max_adc"
+
+        Returns
+        -------
+        `dict`:
+            As `filter_counts_grades`.
+        """
+        pt_slots = self.grade_slots(classified['pt_classes'], grade_pt)
+        al_slots = self.grade_slots(classified['al_classes'], grade_al)
 
         # find all triggers where Pt and Al have a count each
-        joint = (np.sum(pt_selection_new, axis=1) & np.sum(al_selection_new, axis=1)).astype(bool)
+        joint = (pt_slots>=0) & (al_slots>=0)
+        rows = np.flatnonzero(joint)
+
+        def _counts(values, slots, rows=rows):
+            """ The values at the count of every joint event. """
+            return values[rows, slots[rows]] if np.ndim(values)==2 else values[slots[rows]]
+
+        counts = {'times':classified['times'][joint], 
+                  'pt_strip_adc':_counts(classified['pt_strip_adc'], pt_slots), 
+                  'al_strip_adc':_counts(classified['al_strip_adc'], al_slots), 
+                  'pt_strips':_counts(classified['pt_strips'], pt_slots), 
+                  'al_strips':_counts(classified['al_strips'], al_slots)}
+
+        for side, grade in (("pt", grade_pt), ("al", grade_al)):
+            if grade not in CDTE_SUMMED_GRADES:
+                continue
+            # add in the other strip of the adjacent doubles, only the joint events are looked at
+            shared_slots = classified[side+'_classes']['shared']
+            shared = np.flatnonzero(shared_slots[rows]>=0)
+            adc = counts[side+'_strip_adc'].astype(np.int64)
+            positions = counts[side+'_strips'].astype(np.float64)
+            shared_adc = _counts(classified[side+'_strip_adc'], shared_slots, rows=rows[shared]).astype(np.int64)
+            shared_strips = _counts(classified[side+'_strips'], shared_slots, rows=rows[shared])
+
+            total = adc[shared]+shared_adc
+            weighted = total>0
+            positions[shared[weighted]] = (positions[shared]*adc[shared]+shared_strips*shared_adc)[weighted]/total[weighted]
+            adc[shared] = total
+            counts[side+'_strip_adc'] = adc
+            counts[side+'_strip_positions'] = positions
 
-        # look at the joint triggers on both sides and select the index for each to use as x and y coords
-        pt_strip = pt[joint][pt_selection_new[joint]]
-        al_strip = al[joint][al_selection_new[joint]]
-        pt_value = pt_adc[joint][pt_selection_new[joint]]
-        al_value = al_adc[joint][al_selection_new[joint]]
+        return counts
 
-        return {'times':trig_times[joint], 
-                'pt_strip_adc':pt_value, 
-                'al_strip_adc':al_value, 
-                'pt_strips':pt_strip, 
-                'al_strips':al_strip-128}
+    def classify_events(self, event_selection, data_indices, data_adc):
+        """ 
+        Classify every event (row) of the padded strip arrays from its 
+        selected strips in one pass, as `classify_entries` but working 
+        along the rows.
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            The `CDTE_EVENT_CLASS_DTYPE` class of every event, the 
+            counts being given as the column (slot) of the padded arrays.
+        """
+        classes = np.zeros(len(event_selection), dtype=CDTE_EVENT_CLASS_DTYPE)
+        for field in CDTE_EVENT_CLASS_SLOTS:
+            classes[field] = -1
+        if len(event_selection)==0:
+            return classes
+
+        multiplicity = np.sum(event_selection, axis=1)
+        classes['multiplicity'] = multiplicity
+        first = np.argmax(event_selection, axis=1)
+        classes['single'][multiplicity==1] = first[multiplicity==1]
+
+        # doubles are few so just look at their rows
+        doubles = np.flatnonzero(multiplicity==2)
+        pairs = np.nonzero(event_selection[doubles])[1].reshape(-1,2)
+        adjacent = abs(np.diff(data_indices[doubles[:,None], pairs].astype(np.int64), axis=1)[:,0])==1
+        classes['adjacent'][doubles] = adjacent
+        pair_adc = data_adc[doubles[:,None], pairs]
+        larger = pair_adc[:,0]>pair_adc[:,1]
+        classes['double'][doubles[adjacent]] = np.where(larger, pairs[:,0], pairs[:,1])[adjacent]
+        classes['shared'][doubles[adjacent]] = np.where(larger, pairs[:,1], pairs[:,0])[adjacent]
+
+        # ADC values on unselected strips count as 0 so events with none above 0 get no count
+        selected_adc = np.multiply(data_adc, event_selection, out=self.workspace.buffer("selected_adc", np.shape(data_adc), data_adc.dtype))
+        viable = np.sum(selected_adc, axis=1)>0
+        classes['max_adc'][viable] = np.argmax(selected_adc, axis=1)[viable]
+
+        return classes
+
+    def classify_hits(self, hit_selection, event_ids, data_indices, data_adc):
+        """ 
+        As `classify_events` but for the hits of a `CdTeHitList`, the 
+        counts being given as the index of the hit.
+        """
+        selected = np.flatnonzero(hit_selection)
+        classes = classify_entries(event_ids[selected], data_indices[selected], data_adc[selected], n_events=len(self.event_dataframe))
+        for field in CDTE_EVENT_CLASS_SLOTS:
+            found = classes[field]>=0
+            classes[field][found] = selected[classes[field][found]]
+        return classes
+
+    def grade_slots(self, classes, grade):
+        """ 
+        The slot of the count of every event for a grade, -1 for events 
+        without one.
+
+        Parameters
+        ----------
+        classes : `numpy.ndarray`
+                The output of `classify_events` or `classify_hits`.
+
+        grade : `str`
+                One of `CDTE_GRADES`:
+                    * "1" = single strip events
+                    * "2" = double strip events on adjacent strips, 
+                      counted on the strip with the larger ADC value
+                    * "1and2" = single and double strip events
+                    * "max_adc" = max of each trigger is kept
+                    * "2sum", "1and2sum" = as "2" and "1and2", the 
+                      other strip of a double being the `shared` slot
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            The slot of every event.
+        """
+        grade = CDTE_SUMMED_GRADES.get(grade, grade)
+        if grade=="1":
+            return np.where(classes['multiplicity']==1, classes['single'], -1)
+        if grade=="2":
+            return classes['double']
+        if grade=="1and2":
+            return np.where(classes['multiplicity']==1, classes['single'], classes['double'])
+        if grade=="max_adc":
+            return classes['max_adc']
+        raise ValueError(f"Grade {grade} is not one of {CDTE_GRADES}.")
+
+    def get_hit_grade(self, hit_selection, grade, event_ids, data_indices, data_adc):
+        """ 
+        As `get_event_grade` but for the hits of a `CdTeHitList`, the 
+        hits of an event being in the order of the padded array rows.
+        Returns a hit mask with at most one True for every event.
+        """
+        slots = self.grade_slots(self.classify_hits(hit_selection, event_ids, data_indices, data_adc), grade)
+        keep = np.zeros(len(hit_selection), dtype=bool)
+        keep[slots[slots>=0]] = True
+        return keep
 
     def get_event_grade(self, event_selection, grade, data_indices, data_adc):
         """ 
@@ -257,133 +517,41 @@ class CdTeCollection:
         * "2" = double strip events
         * "1and2" = single and double strip events
         * "max_adc" = max of each trigger is kept
+        Any other grade raises a `ValueError` (see `grade_slots`).
         """
-        selection = copy(event_selection)
-        # what times do we have events that are over the threshold and how many of these events at each time (i.e., True)
-        _times, _event_inds = np.where(selection==True)
-        times, counts = np.unique(_times, return_counts=True)
-
-        # can now get times for single event (an event records one True),
-        # can now get times for double events (an event records two Trues), etc.
-        single_times = times[np.where(counts==1)] # times with single counts
-        double_times = times[np.where(counts==2)] # times with double counts
-        more_times = times[np.where(counts>2)] # times with double counts
-
-        if grade=="1":
-            selection[double_times] = False
-            selection[more_times] = False
-        elif grade=="2":
-            selection[single_times] = False
-            selection[more_times] = False
-            selection = self.grade_2_handler(selection, double_times, data_indices, data_adc)
-            # another option is `selection = self.grade_2_handler_take_max_count_if_double(selection, double_times, data_adc)`
-        elif grade=="1and2":
-            selection[more_times] = False
-            selection = self.grade_2_handler(selection, double_times, data_indices, data_adc)
-            # another option is `selection = self.grade_2_handler_take_max_count_if_double(selection, double_times, data_adc)`
-        elif grade=="max_adc":
-            selection = self.grade_max_adc_handler(selection, data_adc)
-            
+        slots = self.grade_slots(self.classify_events(event_selection, data_indices, data_adc), grade)
+        
         # mask array will only have ONE True in a row if a count is determined to be there
+        selection = np.zeros(np.shape(event_selection), dtype=bool)
+        rows = np.flatnonzero(slots>=0)
+        selection[rows, slots[rows]] = True
         return selection
-    
-    def grade_max_adc_handler(self, selection, data_adc):
-        """ Just take the max ADC from every event as valid count. """
-        # copy the ADC value to avoid changing original
-        _data_adc = copy(data_adc)
-        
-        # any ADC value that is on a bad strip, set it to zero
-        _data_adc[selection==False] = 0
-
-        # find the rows which still have at least one ADC value in it
-        viable_rows = np.sum(_data_adc, axis=1)>0
-        
-        # only looking at the viable rows, find the index of each max ADC value
-        every_event_max = np.argmax(_data_adc[viable_rows,:], axis=1)
 
+    def grade_max_adc_handler(self, selection, data_adc):
+        """ Deprecated, use `get_event_grade` with grade "max_adc". """
+        warnings.warn("`grade_max_adc_handler` is deprecated, use `get_event_grade(selection, \"max_adc\", ...)`.", DeprecationWarning, stacklevel=2)
+        # the strips play no part in this grade
+        return self.get_event_grade(selection, "max_adc", np.zeros(np.shape(selection), dtype=np.int64), data_adc)
 
-        # make a selection array with all False entries
-        max_selection = np.zeros(np.shape(selection)).astype(bool)
-        
-        # now set the max ADC location to true for every viable row/trigger
-        max_selection[viable_rows,every_event_max] = True
-        
-        return max_selection 
-        
     def grade_2_handler(self, selection, double_times, data_indices, data_adc):
         """ 
-        If two strips have a valid ADC value for a single CdTe readout
-        and they are adjacent then just accept the maxmimum of the 
-        two as a real count. 
-        """
-        # select the above threshold array at times with double counts
-        double_selection = selection[double_times] 
-
-        # arrange double counts in pairs, always even (double counts) so arrange into pairs
-        pairs = data_indices[double_times][double_selection].reshape((-1,2)) 
-        # get difference in pairs is 1, else not adjacent strips 
-        adjacent = abs(np.diff(pairs))==1 
-
-        # flatten array and can now select "true" double times
-        true_double_times_inds = adjacent.flatten() 
-
-        # true double times, not just times with two random strips lit up
-        true_double_times = double_times[true_double_times_inds] 
-
-        # take out the false double times
-        false_double_times = double_times[~true_double_times_inds]
-        selection[false_double_times] = False
-
-        # get full rows of the over-threshold selection that have times of doube events
-        select_rows = selection[true_double_times]
-
-        # turn the minimum value off in the selection process
-        # in the future, might want to do something fancier but for now
-        # just putting the double count event into the strip with the highest value
-        _d_adc = data_adc[true_double_times][select_rows].reshape(-1,2) # adc values at the time and strip location 
-        turn_min_off = np.argmin(_d_adc, axis=1)
-
-        # find the indices of the real double events
-        row_time, true_event = np.where(select_rows==True)
-        # make sure they are easily indexed
-        _t, _e = row_time.reshape(-1,2), true_event.reshape(-1,2)
-        # set the minimum adc value to false
-        select_rows[_t[:,0], _e[:,0]+turn_min_off] = False
-        # set the changed rows to the selected ones
-        selection[true_double_times] = select_rows
-        
+        Deprecated, use `get_event_grade` with grade "2". Changes 
+        `selection` in place at the `double_times` rows only.
+        """
+        warnings.warn("`grade_2_handler` is deprecated, use `get_event_grade(selection, \"2\", ...)`.", DeprecationWarning, stacklevel=2)
+        selection[double_times] = self.get_event_grade(selection, "2", data_indices, data_adc)[double_times]
         return selection
-    
+
     def grade_2_handler_take_max_count_if_double(self, selection, double_times, data_adc):
         """ 
-        If two strips have a valid ADC value for a single CdTe readout
-        but they are not adjacent then just accept the maxmimum of the 
-        two as a real count. 
+        Deprecated, as `grade_2_handler` but the doubles do not need to 
+        be on adjacent strips.
         """
-
-        # true double times, not just times with two random strips lit up
-        true_double_times = double_times#[true_double_times_inds] 
-
-        # get full rows of the over-threshold selection that have times of doube events
-        select_rows = selection[true_double_times]
-
-        # turn the minimum value off in the selection process
-        # in the future, might want to do something fancier but for now
-        # just putting the double count event into the strip with the highest value
-        _d_adc = data_adc[true_double_times][select_rows].reshape(-1,2) # adc values at the time and strip location 
-        turn_min_off = np.argmin(_d_adc, axis=1)
-
-        # find the indices of the real double events
-        row_time, true_event = np.where(select_rows==True)
-        # make sure they are easily indexed
-        _t, _e = row_time.reshape(-1,2), true_event.reshape(-1,2)
-        # set the minimum adc value to false
-        select_rows[_t[:,0], _e[:,0]+turn_min_off] = False
-        # set the changed rows to the selected ones
-        selection[true_double_times] = select_rows
-        
+        warnings.warn("`grade_2_handler_take_max_count_if_double` is deprecated, use `get_event_grade(selection, \"2\", ...)`.", DeprecationWarning, stacklevel=2)
+        # numbering the selected strips along each row makes every double adjacent
+        selection[double_times] = self.get_event_grade(selection, "2", np.cumsum(selection, axis=1), data_adc)[double_times]
         return selection
-    
+
     def channel_bins(self):
         """ Define the strip and ADC bins. """
 
@@ -397,13 +565,7 @@ class CdTeCollection:
         E.g., the cmn are all 'per ASIC' (so 2 for Al for every event) 
         but want structure to give the common mode for each ADC value.
         """
-        asic0 = np.nonzero(self.event_dataframe['index_pt']<64)
-        asic1 = np.nonzero((self.event_dataframe['index_pt']>=64) & (self.event_dataframe['index_pt']<128))
-        common_modes = np.zeros(np.shape(self.event_dataframe['adc_cmn_pt']))
-        # now look at the asic common mode values and then extract the indices you need
-        common_modes[asic0] = self.event_dataframe['cmn_pt'][:,0][asic0[0]]
-        common_modes[asic1] = self.event_dataframe['cmn_pt'][:,1][asic1[0]]
-        return common_modes
+        return self._asic_common_modes(self.event_dataframe['index_pt'], self.event_dataframe['cmn_pt'])
     
     def get_al_cmn(self):
         """ 
@@ -413,12 +575,18 @@ class CdTeCollection:
         E.g., the cmn are all 'per ASIC' (so 2 for Al for every event) 
         but want structure to give the common mode for each ADC value.
         """
-        asic0 = np.nonzero(self.event_dataframe['index_al']<64)
-        asic1 = np.nonzero((self.event_dataframe['index_al']>=64) & (self.event_dataframe['index_al']<128))
-        common_modes = np.zeros(np.shape(self.event_dataframe['adc_cmn_al']))
-        common_modes[asic0] = self.event_dataframe['cmn_al'][:,0][asic0[0]]
-        common_modes[asic1] = self.event_dataframe['cmn_al'][:,1][asic1[0]]
-        return common_modes
+        return self._asic_common_modes(self.event_dataframe['index_al'], self.event_dataframe['cmn_al'])
+
+    def _asic_common_modes(self, indices, cmn):
+        """ 
+        The common mode of the ASIC (strips 0-63 and 64-127) of every 
+        strip, 0 for the padding. 
+        """
+        # the ASIC of each strip (2 for the padding), picking from the common modes with a 0 added on
+        asic = np.right_shift(indices, 6, out=self.workspace.buffer("asic", np.shape(indices), indices.dtype))
+        asic_cmn = np.zeros((len(cmn), 3), dtype=cmn.dtype)
+        asic_cmn[:,:2] = cmn
+        return np.take_along_axis(asic_cmn, asic, axis=1)
 
     def add_cmn(self, new_events_index):
         """ 
@@ -465,31 +633,35 @@ class CdTeCollection:
             self.adc_counts_arr, _, _ = np.zeros((len(self.strip_bins)-1, len(self.adc_bins)-1)), self.strip_bins, self.adc_bins
             return
 
-        pt_strips = np.ndarray.flatten(self.event_dataframe['index_pt'][new])
-        al_strips = np.ndarray.flatten(self.event_dataframe['index_al'][new])+128
-        all_strips = np.concatenate((pt_strips, al_strips))
-        
+        if isinstance(self.event_dataframe, CdTeHitList):
+            self.adc_counts_arr = self._hits_spectrogram(new, cmn_sub=cmn_sub)
+            return
+
+        # no copy of the events if they are all new
+        df = self.event_dataframe if np.all(new) else self.event_dataframe[new]
         if cmn_sub:
-            pt_adc = np.ndarray.flatten(self.event_dataframe['adc_cmn_pt'][new])
-            al_adc = np.ndarray.flatten(self.event_dataframe['adc_cmn_al'][new])
+            pt_adc, al_adc = df['adc_cmn_pt'], df['adc_cmn_al']
         else:
-            pt_adc = np.ndarray.flatten(self.event_dataframe['adc_pt'][new])
-            al_adc = np.ndarray.flatten(self.event_dataframe['adc_al'][new])
+            pt_adc, al_adc = df['adc_pt'], df['adc_al']
             # used to be:
             # pt_adc, al_adc = self.add_cmn(new)
-        all_adc = np.concatenate((pt_adc, al_adc))
 
-        #**********************************************************************
-        # ******** remove default strip values for quickness just now *********
-        # default_strip_inds = (all_strips==0) | (all_strips==64) | (all_strips==128) | (all_strips==192)
-        # all_strips = all_strips[~default_strip_inds]
-        # all_adc = all_adc[~default_strip_inds]
-        #**********************************************************************
-        
-        self.adc_counts_arr, _, _ = np.histogram2d(all_strips, all_adc, 
-                                                   bins=[self.strip_bins,
-                                                         self.adc_bins])
-        
+        # each side is binned on its own 128 strips so the padding (strip 128) falls off the grid
+        side_shape = (len(self.side_strip_bins)-1, len(self.adc_bins)-1)
+        self.adc_counts_arr = np.concatenate((grid_histogram((df['index_pt'], pt_adc), side_shape, workspace=self.workspace), 
+                                              grid_histogram((df['index_al'], al_adc), side_shape, workspace=self.workspace))).astype(np.float64)
+
+    def _hits_spectrogram(self, new, cmn_sub:bool=False):
+        """ `spectrogram` counts from the hits of a `CdTeHitList`. """
+        hits = self.event_dataframe.hits
+        if not np.all(new):
+            hits = hits[new[hits['event_id']]]
+        all_strips = hits['strip']+(len(self.side_strip_bins)-1)*hits['side'].astype(np.int64)
+        all_adc = hits['adc_cmn'] if cmn_sub else hits['adc']
+
+        counts = grid_histogram((all_strips, all_adc), (len(self.strip_bins)-1, len(self.adc_bins)-1), workspace=self.workspace)
+        return counts.astype(np.float64)
+
     def spectrogram_array(self, remap:bool=False, nan_zeros:bool=False, cmn_sub:bool=False):
         """
         Method to get the spectrogram array of the CdTe file.
@@ -592,12 +764,10 @@ class CdTeCollection:
             pt_strips, al_strips = self._remap_strip_values(pt_strips, al_strips)
         self.rstrips = (pt_strips, al_strips)
         
-        im, _, _ = np.histogram2d(pt_strips, 
-                                  al_strips, 
-                                  bins=[self.side_strip_bins,
-                                        self.side_strip_bins])
+        im = grid_histogram((pt_strips, al_strips), 
+                            (len(self.side_strip_bins)-1, len(self.side_strip_bins)-1))
         
-        return im
+        return im.astype(np.float64)
     
     def bad_strips_pt(self):
         """ Given a CdTe detector, return the noisy Pt-side strips"""
@@ -608,12 +778,10 @@ class CdTeCollection:
     
     def _remap_strip_values(self, pt_strips, al_strips):
         """ Remap the strip values to their physical location. """
-        rpt_strips, ral_strips = [],[]
-        for c in range(len(pt_strips)):
-            rpt_strips.append(self.channel_map[pt_strips[c]])
-            als = 0 if al_strips[c]==128 else al_strips[c] 
-            ral_strips.append(self.channel_map[als+128])
-        return np.array(rpt_strips), np.array(ral_strips)-128
+        # Al-side strip 128 (padding) is taken as strip 0, no strips (`empty`) come as floats
+        pt_strips = np.asarray(pt_strips, dtype=np.int64)
+        al_strips = np.asarray(al_strips, dtype=np.int64)%128
+        return self.channel_lut[pt_strips], self.channel_lut[al_strips+128]-128
     
     def _area_correction(self, image):
         """ 
@@ -684,6 +852,23 @@ class CdTeCollection:
         location. 
         """
         return CDTE_REMAP_DICT
+
+    def good_strip_lut(self):
+        """ 
+        The strips to count for the collection's good and bad strips 
+        (see `good_strip_lut`). 
+        """
+        return good_strip_lut(pt_strips=tuple(self.good_strips["pt"]), 
+                              al_strips=tuple(self.good_strips["al"]), 
+                              bad_pt_strips=tuple(self.bad_pt_strips) if self.bad_pt_strips is not None else (), 
+                              bad_al_strips=tuple(self.bad_al_strips) if self.bad_al_strips is not None else ())
+
+    def remap_strip_lut(self):
+        """ 
+        Define the array for remapping channels to their physical 
+        location (see `remap_strip_lut`). 
+        """
+        return CDTE_REMAP_LUT
     
     def reverse_rows(self, arr):
         """ Reverse the rows of a 2D numpy array. """
@@ -695,17 +880,8 @@ class CdTeCollection:
         if np.array_equal(counts, self.empty()):
             return self.empty()
         
-        asic0 = counts[:64,:]
-        asic1 = counts[64:128,:]
-        asic2 = counts[128:192,:]
-        asic3 = counts[192:,:]
-
-        asic0_rmap = self.reverse_rows(asic0)
-        asic1_rmap = self.reverse_rows(asic1)
-        asic2_rmap = self.reverse_rows(asic2)
-        asic3_rmap = self.reverse_rows(asic3)
-
-        return np.concatenate((asic0_rmap, asic1_rmap, asic3_rmap, asic2_rmap), axis=0)
+        # the remapped row r is the original row `channel_lut[r]`
+        return counts[self.channel_lut]
     
     def strip_edges(self):
         """ 
@@ -722,47 +898,6 @@ class CdTeCollection:
         """ From the pitch widths, get the strip-pixel areas. """
         return CDTE_PIXEL_AREAS_MICROMETRES
     
-    def total_counts(self):
-        """ Just return the present total counts for the collection. """
-        return len(self.event_dataframe)
-    
-    def mean_unixtime(self):
-        """ Get the mean unixtime of the frame. """
-        return np.median(self.event_dataframe['unixtime'])
-    
-    def delta_time(self, handle_jumps=False):
-        """ Get the delta-t of the frame. """
-        # not using_unixtime = (np.max(self.event_dataframe['unixtime'])-np.min(self.event_dataframe['unixtime'])) anymore
-        ti_clock_interval = TI_CLOCK_INT# 10.24e-6 # 10.24 usec -> 10.24 change in `ti`` every usec?`
-        if not handle_jumps:
-            _ti_time = np.max(self.event_dataframe['ti'])-np.min(self.event_dataframe['ti'])
-            return _ti_time*ti_clock_interval
-        
-        evt_ti = self.event_dataframe['ti'].astype(np.float64) # avoid overflow
-        _ti_time = evt_ti[-1]-evt_ti[0]
-        if ((_ti_time>-4e9) and (_ti_time<-2e8)) or ((_ti_time>2e8) and (_ti_time<4e9)):
-            hj_ti_time = np.nan
-        elif (_ti_time<-4e9) or (_ti_time>4e9):
-            #overflow, so add
-            _larger_value = np.max([evt_ti[-1], evt_ti[0]])
-            _before_overflow = 2**32 - _larger_value
-            hj_ti_time = _before_overflow + np.min([evt_ti[-1], evt_ti[0]])
-        else:
-            hj_ti_time = abs(_ti_time)
-
-        return hj_ti_time*ti_clock_interval
-
-        
-    def total_count_rate(self, frame_livetime_uncorrected=False):
-        """ Just return the present total counts for the collection. """
-        dt = self.delta_time(handle_jumps=True)
-        if dt==0:
-            return np.inf
-        
-        if frame_livetime_uncorrected:
-            return self.total_counts()/dt
-        return self.total_counts()/self.get_frame_seconds_livetime()
-    
     def mean_num_of_al_strips(self):
         """ Get the total number of Al strips with measured ADC values for the frame. """
         return np.mean(self.event_dataframe['hitnum_al'])
@@ -770,23 +905,69 @@ class CdTeCollection:
     def mean_num_of_pt_strips(self):
         """ Get the total number of Pt strips with measured ADC values for the frame. """
         return np.mean(self.event_dataframe['hitnum_pt'])
-    
-    def get_frame_seconds_livetime(self):
-        """ Get the livetime in seconds of the frame. """
-        return self.event_dataframe['livetime'].sum()* 1e-8
-    
-    def get_frame_fraction_livetime(self):
-        """ Get the livetime fraction of the frame. """
-        return self.get_frame_seconds_livetime()/self.delta_time(handle_jumps=True)
-    
-    def get_unread_can_frame_count(self):
-        """ This value corresponds to the time it takes to... """
-        dt = self.delta_time(handle_jumps=True)
-        if (dt<=0) or np.isnan(dt):
-            return 0
-        return (2 / (5.62*dt)) - 2
         
 
+class CdTeWorkspace:
+    """
+    Scratch arrays for `CdTeCollection` to work in, kept between 
+    refreshes.
+
+    Each array is asked for by name and reused (grown when needed) the 
+    next time that name is asked for, so its contents only last until 
+    then and nothing returned to the user is ever one of them. A 
+    workspace should only be used by one collection at a time.
+
+    Example
+    -------
+    workspace = CdTeWorkspace()
+    # on every refresh
+    cdte_data = CdTeCollection(parsed_data, workspace=workspace)
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def __len__(self):
+        return len(self._buffers)
+
+    @property
+    def nbytes(self):
+        """ The memory held by the scratch arrays. """
+        return sum(b.nbytes for b in self._buffers.values())
+
+    def buffer(self, name, shape, dtype):
+        """
+        A scratch array, contents left over from its last use.
+
+        Parameters
+        ----------
+        name : `str`
+                What the array is for.
+
+        shape : `tuple[int]`
+                The shape wanted.
+
+        dtype : `numpy.dtype`
+                The data type wanted.
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            A C-contiguous array of `shape` and `dtype`.
+        """
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        buffer = self._buffers.get(name, None)
+        if (buffer is None) or (buffer.dtype!=dtype) or (buffer.size<size):
+            # leave some room so slowly growing data does not reallocate every time
+            buffer = np.empty(size+size//4, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer[:size].reshape(shape)
+
+    def clear(self):
+        """ Let go of all the scratch arrays. """
+        self._buffers.clear()
+
 def channel_bins():
     """ Define the strip and ADC bins. """
     strip_bins = np.arange(257)-0.5
@@ -795,10 +976,155 @@ def channel_bins():
 
     return strip_bins, side_strip_bins, adc_bins
 
-def remap_strip_dict():
+def grid_histogram(values, shape, weights=None, workspace=None):
+    """
+    Histogram integer values on a grid of unit bins centred on 
+    0, 1, ..., n-1 along each axis (as the `channel_bins`) with one 
+    `np.bincount`.
+
+    Values off the grid are dropped, as with `np.histogramdd`, by 
+    sending them to an extra bin on each axis that is cut off at the 
+    end, so nothing is masked out or copied beforehand. This also drops 
+    the parser padding (strip 128, see `CdTeHitList`) when each side is 
+    binned on its own 128 strips.
+
+    Parameters
+    ----------
+    values : `tuple[numpy.ndarray]`
+            The integer values along each axis, all the same shape.
+
+    shape : `tuple[int]`
+            The number of bins along each axis.
+
+    weights : `numpy.ndarray`
+            Weight of each value, counts if `None`.
+            Default: None
+
+    workspace : `CdTeWorkspace`
+            Where to get the scratch arrays for the bin numbers from, 
+            they are allocated if `None`.
+            Default: None
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        The counts (`int64`, or `float64` with `weights`) with `shape`.
+    """
+    linear = None
+    for a, (v, n) in enumerate(zip(values, shape)):
+        v = np.asarray(v)
+        bins = np.empty(v.shape, dtype=np.int64) if workspace is None else workspace.buffer(f"grid_histogram_{min(a, 1)}", v.shape, np.int64)
+        # (floats, e.g. the `empty` of a collection without events, are truncated)
+        np.copyto(bins, v, casting="unsafe")
+        # anything off the grid (below 0 or from n) ends up in the extra bin, n
+        np.remainder(np.clip(bins, -1, n, out=bins), n+1, out=bins)
+        if linear is None:
+            linear = bins
+        else:
+            linear *= n+1
+            linear += bins
+    
+    full_shape = tuple(n+1 for n in shape)
+    counts = np.bincount(np.ravel(linear), 
+                         weights=None if weights is None else np.ravel(weights), 
+                         minlength=int(np.prod(full_shape)))
+    return counts.reshape(full_shape)[tuple(slice(n) for n in shape)]
+
+@lru_cache(maxsize=32)
+def good_strip_lut(pt_strips, al_strips, bad_pt_strips=(), bad_al_strips=()):
+    """
+    Make the lookup table of which strips are counted, built once for 
+    every set of strips.
+
+    Parameters
+    ----------
+    pt_strips, al_strips : `tuple[int]`, `tuple[int]`
+            The strips of the Pt- (0-127) and Al-side (128-255) that can 
+            be counted, as read out.
+
+    bad_pt_strips, bad_al_strips : `tuple[int]`, `tuple[int]`
+            Strips (numbered as `pt_strips` and `al_strips`) not to 
+            count.
+            Defaults: (), ()
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        A read-only (2,256) boolean array, row 0 for the Pt-side and 
+        row 1 for the Al-side, so that `lut[side][index]` tells whether 
+        to count the parser strip `index` (0-127, 128 and above never 
+        are) of that side.
+    """
+    lut = np.zeros((2,256), dtype=bool)
+    for side, strips, bad in ((0, pt_strips, bad_pt_strips), (1, al_strips, bad_al_strips)):
+        strips = np.setdiff1d(np.asarray(strips, dtype=np.int64), np.asarray(bad, dtype=np.int64))-128*side
+        lut[side][strips[(strips>=0) & (strips<128)]] = True
+    lut.setflags(write=False)
+    return lut
+
+def classify_entries(entry_events, entry_indices, entry_adc, n_events):
+    """
+    Classify events from their selected strips (entries) in one pass, 
+    giving everything the grades are made from (see 
+    `CdTeCollection.grade_slots`).
+
+    Parameters
+    ----------
+    entry_events : `numpy.ndarray`
+            The event of each entry, the entries being in event order.
+
+    entry_indices, entry_adc : `numpy.ndarray`, `numpy.ndarray`
+            The strip and ADC value of each entry.
+
+    n_events : `int`
+            The number of events.
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        The `CDTE_EVENT_CLASS_DTYPE` class of every event: the number 
+        of entries, whether the two entries of a double are on adjacent 
+        strips, and the entry (-1 if none) of a single, of an adjacent 
+        double (that with the larger ADC value, the second if equal), of 
+        the other strip of an adjacent double (`shared`) and of the 
+        (first) maximum ADC value if the ADC values sum above 0.
+    """
+    classes = np.zeros(n_events, dtype=CDTE_EVENT_CLASS_DTYPE)
+    for field in CDTE_EVENT_CLASS_SLOTS:
+        classes[field] = -1
+    if len(entry_events)==0:
+        return classes
+
+    starts = np.flatnonzero(np.diff(entry_events, prepend=-1))
+    events = entry_events[starts]
+    multiplicity = np.diff(np.append(starts, len(entry_events)))
+    classes['multiplicity'][events] = multiplicity
+    classes['single'][events[multiplicity==1]] = starts[multiplicity==1]
+
+    # doubles, as their first entry
+    first = starts[multiplicity==2]
+    adjacent = abs(entry_indices[first+1].astype(np.int64)-entry_indices[first])==1
+    classes['adjacent'][events[multiplicity==2]] = adjacent
+    larger = entry_adc[first]>entry_adc[first+1]
+    classes['double'][events[multiplicity==2][adjacent]] = np.where(larger, first, first+1)[adjacent]
+    classes['shared'][events[multiplicity==2][adjacent]] = np.where(larger, first+1, first)[adjacent]
+
+    # the first entry of every event that has its maximum ADC value
+    adc = entry_adc.astype(np.int64)
+    maxima = np.flatnonzero(adc==np.repeat(np.maximum.reduceat(adc, starts), multiplicity))
+    first_maxima = maxima[np.diff(entry_events[maxima], prepend=-1)!=0]
+    viable = np.add.reduceat(adc, starts)>0
+    classes['max_adc'][events[viable]] = first_maxima[viable]
+
+    return classes
+
+def remap_strip_lut():
     """ 
-    Define dictionary for easy remapping of channels to physical 
-    location. 
+    Define the array for remapping channels to their physical location, 
+    `remap_strip_lut()[channel]` is the remapped channel. 
+    
+    The remap is its own inverse so the same array also reorders the 
+    strip rows of an array, `counts[remap_strip_lut()]`.
     """
     original_channels = np.arange(256)
 
@@ -814,7 +1140,14 @@ def remap_strip_dict():
     new_channels[asic2_inds] = original_channels[asic3_inds][::-1]
     new_channels[asic3_inds] = original_channels[asic2_inds][::-1]
 
-    return dict(zip(original_channels, new_channels))
+    return new_channels
+
+def remap_strip_dict():
+    """ 
+    Define dictionary for easy remapping of channels to physical 
+    location. 
+    """
+    return dict(zip(np.arange(256), remap_strip_lut()))
 
 def strip_edges():
     """ 
@@ -863,6 +1196,14 @@ def pixel_areas():
     return np.diff(strip_width_edges)[:,None]@np.diff(strip_width_edges)[None,:]
 
 
+CDTE_GRADES = ("1", "2", "1and2", "max_adc", "2sum", "1and2sum")
+# the grades that sum the ADC values of adjacent doubles and the grade they count like
+CDTE_SUMMED_GRADES = {"2sum":"2", "1and2sum":"1and2"}
+CDTE_GOOD_STRIPS = {"pt":[s for s in range(128) if (s<59) or (s>68)], 
+                    "al":list(range(132, 252))}
+CDTE_EVENT_CLASS_DTYPE = np.dtype([('multiplicity', 'u2'), ('adjacent', '?'), ('single', 'i8'), ('double', 'i8'), ('shared', 'i8'), ('max_adc', 'i8')])
+CDTE_EVENT_CLASS_SLOTS = ('single', 'double', 'shared', 'max_adc')
+CDTE_REMAP_LUT = remap_strip_lut()
 CDTE_REMAP_DICT = remap_strip_dict()
 CDTE_STRIP_EDGES_MICROMETRES = strip_edges()
 CDTE_STRIP_EDGES_ARCMINUTES = strip_edges_arcminutes()
@@ -0,0 +1,237 @@
+"""
+CdTe collections for all four detectors, built in parallel.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTerawalldata2parser
+from FoGSE.telemetry_tools.parsers.CdTestreamparser import CdTeStreamDecoder
+from FoGSE.telemetry_tools.collections.CdTeCollection import CdTeCollection, channel_bins
+
+# the detector names, as in `CdTeCollection.bad_strips_pt`
+CDTE_DETECTORS = ("cdte1", "cdte2", "cdte3", "cdte4")
+
+class CdTeMultiCollection:
+    """
+    The collections of a number of CdTe detectors from one refresh of
+    a `CdTeDetectorPool`.
+
+    The spectrograms and images are views of the pool's shared memory
+    so are only valid until its next refresh, copy them to keep them.
+
+    Paramters
+    ---------
+    summaries : `dict[str, dict]`
+            The count and rate summary of each detector, see
+            `_cdte_detector_refresh`.
+
+    spectrograms, images : `dict[str, numpy.ndarray]`, `dict[str, numpy.ndarray]`
+            The spectrogram and image array of each detector.
+
+    Example
+    -------
+    with CdTeDetectorPool() as pool:
+        # on every refresh
+        cdte_data = pool.refresh({"cdte1":directory+raw_file1, "cdte2":directory+raw_file2})
+        print(cdte_data.total_counts(), cdte_data.total_count_rate())
+        plt.imshow(cdte_data.image_array("cdte1"))
+    """
+
+    def __init__(self, summaries, spectrograms, images):
+        self.summaries = summaries
+        self.spectrograms = spectrograms
+        self.images = images
+
+    @property
+    def detectors(self):
+        """ The detectors in the collection. """
+        return list(self.summaries)
+
+    def __len__(self):
+        return len(self.summaries)
+
+    def __getitem__(self, detector):
+        return self.summaries[detector]
+
+    def _total(self, field, detectors=None):
+        """ Sum a summary field over detectors (all if `None`). """
+        detectors = self.detectors if detectors is None else detectors
+        return sum(self.summaries[d][field] for d in detectors)
+
+    def total_counts(self, detectors=None):
+        """ The number of events, over the given detectors (all if `None`). """
+        return self._total("total_counts", detectors=detectors)
+
+    def total_pseudo_counts(self, detectors=None):
+        """ The number of pseudo-trigger events, over the given detectors (all if `None`). """
+        return self._total("total_pseudo_counts", detectors=detectors)
+
+    def total_count_rate(self, detectors=None):
+        """ The livetime corrected count rate summed over the given detectors (all if `None`). """
+        return self._total("total_count_rate", detectors=detectors)
+
+    def get_frame_seconds_livetime(self):
+        """ The livetime in seconds of each detector. """
+        return {d:s["livetime"] for d,s in self.summaries.items()}
+
+    def get_frame_fraction_livetime(self):
+        """ The livetime fraction of each detector. """
+        return {d:s["livetime_fraction"] for d,s in self.summaries.items()}
+
+    def spectrogram_array(self, detector):
+        """ The spectrogram array of a detector, as `CdTeCollection.spectrogram_array`. """
+        return self.spectrograms[detector]
+
+    def image_array(self, detector):
+        """ The image array of a detector, as `CdTeCollection.image_array`. """
+        return self.images[detector]
+
+class CdTeDetectorPool:
+    """
+    Parse and collect the data of the CdTe detectors in parallel.
+
+    Each detector is handed to its own worker process. The worker
+    reads the end of the detector's raw file (from the first frame
+    starting in the last `block_bytes`) and builds its
+    `CdTeCollection`. It then writes the spectrogram and image
+    straight into shared memory, so only the small count and rate
+    summaries are sent back. The processes and shared memory are kept
+    between refreshes.
+
+    Parameters
+    ----------
+    detectors : `list[str]`
+            The detectors collected.
+            Default: `CDTE_DETECTORS`
+
+    max_workers : `int`
+            The number of worker processes, one per detector if `None`.
+            Default: None
+
+    block_bytes : `int`
+            How much of the end of each raw file is read on a refresh.
+            Default: 20_000_000
+
+    bad_strips : `dict[str, dict]`
+            The `CdTeCollection` bad strips of each detector.
+            Default: None
+
+    compact : `bool`
+            Parse with the compact data type, see `cdte_event_dtype`.
+            Default: True
+
+    remap, cmn_sub, area_correction : `bool`, `bool`, `bool`
+            See `CdTeCollection.spectrogram_array` and
+            `CdTeCollection.image_array`.
+            Defaults: True, True, True
+
+    Example
+    -------
+    with CdTeDetectorPool(bad_strips={"cdte1":{"pt":[47, 59], "al":[]}}) as pool:
+        # on every refresh
+        cdte_data = pool.refresh({d:directory+raw_files[d] for d in CDTE_DETECTORS})
+    """
+
+    def __init__(self, detectors=CDTE_DETECTORS, max_workers=None, block_bytes=20_000_000, bad_strips=None, compact=True, remap=True, cmn_sub=True, area_correction=True):
+        self.detectors = list(detectors)
+        self.block_bytes = block_bytes
+        self.bad_strips = bad_strips if bad_strips is not None else {}
+        self.options = {"compact":compact, "remap":remap, "cmn_sub":cmn_sub, "area_correction":area_correction}
+
+        # one spectrogram and one image per detector, back to back
+        strip_bins, side_strip_bins, adc_bins = channel_bins()
+        self.spectrogram_shape = (len(strip_bins)-1, len(adc_bins)-1)
+        self.image_shape = (len(side_strip_bins)-1, len(side_strip_bins)-1)
+        n = len(self.detectors)
+        self.shared = shared_memory.SharedMemory(create=True, size=8*n*(np.prod(self.spectrogram_shape)+np.prod(self.image_shape)))
+        self.spectrograms, self.images = _cdte_shared_arrays(self.shared.buf, n, self.spectrogram_shape, self.image_shape)
+
+        self.executor = ProcessPoolExecutor(max_workers=max_workers if max_workers is not None else n)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ Stop the worker processes and free the shared memory. """
+        self.executor.shutdown()
+        del self.spectrograms, self.images
+        self.shared.close()
+        self.shared.unlink()
+
+    def refresh(self, sources):
+        """
+        Collect the latest data of the detectors.
+
+        Parameters
+        ----------
+        sources : `dict[str, str or bytes]`
+                The raw file (the last `block_bytes` are read) or the
+                raw data of each detector to collect, detectors not
+                given are left out.
+
+        Returns
+        -------
+        `CdTeMultiCollection` :
+            The collections of the detectors.
+        """
+        futures = {}
+        for detector, source in sources.items():
+            slot = self.detectors.index(detector)
+            if isinstance(source, (str, os.PathLike)):
+                source = (os.fspath(source), self.block_bytes)
+            task = (source, self.shared.name, slot, len(self.detectors), self.spectrogram_shape, self.image_shape, self.bad_strips.get(detector, None), self.options)
+            futures[detector] = self.executor.submit(_cdte_detector_refresh, task)
+
+        summaries = {d:f.result() for d,f in futures.items()}
+        return CdTeMultiCollection(summaries,
+                                   {d:self.spectrograms[self.detectors.index(d)] for d in summaries},
+                                   {d:self.images[self.detectors.index(d)] for d in summaries})
+
+def _cdte_shared_arrays(buffer, n_detectors, spectrogram_shape, image_shape):
+    """ The spectrogram and image arrays of all the detectors in the shared memory. """
+    spectrograms = np.ndarray((n_detectors,)+tuple(spectrogram_shape), dtype=np.float64, buffer=buffer)
+    images = np.ndarray((n_detectors,)+tuple(image_shape), dtype=np.float64, buffer=buffer, offset=spectrograms.nbytes)
+    return spectrograms, images
+
+def _cdte_detector_refresh(task):
+    """
+    Build the collection of one detector in a worker process, writing
+    its spectrogram and image into the shared memory and returning its
+    count and rate summary.
+    """
+    source, shared_name, slot, n_detectors, spectrogram_shape, image_shape, bad_strips, options = task
+    if isinstance(source, tuple):
+        # the end of the file as the display reads it, from a word and then a frame start
+        filename, block_bytes = source
+        parsed_data = CdTeStreamDecoder(filename, compact=options["compact"], start="tail", blksize=block_bytes).feed_file()
+    else:
+        parsed_data = CdTerawalldata2parser(source, compact=options["compact"])
+
+    cdte_data = CdTeCollection(parsed_data, bad_strips=bad_strips)
+
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        spectrograms, images = _cdte_shared_arrays(shared.buf, n_detectors, spectrogram_shape, image_shape)
+        spectrograms[slot] = cdte_data.spectrogram_array(remap=options["remap"], cmn_sub=options["cmn_sub"])
+        images[slot] = cdte_data.image_array(remap=options["remap"], area_correction=options["area_correction"])
+        del spectrograms, images
+    finally:
+        shared.close()
+
+    total_counts = cdte_data.total_counts()
+    return {"total_counts":total_counts,
+            "total_pseudo_counts":cdte_data.total_pseudo_counts() if total_counts>0 else 0,
+            "filtered_counts":len(cdte_data.f_data["times"]),
+            "delta_time":cdte_data.delta_time(handle_jumps=True) if total_counts>0 else 0,
+            "livetime":cdte_data.get_frame_seconds_livetime(),
+            "livetime_fraction":cdte_data.get_frame_fraction_livetime() if total_counts>0 else np.nan,
+            "total_count_rate":cdte_data.total_count_rate() if total_counts>0 else 0,
+            "mean_unixtime":cdte_data.mean_unixtime() if total_counts>0 else np.nan,
+            "latest_data_time":cdte_data.latest_data_time}
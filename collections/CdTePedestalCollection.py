@@ -0,0 +1,259 @@
+"""
+CdTe collection that keeps running per-strip pedestal, noise and hit
+rate statistics and finds bad strips from them.
+"""
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTeHitList
+from FoGSE.telemetry_tools.parsers.CdTelogreader import CdTeLogReader
+from FoGSE.telemetry_tools.collections.CdTeCollection import CDTE_GOOD_STRIPS, CDTE_REMAP_LUT
+from FoGSE.telemetry_tools.collections.CdTeRateCollection import LIVETIME_CLOCK_INT
+
+# a row of `CdTePedestalCollection.pedestals` for every strip
+CDTE_PEDESTAL_DTYPE = np.dtype({'names':('side', 'strip', 'samples', 'hits', 'hit_rate', 'pedestal', 'noise', 'bad'),
+                                'formats':('u1', 'u1', 'u8', 'u8', 'f8', 'f8', 'f8', '?')})
+
+class CdTePedestalCollection:
+    """
+    Running statistics of every CdTe strip, for finding the pedestal,
+    noise and bad strips of a detector.
+
+    Values of the common mode subtracted ADC at or above `hit_adc`
+    count as hits. The rest give the pedestal (mean) and noise (standard
+    deviation) of the strip, but only from the ASICs that had all 64 of
+    their strips read out in an event. With data thinning on, only the
+    strips over the ASIC's threshold are read out, which would bias the
+    pedestal and noise, so thinned data gives hits but no pedestal
+    samples (see `full_readouts`) and those strips are never bad from
+    their noise. The common mode of each ASIC is followed the same way,
+    from the events the ASIC was read out in (had any strips). Each
+    block of data is reduced with `np.bincount` and merged into running
+    means and variances, so the memory is fixed however much data goes
+    through (e.g., a whole flight file with `from_log`).
+
+    Strips are numbered as read out, Pt: 0-127 and Al: 128-255. ASICs
+    are Pt 0-63, Pt 64-127, Al 0-63 and Al 64-127.
+
+    Paramters
+    ---------
+    hit_adc : `int`
+            Common mode subtracted ADC value from which a strip counts
+            as hit rather than as pedestal.
+            Default: 50
+
+    Example
+    -------
+    pedestals = CdTePedestalCollection.from_log(directory+raw_file)
+    table = pedestals.pedestals()
+    cdte_data = CdTeCollection(parsed_data, bad_strips=pedestals.bad_strips())
+    """
+
+    def __init__(self, hit_adc=50):
+        self.hit_adc = hit_adc
+
+        n_strips, n_asics = 256, 4
+        self.n_events = 0
+        self.livetime = 0.
+
+        # sample count, mean and sum of squared differences (see `_merge`) of the pedestal of each strip
+        self.samples = np.zeros(n_strips, dtype=np.uint64)
+        self.means = np.zeros(n_strips, dtype=np.float64)
+        self.squares = np.zeros(n_strips, dtype=np.float64)
+        self.hits = np.zeros(n_strips, dtype=np.uint64)
+
+        # the number of events each ASIC had all its strips read out in
+        self.full_readouts = np.zeros(n_asics, dtype=np.uint64)
+
+        # the same for the common mode of each ASIC, from the events it was read out in
+        self.cmn_samples = np.zeros(n_asics, dtype=np.uint64)
+        self.cmn_means = np.zeros(n_asics, dtype=np.float64)
+        self.cmn_squares = np.zeros(n_asics, dtype=np.float64)
+
+    @classmethod
+    def from_log(cls, filename, frames_per_block=64, **kwargs):
+        """
+        Go through a whole raw CdTe log, decoding `frames_per_block`
+        event frames at a time.
+
+        Parameters
+        ----------
+        filename : `str`
+                The raw CdTe log file.
+
+        frames_per_block : `int`
+                The number of frames decoded and added at a time.
+                Default: 64
+
+        kwargs :
+                Passed to `CdTePedestalCollection`.
+
+        Returns
+        -------
+        `CdTePedestalCollection` :
+            The statistics of the whole log.
+        """
+        collection = cls(**kwargs)
+        with CdTeLogReader(filename, sparse=True) as reader:
+            index = reader.index
+            for start in range(0, len(index), frames_per_block):
+                collection.add((None, reader.decode_events(index[start:start+frames_per_block]), None))
+        return collection
+
+    def add(self, parsed_data):
+        """
+        Add new CdTe data.
+
+        Parameters
+        ----------
+        parsed_data : `tuple`, length 3
+                Contains `Flags`, `event_df`, `all_hkdicts` as returned
+                from the parser, `event_df` being padded or a
+                `CdTeHitList`.
+        """
+        _, event_dataframe, _ = parsed_data
+        if len(event_dataframe)==0:
+            return
+        hit_list = event_dataframe if isinstance(event_dataframe, CdTeHitList) else CdTeHitList.from_padded(event_dataframe)
+        self.n_events += len(hit_list)
+        self.livetime += np.sum(hit_list['livetime'])*LIVETIME_CLOCK_INT
+
+        hits = hit_list.hits
+        strips = hits['strip']+128*hits['side'].astype(np.int64)
+        adc = hits['adc_cmn'].astype(np.float64)
+        hit = adc>=self.hit_adc
+        self.hits += np.bincount(strips[hit], minlength=len(self.hits)).astype(np.uint64)
+
+        # the strips read out from each ASIC in each event, ASICs not read out have none
+        n_asics = len(self.cmn_samples)
+        asics = hits['event_id'].astype(np.int64)*n_asics+strips//64
+        readouts = np.bincount(asics, minlength=len(hit_list)*n_asics)
+        full = readouts[asics]==64
+        _merge((self.samples, self.means, self.squares), strips[~hit & full], adc[~hit & full])
+        self.full_readouts += np.bincount(np.arange(len(readouts))[readouts==64]%n_asics, minlength=n_asics).astype(np.uint64)
+
+        cmn = np.concatenate((hit_list['cmn_pt'], hit_list['cmn_al']), axis=1).astype(np.float64).ravel()
+        read = readouts>0
+        _merge((self.cmn_samples, self.cmn_means, self.cmn_squares), (np.arange(len(cmn))%n_asics)[read], cmn[read])
+
+    def noise(self):
+        """ The standard deviation of the pedestal of each strip, NaN with no samples. """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(self.squares/self.samples)
+
+    def hit_rate(self):
+        """ The fraction of events each strip is hit in. """
+        return self.hits/self.n_events if self.n_events>0 else np.zeros(len(self.hits))
+
+    def common_modes(self):
+        """ The mean and standard deviation of the common mode of each ASIC. """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.cmn_samples>0, self.cmn_means, np.nan), np.sqrt(self.cmn_squares/self.cmn_samples)
+
+    def bad_strip_mask(self, n_sigma=5, good_strips=None):
+        """
+        Find the noisy and hot strips.
+
+        A strip is bad when its noise is more than `n_sigma` (robust,
+        from the median absolute deviation) above the median noise of
+        the strips of its side with pedestal samples, or when it has
+        more hits than the median strip of its side by `n_sigma` Poisson
+        standard deviations.
+
+        Parameters
+        ----------
+        n_sigma : `float`
+                How far from the rest of the side a strip must be.
+                Default: 5
+
+        good_strips : `dict(\"pt\":list[int], \"al\":list[int])`
+                The strips looked at, as `CdTeCollection`, the others
+                are never bad.
+                Default: `CDTE_GOOD_STRIPS`
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            Whether each strip is bad.
+        """
+        good_strips = good_strips if good_strips is not None else CDTE_GOOD_STRIPS
+        noise, hits = self.noise(), self.hits.astype(np.float64)
+        bad = np.zeros(len(hits), dtype=bool)
+        for side in ("pt", "al"):
+            strips = np.asarray(good_strips[side], dtype=np.int64)
+            if len(strips)==0 or self.n_events==0:
+                continue
+            hits_median = np.median(hits[strips])
+            bad[strips] = hits[strips]>hits_median+n_sigma*np.sqrt(max(hits_median, 1))
+
+            # only strips with pedestal samples have a noise
+            strips = strips[self.samples[strips]>0]
+            if len(strips)==0:
+                continue
+            side_noise = noise[strips]
+            noise_median = np.median(side_noise)
+            noise_sigma = 1.4826*np.median(np.abs(side_noise-noise_median))
+            bad[strips] |= side_noise>noise_median+n_sigma*noise_sigma
+        return bad
+
+    def bad_strips(self, n_sigma=5, good_strips=None):
+        """
+        The bad strips (see `bad_strip_mask`) as the `bad_strips`
+        argument of `CdTeCollection`.
+
+        Returns
+        -------
+        `dict(\"pt\":list[int], \"al\":list[int])` :
+            The bad Pt- and Al-side strips.
+        """
+        # `CdTeCollection` takes bad strips numbered so that the remap gives the strips read out
+        bad = CDTE_REMAP_LUT[np.flatnonzero(self.bad_strip_mask(n_sigma=n_sigma, good_strips=good_strips))]
+        return {"pt":[int(s) for s in bad[bad<128]], "al":[int(s) for s in bad[bad>=128]]}
+
+    def pedestals(self, n_sigma=5, good_strips=None):
+        """
+        The pedestal table of every strip.
+
+        Parameters
+        ----------
+        n_sigma, good_strips : `float`, `dict`
+                See `bad_strip_mask`.
+                Defaults: 5, None
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            A `CDTE_PEDESTAL_DTYPE` row for each strip as read out: its
+            side (0 for Pt, 1 for Al) and strip (0-127), the number of
+            pedestal samples and of hits, the hit rate (see
+            `hit_rate`), the pedestal, the noise and whether it is bad.
+        """
+        table = np.zeros(len(self.hits), dtype=CDTE_PEDESTAL_DTYPE)
+        strips = np.arange(len(self.hits))
+        table['side'], table['strip'] = strips//128, strips%128
+        table['samples'] = self.samples
+        table['hits'] = self.hits
+        table['hit_rate'] = self.hit_rate()
+        table['pedestal'] = np.where(self.samples>0, self.means, np.nan)
+        table['noise'] = self.noise()
+        table['bad'] = self.bad_strip_mask(n_sigma=n_sigma, good_strips=good_strips)
+        return table
+
+def _merge(running, groups, values):
+    """
+    Merge the count, mean and sum of squared differences from the mean
+    of the values in each group into the running ones (`running`,
+    updated in place), as in Chan et al.'s parallel variance.
+    """
+    samples, means, squares = running
+    n = np.bincount(groups, minlength=len(samples)).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        block_means = np.where(n>0, np.bincount(groups, weights=values, minlength=len(samples))/n, 0)
+    block_squares = np.bincount(groups, weights=(values-block_means[groups])**2, minlength=len(samples))
+
+    total = samples+n
+    delta = block_means-means
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means += np.where(total>0, delta*n/total, 0)
+        squares += block_squares+np.where(total>0, delta**2*samples*n/total, 0)
+    samples += n.astype(np.uint64)
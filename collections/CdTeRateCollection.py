@@ -0,0 +1,311 @@
+"""
+CdTe collection for the count rate and livetime of read-in CdTe data.
+"""
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import cdte_event_ext1ti64
+from FoGSE.telemetry_tools.parsers.CdTelogreader import CdTeLogReader
+
+try:
+    from FoGSE.utils import get_system_value
+    TI_CLOCK_INT = get_system_value("gse", "display_settings", "cdte", "pc", "collections", "ti_clock_interval")
+except ImportError:
+    print("ImportError, defaulting to `TI_CLOCK_INT = 160e-9`.")
+    TI_CLOCK_INT = 160e-9
+
+# seconds per count of the event header `livetime`
+LIVETIME_CLOCK_INT = 10e-9
+
+# seconds per count of the external `ti` (ext1) in the event headers, 16 to a `ti` count
+EXT1TI_CLOCK_INT = 10e-9
+
+# a row of `cdte_frame_rates` for every event frame
+CDTE_FRAME_RATE_DTYPE = np.dtype({'names':('offset', 'unixtime', 'n_events', 'n_pseudo', 'livetime', 'ti_span', 'livetime_fraction', 'unread_can_frames'),
+                                  'formats':('i8', 'u4', 'u4', 'u4', 'f4', 'f4', 'f4', 'f4')})
+
+class CdTeRateCollection:
+    """
+    A container for the CdTe count rate and livetime.
+
+    Only the event headers (`ti`, `livetime`, `unixtime`, ...) are
+    used so this can be given the output of the parser with
+    `header_only=True`, which skips decoding the strip data, for a
+    quick-look rate panel.
+
+    Paramters
+    ---------
+    parsed_data : `tuple`, length 3
+            Contains `Flags`, `event_df`, `all_hkdicts` as returned from
+            the parser.
+
+    old_data_time : `int`, `float`
+            The last time of the last data point previously extracted and
+            used. Kept as the latest time if there are no events.
+            Default: 0
+
+    ti_anchor : `tuple(int, float)`
+            A 64-bit `ti` value and the unixtime it was at to pin the
+            event timeline to, see `cdte_timeline`.
+            Default: None
+
+    Example
+    -------
+    with readBackwards.BackwardsReader(file=directory+raw_file, blksize=20_000_000, forward=True) as f:
+        Flags, event_df, all_hkdicts = CdTeparser.CdTerawalldata2parser(f.read_block(), header_only=True)
+
+    cdte_rates = CdTeRateCollection((Flags, event_df, all_hkdicts))
+    print(cdte_rates.total_count_rate(), cdte_rates.get_frame_fraction_livetime())
+    """
+
+    def __init__(self, parsed_data, old_data_time=0, ti_anchor=None):
+        # bring in the parsed data
+        _, self.event_dataframe, _ = parsed_data
+
+        self.latest_data_time = np.max(self.event_dataframe['ti']) if len(self.event_dataframe)>0 else old_data_time
+
+        # the unwrapped event times are only worked out if needed
+        self.ti_anchor = ti_anchor
+        self._timeline = None
+
+    def timeline(self):
+        """ 
+        The unwrapped 64-bit `ti` and the time in seconds of every event, 
+        see `cdte_timeline`, anchored on the `ext1ti` of the events 
+        when they have it. 
+        """
+        if self._timeline is None:
+            ext1ti = cdte_event_ext1ti64(self.event_dataframe) if 'ext1ti_lower' in self.event_dataframe.dtype.names else None
+            self._timeline = cdte_timeline(self.event_dataframe['ti'], self.event_dataframe['unixtime'], anchor=self.ti_anchor, ti_clock_interval=TI_CLOCK_INT, ext1ti=ext1ti)
+        return self._timeline
+
+    def event_seconds(self):
+        """ The (unix) time in seconds of every event, increasing through `ti` rollovers. """
+        return self.timeline()[1]
+
+    def total_counts(self):
+        """ Just return the present total counts for the collection. """
+        return len(self.event_dataframe)
+
+    def total_pseudo_counts(self):
+        """ The number of the counts for the collection that are pseudo-triggers. """
+        return int(np.sum(self.event_dataframe['flag_pseudo']))
+
+    def mean_unixtime(self):
+        """ Get the mean unixtime of the frame. """
+        return np.median(self.event_dataframe['unixtime'])
+
+    def delta_time(self, handle_jumps=False):
+        """ Get the delta-t of the frame. """
+        # not using_unixtime = (np.max(self.event_dataframe['unixtime'])-np.min(self.event_dataframe['unixtime'])) anymore
+        ti_clock_interval = TI_CLOCK_INT# 10.24e-6 # 10.24 usec -> 10.24 change in `ti`` every usec?`
+        if not handle_jumps:
+            _ti_time = np.max(self.event_dataframe['ti'])-np.min(self.event_dataframe['ti'])
+            return _ti_time*ti_clock_interval
+
+        # the span of the unwrapped `ti`, rollovers and resets handled across all the events
+        ti64, _ = self.timeline()
+        hj_ti_time = float(ti64[-1]-ti64[0]) if len(ti64)>0 else 0
+
+        return hj_ti_time*ti_clock_interval
+
+
+    def total_count_rate(self, frame_livetime_uncorrected=False):
+        """ Just return the present total counts for the collection. """
+        dt = self.delta_time(handle_jumps=True)
+        if dt==0:
+            return np.inf
+
+        if frame_livetime_uncorrected:
+            return self.total_counts()/dt
+        return self.total_counts()/self.get_frame_seconds_livetime()
+
+    def get_frame_seconds_livetime(self):
+        """ Get the livetime in seconds of the frame. """
+        return self.event_dataframe['livetime'].sum()*LIVETIME_CLOCK_INT
+
+    def get_frame_fraction_livetime(self):
+        """ Get the livetime fraction of the frame. """
+        return self.get_frame_seconds_livetime()/self.delta_time(handle_jumps=True)
+
+    def get_unread_can_frame_count(self):
+        """ This value corresponds to the time it takes to... """
+        dt = self.delta_time(handle_jumps=True)
+        if (dt<=0) or np.isnan(dt):
+            return 0
+        return (2 / (5.62*dt)) - 2
+
+def cdte_timeline(ti, unixtime, anchor=None, max_lag=10, ti_clock_interval=None, ext1ti=None, ext1ti_clock_interval=None):
+    """
+    Unwrap the 32-bit `ti` of a stream of events into a 64-bit count 
+    and a time in seconds that keep increasing through rollovers.
+
+    With the 64-bit `ext1ti` of the events (see `cdte_event_ext1ti64`) 
+    the number of rollovers between one event and the next is the 
+    number that matches how far `ext1ti` moved, and a step in `ti` that 
+    does not match it (e.g., `ti` reset when the DAQ restarts) is 
+    replaced by the `ext1ti` step. A step in `ti` longer than the 
+    `ext1ti` step by whole wraps of its lower word is kept, as the upper 
+    word is not always carried into. The 64-bit count then starts from 
+    the first event's `ext1ti` (in `ti` counts) so the counts of 
+    detectors latching the same canister clock line up.
+
+    Steps where `ext1ti` stands still, goes back or jumps further than 
+    the unixtimes allow (e.g., not filled in) fall back to the 
+    frame `unixtime`: the number of rollovers is the one that best 
+    matches how far the unixtime moved, so gaps of any length between 
+    frames are handled. The events of a frame can span any time before 
+    its unixtime, so a step is only taken as a reset when it is longer 
+    than the unixtimes allow, even with the last event of the frame 
+    before coming up to `max_lag` before that frame's unixtime. The 
+    unixtime step is used instead. Gaps of more than a rollover (~11 
+    minutes) inside one frame can not be seen this way.
+
+    Without an `anchor` the times are lined up with the frame unixtimes 
+    (to their one-second resolution) so no event is after the frame it 
+    came in. With an `anchor`, a 64-bit `ti` counter value and the 
+    unixtime it was at (e.g., from `cdte_canister_ti64` of the canister 
+    HK, taken in the same run), the 64-bit `ti` is that counter and the 
+    times follow from it.
+
+    Parameters
+    ----------
+    ti, unixtime : `numpy.ndarray`, `numpy.ndarray`
+            The `ti` and frame `unixtime` of every event, in the order 
+            they were read out.
+
+    anchor : `tuple(int, float)`
+            A 64-bit `ti` value and the unixtime it was at.
+            Default: None
+
+    max_lag : `int`, `float`
+            The most seconds the last event of a frame comes before the 
+            frame's unixtime.
+            Default: 10
+
+    ti_clock_interval : `float`
+            Seconds per `ti` count, `TI_CLOCK_INT` if `None`.
+            Default: None
+
+    ext1ti : `numpy.ndarray`
+            The 64-bit external `ti` of every event, not used if `None`.
+            Default: None
+
+    ext1ti_clock_interval : `float`
+            Seconds per `ext1ti` count, `EXT1TI_CLOCK_INT` if `None`.
+            Default: None
+
+    Returns
+    -------
+    `numpy.ndarray`, `numpy.ndarray` :
+        The 64-bit `ti` (`uint64`) and time in seconds (`float64`) of 
+        every event.
+    """
+    ti_clock_interval = TI_CLOCK_INT if ti_clock_interval is None else ti_clock_interval
+    ext1ti_clock_interval = EXT1TI_CLOCK_INT if ext1ti_clock_interval is None else ext1ti_clock_interval
+    ti = np.asarray(ti, dtype=np.int64)
+    unixtime = np.asarray(unixtime, dtype=np.float64)
+    if len(ti)==0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.float64)
+
+    rollover = 2**32
+    # the counts between events modulo the rollovers, and as the unixtimes allow at most
+    counted = np.diff(ti)%rollover
+    expected = np.diff(unixtime)/ti_clock_interval
+    longest = expected+(max_lag+1)/ti_clock_interval
+    tolerance = np.full(len(counted), np.inf)
+
+    usable = np.zeros(len(counted), dtype=bool)
+    if ext1ti is not None:
+        # the `ext1ti` steps in `ti` counts, where they can be trusted
+        ext1ti = np.asarray(ext1ti, dtype=np.uint64)
+        ext1_steps = np.diff(ext1ti.astype(np.float64))*(ext1ti_clock_interval/ti_clock_interval)
+        usable = (np.diff(ext1ti.astype(np.int64))>0) & (ext1_steps<=longest)
+        expected = np.where(usable, ext1_steps, expected)
+        longest = np.where(usable, np.inf, longest)
+        # the two clocks agree to well within a millisecond
+        tolerance = np.where(usable, 1e-3/ti_clock_interval+1e-4*ext1_steps, np.inf)
+
+    steps = counted+rollover*np.maximum(0, np.round((expected-counted)/rollover)).astype(np.int64)
+    # steps that can not be, too long for the unixtimes or not what `ext1ti` gives
+    missed = steps-expected
+    resets = (steps>longest) | (np.abs(missed)>tolerance)
+    if ext1ti is not None:
+        # unless the `ext1ti` lower word wrapped with no carry into the upper word, then `ti` is right
+        lower_wrap = 2**32*ext1ti_clock_interval/ti_clock_interval
+        wraps = np.round(missed/lower_wrap)
+        resets &= ~(usable & (wraps>=1) & (np.abs(missed-wraps*lower_wrap)<=tolerance))
+    steps[resets] = np.round(np.maximum(expected[resets], 0)).astype(np.int64)
+    counts = np.concatenate(([0], np.cumsum(steps)))
+
+    if anchor is None:
+        first = ti[0] if not np.any(usable) else int(np.round(float(ext1ti[0])*ext1ti_clock_interval/ti_clock_interval))
+        ti64 = counts+first
+        # the latest start for which no event comes after its frame's unixtime
+        start = np.min(unixtime-counts*ti_clock_interval)
+        return ti64.astype(np.uint64), start+counts*ti_clock_interval
+
+    anchor_ti64, anchor_unixtime = int(anchor[0]), float(anchor[1])
+    # the first event is the count matching its `ti` closest to where its unixtime puts it
+    guess = (unixtime[0]-anchor_unixtime)/ti_clock_interval
+    difference = int(ti[0])-anchor_ti64
+    offset = difference-rollover*int(np.round((difference-guess)/rollover))
+    ti64 = anchor_ti64+offset+counts
+    return ti64.astype(np.uint64), anchor_unixtime+(offset+counts)*ti_clock_interval
+
+def cdte_frame_rates(filename, chunk_words=2**24, ti_clock_interval=None):
+    """
+    The event count and livetime of every event frame of a raw CdTe 
+    log, in one pass through the file.
+
+    Only the event headers are decoded, a chunk of the file at a time 
+    (see `CdTeLogReader.iter_event_headers`), so logs much larger than 
+    memory can be gone through. The livetime fraction and the estimated 
+    unread canister frames are worked out per frame as 
+    `CdTeRateCollection` does for a whole collection, with the `ti` 
+    span from the first to the last event of the frame.
+
+    Parameters
+    ----------
+    filename : `str`
+            The raw CdTe log file.
+
+    chunk_words : `int`
+            The number of words read at a time.
+            Default: 2**24
+
+    ti_clock_interval : `float`
+            Seconds per `ti` count.
+            Default: `TI_CLOCK_INT`
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        A `CDTE_FRAME_RATE_DTYPE` row for every valid event frame, in 
+        file order: the word offset of the frame in the file (as 
+        `CdTeLogReader.index`), its unixtime, number of events and of 
+        pseudo-trigger events, livetime (seconds), `ti` span (seconds), 
+        livetime fraction (NaN with no span) and estimated unread 
+        canister frames (0 with no span).
+    """
+    ti_clock_interval = TI_CLOCK_INT if ti_clock_interval is None else ti_clock_interval
+
+    tables = [np.zeros(0, dtype=CDTE_FRAME_RATE_DTYPE)]
+    with CdTeLogReader(filename, chunk_words=chunk_words) as reader:
+        for frames, headers, in_frame in reader.iter_event_headers():
+            table = np.zeros(len(frames), dtype=CDTE_FRAME_RATE_DTYPE)
+            for name in ('offset', 'unixtime', 'n_events'):
+                table[name] = frames[name]
+            table['n_pseudo'] = np.bincount(in_frame, weights=headers['flag_pseudo'], minlength=len(frames))
+            livetime = np.bincount(in_frame, weights=headers['livetime'], minlength=len(frames))*LIVETIME_CLOCK_INT
+
+            # a frame is far shorter than a rollover so the wrapped difference is its span
+            span = (frames['last_ti']-frames['first_ti']).astype(np.float64)*ti_clock_interval
+            with np.errstate(divide="ignore", invalid="ignore"):
+                table['livetime_fraction'] = np.where(span>0, livetime/span, np.nan)
+                table['unread_can_frames'] = np.where(span>0, 2/(5.62*span)-2, 0)
+            table['livetime'] = livetime
+            table['ti_span'] = span
+            tables.append(table)
+
+    return np.concatenate(tables)
@@ -0,0 +1,198 @@
+"""
+CdTe collection that keeps running per-strip ADC distributions to set
+event selection thresholds from.
+"""
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTeHitList
+from FoGSE.telemetry_tools.collections.CdTeCollection import channel_bins, grid_histogram
+
+class CdTeThresholdCollection:
+    """
+    Running ADC histograms of every CdTe strip that thresholds (e.g.,
+    for `CdTeCollection.single_event`) are read from.
+
+    Only positive ADC values are kept, as in the "simple1" single event
+    selection. Each block of data is histogrammed once when it is
+    added, along with the number, sum and sum of squares of the values
+    on each strip, so a threshold never looks at the events again
+    however long the run. Quantiles are found to the ADC bin (or half
+    way between two, see `quantile`) by a binary search of the cumulative histogram of each strip, which is
+    only rebuilt after new data is added. The memory is fixed
+    (~2 MB).
+
+    Strips are numbered as read out, Pt: 0-127 and Al: 128-255.
+
+    Paramters
+    ---------
+    decay : `float`
+            What the counts held are multiplied by before each block is
+            added, so older data counts for less and the thresholds
+            follow changes (1 to keep everything).
+            Default: 1
+
+    cmn_sub : `bool`
+            Defines whether the common mode subtracted ADC values are
+            used.
+            Default: True
+
+    Example
+    -------
+    thresholds = CdTeThresholdCollection()
+    # on every refresh
+    parsed_data = CdTeparser.CdTerawalldata2parser(f.read_block())
+    thresholds.add(parsed_data)
+    cdte_data = CdTeCollection(parsed_data, adc_thresholds=thresholds)
+    strip_thresholds = thresholds.thresholds(n_sigma=1)
+    """
+
+    def __init__(self, decay=1, cmn_sub=True):
+        self.decay = decay
+        self.cmn_sub = cmn_sub
+
+        self.strip_bins, self.side_strip_bins, self.adc_bins = channel_bins()
+        n_strips, n_adc = len(self.strip_bins)-1, len(self.adc_bins)-1
+
+        # everything is allocated up front and reused
+        self.histograms = np.zeros((n_strips, n_adc), dtype=np.float64)
+        self.counts = np.zeros(n_strips, dtype=np.float64)
+        self.sums = np.zeros(n_strips, dtype=np.float64)
+        self.sums_sq = np.zeros(n_strips, dtype=np.float64)
+
+        # cumulative histograms of the strips then the two sides, built when first needed
+        self._cumulative = None
+
+    def add(self, parsed_data):
+        """
+        Add the ADC values of new CdTe data.
+
+        Parameters
+        ----------
+        parsed_data : `tuple`, length 3
+                Contains `Flags`, `event_df`, `all_hkdicts` as returned
+                from the parser, `event_df` being padded or a
+                `CdTeHitList`.
+        """
+        _, event_dataframe, _ = parsed_data
+        if len(event_dataframe)==0:
+            return
+        hits = (event_dataframe if isinstance(event_dataframe, CdTeHitList) else CdTeHitList.from_padded(event_dataframe)).hits
+
+        adc = (hits['adc_cmn'] if self.cmn_sub else hits['adc']).astype(np.int64)
+        positive = adc>0
+        adc = adc[positive]
+        strips = (hits['strip']+(len(self.side_strip_bins)-1)*hits['side'].astype(np.int64))[positive]
+
+        if self.decay!=1:
+            for running in (self.histograms, self.counts, self.sums, self.sums_sq):
+                running *= self.decay
+
+        n_strips = len(self.counts)
+        self.histograms += grid_histogram((strips, adc), self.histograms.shape)
+        self.counts += np.bincount(strips, minlength=n_strips)
+        self.sums += np.bincount(strips, weights=adc, minlength=n_strips)
+        self.sums_sq += np.bincount(strips, weights=adc.astype(np.float64)**2, minlength=n_strips)
+        self._cumulative = None
+
+    def _side_rows(self, strips=None, sides=False):
+        """ The rows of `_cumulative` for the strips, or the Pt and Al side. """
+        n_strips = len(self.counts)
+        if sides:
+            return np.array([n_strips, n_strips+1])
+        return np.arange(n_strips) if strips is None else np.asarray(strips, dtype=np.int64)
+
+    def _cumulative_counts(self):
+        """
+        The cumulative histograms of every strip then of the Pt and Al
+        sides, each lifted above the one before so all can be searched
+        in one `np.searchsorted`, and the totals of the rows.
+        """
+        if self._cumulative is None:
+            n_side = len(self.side_strip_bins)-1
+            rows = np.concatenate((self.histograms, self.histograms[:n_side].sum(axis=0, keepdims=True), self.histograms[n_side:].sum(axis=0, keepdims=True)))
+            cumulative = np.cumsum(rows, axis=1)
+            totals = cumulative[:,-1].copy()
+            lifts = np.arange(len(rows))*(np.max(totals)+1)
+            cumulative += lifts[:,None]
+            self._cumulative = (cumulative.ravel(), totals, lifts)
+        return self._cumulative
+
+    def quantile(self, q, strips=None, sides=False):
+        """
+        The ADC value at a quantile of the values held.
+
+        Parameters
+        ----------
+        q : `float`
+                The quantile (0-1), the ADC given is the lowest with at
+                least this fraction of the values at or below it. When
+                exactly this fraction is at or below a value, it is the
+                midpoint of that and the next value up, so `q=0.5` gives
+                the same as `np.median`.
+
+        strips : `list[int]`, `numpy.ndarray`
+                The strips (Pt: 0-127, Al: 128-255), all if `None`.
+                Default: None
+
+        sides : `bool`
+                Give the quantile of the Pt and the Al side as a whole
+                instead.
+                Default: False
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            The ADC value for each strip (or side), NaN with no values.
+        """
+        flat, totals, lifts = self._cumulative_counts()
+        rows = self._side_rows(strips, sides=sides)
+        n_adc = len(self.adc_bins)-1
+        targets = q*totals[rows]+lifts[rows]
+        lower = np.searchsorted(flat, targets)-rows*n_adc
+        # the next value up differs only when the quantile falls exactly between two bins
+        upper = np.searchsorted(flat, targets, side="right")-rows*n_adc
+        adc = np.where((q>0) & (upper<n_adc), (lower+upper)/2, lower)
+        return np.where(totals[rows]>0, np.minimum(adc, n_adc-1), np.nan)
+
+    def median(self, strips=None, sides=False):
+        """ The median ADC value, see `quantile`. """
+        return self.quantile(0.5, strips=strips, sides=sides)
+
+    def std(self, strips=None, sides=False):
+        """
+        The standard deviation of the ADC values of each strip (or the
+        Pt and Al side), NaN with no values.
+        """
+        if sides:
+            n_side = len(self.side_strip_bins)-1
+            counts, sums, sums_sq = [np.array([v[:n_side].sum(), v[n_side:].sum()]) for v in (self.counts, self.sums, self.sums_sq)]
+        else:
+            rows = self._side_rows(strips)
+            counts, sums, sums_sq = self.counts[rows], self.sums[rows], self.sums_sq[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = sums/counts
+            return np.sqrt(np.maximum(sums_sq/counts-mean**2, 0))
+
+    def thresholds(self, n_sigma=1, strips=None, sides=False):
+        """
+        The median plus `n_sigma` standard deviations of the ADC values
+        of each strip (or the Pt and Al side), the "simple1" threshold
+        of `CdTeCollection.single_event`.
+
+        Parameters
+        ----------
+        n_sigma : `float`
+                The number of standard deviations above the median.
+                Default: 1
+
+        strips, sides : `list[int]` or `numpy.ndarray`, `bool`
+                See `quantile`.
+                Defaults: None, False
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            The threshold for each strip (or side), NaN with no values.
+        """
+        return self.median(strips=strips, sides=sides)+n_sigma*self.std(strips=strips, sides=sides)
@@ -7,7 +7,17 @@ from copy import copy
 import numpy as np
 import matplotlib.pyplot as plt
 
+from FoGSE.telemetry_tools.parsers.CdTeparser import CDTE_DE_STATUS_LABELS
+
 class DECollection:
+    """
+    A container for CdTe DE housekeeping data after being parsed.
+
+    Holds either one record (`CdTedehkparser`) or a whole log 
+    (`CdTedehklogparser`), in which case the getters return an array 
+    with a value for every record and `time_series` pairs them with 
+    the record unixtimes.
+    """
     
     def __init__(self, parsed_data, old_data_time=0):
         # bring in the parsed data
@@ -15,8 +25,21 @@ class DECollection:
 
         self.latest_data_time = old_data_time
 
+    def is_series(self):
+        """ Whether the collection holds a log of records rather than one. """
+        return isinstance(self.parsed_data, np.ndarray)
+
     def get_status(self):
+        if self.is_series():
+            # unknown statuses (code -1) get the last label
+            return np.array(CDTE_DE_STATUS_LABELS+("...",))[self.parsed_data["status"]]
         return self.parsed_data["status"]
+
+    def get_status_code(self):
+        """ The status as its position in `CDTE_DE_STATUS_LABELS` (-1 if unknown). """
+        if self.is_series():
+            return self.parsed_data["status"]
+        return CDTE_DE_STATUS_LABELS.index(self.parsed_data["status"]) if self.parsed_data["status"] in CDTE_DE_STATUS_LABELS else -1
     
     def get_ping(self):
         return self.parsed_data["ping"]
@@ -31,4 +54,21 @@ class DECollection:
         return self.parsed_data["df_GB"]
     
     def get_unixtime(self):
-        return self.parsed_data["unixtime"]
\ No newline at end of file
+        return self.parsed_data["unixtime"]
+    
+    def time_series(self, name):
+        """
+        A housekeeping value over time.
+
+        Parameters
+        ----------
+        name : `str`
+                The value, one of "status" (as a code), "ping", "temp", 
+                "cpu", or "df_GB".
+
+        Returns
+        -------
+        `numpy.ndarray`, `numpy.ndarray` :
+            The unixtime of each record and the value for it.
+        """
+        return np.atleast_1d(self.get_unixtime()), np.atleast_1d(self.get_status_code() if name=="status" else self.parsed_data[name])
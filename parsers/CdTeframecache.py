@@ -0,0 +1,246 @@
+"""
+Cache of decoded CdTe event frames so data that is parsed again (e.g.,
+the end of a growing log on every refresh) is only decoded once.
+"""
+
+from collections import OrderedDict
+import hashlib
+import os
+import zlib
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CDTE_HIT_DTYPE, CdTeHitList, cdte_words, cdte_frame_index, cdte_frame_events, cdte_decode_events, _cdte_output_dtype, _cdte_walk_frames
+
+class CdTeFrameCache:
+    """
+    A least-recently-used cache of the decoded events of CdTe event
+    frames.
+
+    Frames are keyed by the file they came from, their byte offset in
+    it and a checksum of their words so a frame that has changed is
+    never served from the cache. Decoded frames can also be written to
+    a directory of `.npy` (`.npz` for hit lists) files, which is looked
+    in before decoding so the cache carries over between sessions.
+
+    The events handed out are the cached ones made read-only, copy them
+    to change them.
+
+    Parameters
+    ----------
+    max_frames : `int`
+            The most decoded frames kept in memory, no limit if `None`.
+            Default: None
+
+    spill_directory : `str`
+            Directory to keep decoded frames in, none are written if
+            `None`.
+            Default: None
+
+    max_bytes : `int`
+            The most bytes of decoded events kept in memory (a padded
+            frame of low-rate data is ~0.2 MB, a sparse one much less).
+            Default: 256_000_000
+
+    Example
+    -------
+    cache = CdTeFrameCache(spill_directory="cdte_cache")
+    # on every refresh
+    with readBackwards.BackwardsReader(file=directory+raw_file, blksize=20_000_000, forward=True) as f:
+        block = f.read_block()
+    Flags, event_df, all_hkdicts = cache.parse(block,
+                                               identity=CdTeFrameCache.file_identity(directory+raw_file),
+                                               offset=os.path.getsize(directory+raw_file)-len(block))
+    """
+
+    def __init__(self, max_frames=None, spill_directory=None, max_bytes=256_000_000):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.spill_directory = spill_directory
+        if spill_directory is not None:
+            os.makedirs(spill_directory, exist_ok=True)
+
+        self._frames = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, key):
+        return (key in self._frames) or ((self.spill_directory is not None) and os.path.exists(self._spill_file(key)))
+
+    @staticmethod
+    def file_identity(filename):
+        """
+        The identity of a file for the cache keys, the same while the
+        file is appended to.
+        """
+        stat = os.stat(filename)
+        return (stat.st_dev, stat.st_ino)
+
+    def frame_key(self, identity, offset, framewords, compact=False, sparse=False):
+        """
+        The cache key of a frame.
+
+        Parameters
+        ----------
+        identity : hashable
+                Where the data came from (e.g., `file_identity`).
+
+        offset : `int`
+                Byte offset of the frame start word in the source.
+
+        framewords : `numpy.ndarray`
+                The raw words of the frame.
+
+        compact, sparse : `bool`, `bool`
+                Whether the frame is decoded with the compact data type,
+                and as a `CdTeHitList`.
+                Defaults: False, False
+
+        Returns
+        -------
+        `tuple` :
+            The key.
+        """
+        # the event fields are in the key so frames kept before they changed (e.g., in `spill_directory`) are not mixed in
+        return (identity, int(offset), zlib.crc32(np.ascontiguousarray(framewords)), bool(compact), bool(sparse), _cdte_output_dtype(compact, sparse).names)
+
+    def get(self, key):
+        """ The (read-only) decoded events of a frame, `None` if not cached. """
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            return self._frames[key]
+        if self.spill_directory is not None:
+            spill_file = self._spill_file(key)
+            if os.path.exists(spill_file):
+                if key[4]:
+                    with np.load(spill_file) as spilled:
+                        events = CdTeHitList(spilled['events'], spilled['hits'])
+                else:
+                    events = np.load(spill_file)
+                self._remember(key, events)
+                return events
+        return None
+
+    def put(self, key, events):
+        """ Cache the decoded events (padded or a `CdTeHitList`) of a frame. """
+        self._remember(key, events)
+        if self.spill_directory is not None:
+            if isinstance(events, CdTeHitList):
+                np.savez(self._spill_file(key), events=events.events, hits=events.hits)
+            else:
+                np.save(self._spill_file(key), events)
+
+    def clear(self):
+        """ Empty the in-memory cache, any spilled files are left. """
+        self._frames.clear()
+        self.nbytes = 0
+
+    def decode(self, words, frames, identity=None, offset=0, compact=False, sparse=False):
+        """
+        Decode the events of a number of event frames, only decoding
+        those not already cached.
+
+        Parameters
+        ----------
+        words : `numpy.ndarray`
+                The raw data words (see `cdte_words`).
+
+        frames : `numpy.ndarray`
+                Rows from `cdte_frame_index` of valid event frames.
+
+        identity : hashable
+                Where the data came from, see `frame_key`.
+                Default: None
+
+        offset : `int`
+                Byte offset of `words` in the source.
+                Default: 0
+
+        compact : `bool`
+                Decode the events with the compact data type, see
+                `cdte_event_dtype`.
+                Default: False
+
+        sparse : `bool`
+                Decode and cache the events as `CdTeHitList`s.
+                Default: False
+
+        Returns
+        -------
+        `numpy.ndarray` or `CdTeHitList` :
+            The events of all the frames, in order.
+        """
+        dtype = _cdte_output_dtype(compact, sparse)
+        keys = [self.frame_key(identity, offset+4*frame['offset'], words[frame['offset']:frame['end']+1], compact, sparse) for frame in frames]
+        chunks = [self.get(key) for key in keys]
+
+        # decode all the missing frames together then split them back up by frame
+        missing = np.array([c is None for c in chunks], dtype=bool)
+        self.hits += int(np.sum(~missing))
+        self.misses += int(np.sum(missing))
+        if np.any(missing):
+            starts, ends, unixtime = cdte_frame_events(words, frames[missing])
+            decoded = cdte_decode_events(words, starts, ends, unixtime, dtype=dtype, sparse=sparse)
+            in_frame = np.searchsorted(frames['offset'][missing], starts)-1
+            boundaries = np.cumsum(np.bincount(in_frame, minlength=np.sum(missing)))[:-1]
+            # copies, so dropping a frame from the cache frees its memory
+            per_frame = decoded.split(boundaries) if sparse else [events.copy() for events in np.split(decoded, boundaries)]
+            for f, events in zip(np.flatnonzero(missing), per_frame):
+                self.put(keys[f], events)
+                chunks[f] = events
+
+        if sparse:
+            return CdTeHitList.concatenate(chunks) if len(chunks)>0 else CdTeHitList(np.zeros(0, dtype=dtype), np.zeros(0, dtype=CDTE_HIT_DTYPE))
+        return np.concatenate(chunks) if len(chunks)>0 else np.zeros(0, dtype=dtype)
+
+    def parse(self, datalist, identity=None, offset=0, compact=False, sparse=False):
+        """
+        Parse raw CdTe data as `CdTerawalldata2parser` does, using the
+        cache for the event frames.
+
+        Parameters
+        ----------
+        datalist : `bytes`, `bytearray`, `memoryview`, `mmap.mmap`, `numpy.ndarray`, `list[int]`
+                The raw data, see `cdte_words`.
+
+        identity, offset : hashable, `int`
+                Where the data came from and its byte offset there, see
+                `frame_key`.
+                Defaults: None, 0
+
+        compact, sparse : `bool`, `bool`
+                See `CdTerawalldata2parser`.
+                Defaults: False, False
+
+        Returns
+        -------
+        `list`, `numpy.ndarray` or `CdTeHitList`, `numpy.ndarray` :
+            As `CdTerawalldata2parser`.
+        """
+        datawords = cdte_words(datalist)
+        frames = cdte_frame_index(datawords)
+
+        flags, eventframes, all_hkdicts = _cdte_walk_frames(datawords, frames)
+
+        df = self.decode(datawords, frames[eventframes], identity=identity, offset=offset, compact=compact, sparse=sparse)
+
+        return flags,df,all_hkdicts
+
+    def _remember(self, key, events):
+        """ Keep a frame in memory (read-only), dropping the least recently used. """
+        for array in ((events.events, events.hits, events.offsets) if isinstance(events, CdTeHitList) else (events,)):
+            array.setflags(write=False)
+        if key in self._frames:
+            self.nbytes -= self._frames.pop(key).nbytes
+        self._frames[key] = events
+        self.nbytes += events.nbytes
+        while (len(self._frames)>1) and ((self.max_bytes is not None and self.nbytes>self.max_bytes) or (self.max_frames is not None and len(self._frames)>self.max_frames)):
+            self.nbytes -= self._frames.popitem(last=False)[1].nbytes
+
+    def _spill_file(self, key):
+        """ The file a frame is kept in, `.npz` for a `CdTeHitList`. """
+        return os.path.join(self.spill_directory, hashlib.sha1(repr(key).encode()).hexdigest()+(".npz" if key[4] else ".npy"))
@@ -0,0 +1,250 @@
+"""
+Random access to the frames of a (large) raw CdTe log file.
+"""
+
+import os
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CDTE_HK_FRAME, CDTE_EVENT_FRAME, CDTE_FRAME_INDEX_DTYPE, cdte_words, cdte_frame_index, cdte_frame_events, cdte_hk_registers, cdte_event_dtype, cdte_hit_event_dtype, cdte_header_dtype, cdte_decode_events
+
+# the `cdte_frame_index` fields with the number of events and first/last `ti` of each event frame
+CDTE_LOG_INDEX_DTYPE = np.dtype(CDTE_FRAME_INDEX_DTYPE.descr+[('n_events', 'u4'), ('first_ti', 'u4'), ('last_ti', 'u4')])
+
+class CdTeLogReader:
+    """
+    Memory-map a raw CdTe log and decode frames only when asked for.
+
+    The frame index is built as far into the file as it is needed, a
+    chunk at a time, so opening the file does not read it. Asking for
+    the number of frames or a time range indexes the whole file but
+    only the frames returned are decoded.
+
+    Indexing `reader[frame_no]` gives the events of an event frame (as
+    the parsers return them) or the registers of an HK frame (see
+    `cdte_hk_registers`).
+    Iterating gives every frame in turn.
+
+    Parameters
+    ----------
+    filename : `str`
+            The raw CdTe log file.
+
+    compact : `bool`
+            Return the events with the compact data type, see
+            `cdte_event_dtype`.
+            Default: False
+
+    sparse : `bool`
+            Return the events as a `CdTeHitList`, see
+            `CdTerawalldata2parser`.
+            Default: False
+
+    chunk_words : `int`
+            The number of words indexed at a time.
+            Default: 2**24
+
+    cache : `CdTeFrameCache`
+            Cache to keep the decoded event frames in, so frames read
+            again are not decoded again.
+            Default: None
+
+    Example
+    -------
+    with CdTeLogReader(directory+raw_file) as reader:
+        frame_info = reader.index[-1]
+        event_df = reader.frames_between(frame_info['unixtime']-10, frame_info['unixtime'])
+    """
+
+    def __init__(self, filename, compact=False, sparse=False, chunk_words=2**24, cache=None):
+        self.filename = filename
+        self.compact = compact
+        self.sparse = sparse
+        self.chunk_words = chunk_words
+        self.cache = cache
+
+        size = os.path.getsize(filename)
+        self.words = np.memmap(filename, dtype="<u4", mode="r", shape=(size//4,)) if size>=4 else cdte_words(b"")
+
+        # index rows found so far and the word the next chunk starts from
+        self._index_chunks = []
+        self._indexed_to = 0
+        self.indexed = len(self.words)==0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ Let go of the memory-map of the file, the reader can not be used after. """
+        self.words = cdte_words(b"")
+        self.indexed = True
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, frame_no):
+        if isinstance(frame_no, slice):
+            return [self.decode_frame(row) for row in self.index[frame_no]]
+        if frame_no<0:
+            return self.decode_frame(self.index[frame_no])
+        self._index_until(frame_no+1)
+        return self.decode_frame(self._frames()[frame_no])
+
+    def __iter__(self):
+        f = 0
+        while True:
+            self._index_until(f+1)
+            if f>=len(self._frames()):
+                return
+            yield self.decode_frame(self._frames()[f])
+            f += 1
+
+    @property
+    def index(self):
+        """ The `CDTE_LOG_INDEX_DTYPE` index of every frame in the file. """
+        while not self.indexed:
+            self._index_next_chunk()
+        return self._frames()
+
+    def frame_numbers_between(self, t0, t1):
+        """
+        The numbers of the valid event frames with a unixtime from `t0`
+        to `t1` (inclusive).
+        """
+        index = self.index
+        return np.flatnonzero(self._event_frames(index) & (index['unixtime']>=t0) & (index['unixtime']<=t1))
+
+    def frames_between(self, t0, t1):
+        """
+        Decode the events of the frames with a unixtime from `t0` to
+        `t1` (inclusive).
+
+        Parameters
+        ----------
+        t0, t1 : `int`, `int`
+                The first and last unixtime to include.
+
+        Returns
+        -------
+        `numpy.ndarray` or `CdTeHitList` :
+            The events of all the frames in the time range, in file
+            order.
+        """
+        return self.decode_events(self.index[self.frame_numbers_between(t0, t1)])
+
+    def decode_frame(self, frame):
+        """
+        Decode one frame from its index row.
+
+        Parameters
+        ----------
+        frame : `numpy.void`
+                The `index` row of the frame.
+
+        Returns
+        -------
+        `numpy.void`, `numpy.ndarray` or `CdTeHitList` :
+            The HK registers of an HK frame (`None` if it is cut off
+            by the end of the file) or the events of an event frame
+            (none if the frame is broken).
+        """
+        if frame['kind']==CDTE_HK_FRAME:
+            return cdte_hk_registers(self.words, frame) if not frame['truncated'] else None
+        return self.decode_events(np.array([frame], dtype=frame.dtype))
+
+    def decode_events(self, frames):
+        """ Decode the events of a number of event frame index rows together. """
+        frames = frames[self._event_frames(frames)]
+        if self.cache is not None:
+            return self.cache.decode(self.words, frames, identity=self.cache.file_identity(self.filename), compact=self.compact, sparse=self.sparse)
+        dtype = cdte_hit_event_dtype(compact=self.compact) if self.sparse else cdte_event_dtype(compact=self.compact)
+        return cdte_decode_events(self.words, *cdte_frame_events(self.words, frames), dtype=dtype, sparse=self.sparse)
+
+    def iter_event_headers(self):
+        """
+        Go through the file a chunk at a time, decoding only the event 
+        headers (see `cdte_header_dtype`), so a whole log can be 
+        summarised without holding its events.
+
+        Yields
+        ------
+        `numpy.ndarray`, `numpy.ndarray`, `numpy.ndarray` :
+            The `index` rows of the valid event frames of a chunk, the 
+            headers of their events and which of the rows each event is 
+            in.
+        """
+        f = 0
+        while True:
+            self._index_until(f+1)
+            index = self._frames()
+            if f>=len(index):
+                return
+            frames = index[f:]
+            f = len(index)
+
+            frames = frames[self._event_frames(frames)]
+            starts, ends, unixtime = cdte_frame_events(self.words, frames)
+            headers = cdte_decode_events(self.words, starts, ends, unixtime, dtype=cdte_header_dtype())
+            yield frames, headers, np.searchsorted(frames['offset'], starts)-1
+
+    def _event_frames(self, frames):
+        """ Mask of the complete event frames, those the parsers decode. """
+        return (frames['kind']==CDTE_EVENT_FRAME) & frames['valid']
+
+    def _frames(self):
+        """ The index built so far. """
+        if len(self._index_chunks)!=1:
+            self._index_chunks = [np.concatenate(self._index_chunks) if len(self._index_chunks)>0 else np.zeros(0, dtype=CDTE_LOG_INDEX_DTYPE)]
+        return self._index_chunks[0]
+
+    def _index_until(self, n_frames):
+        """ Index the file until there are `n_frames` frames or it ends. """
+        while (not self.indexed) and (len(self._frames())<n_frames):
+            self._index_next_chunk()
+
+    def _index_next_chunk(self):
+        """ Index the frames of the next chunk of the file. """
+        start = self._indexed_to
+        window = self.chunk_words
+        while True:
+            words = self.words[start:start+window]
+            frames = cdte_frame_index(words)
+            at_end = start+window>=len(self.words)
+            if at_end or len(frames)==0 or (not frames['truncated'][-1]) or frames['offset'][-1]>0:
+                break
+            # a frame bigger than the chunk, look further
+            window *= 2
+
+        if at_end:
+            # a frame still truncated at the end of the file stays in the index, as with the parsers
+            self._indexed_to = len(self.words)
+            self.indexed = True
+        elif len(frames)>0 and frames['truncated'][-1]:
+            # pick up an unfinished frame from its start next time
+            self._indexed_to = start+int(frames['offset'][-1])
+            frames = frames[:-1]
+        else:
+            self._indexed_to = start+len(words)
+
+        chunk_index = np.zeros(len(frames), dtype=CDTE_LOG_INDEX_DTYPE)
+        for name in CDTE_FRAME_INDEX_DTYPE.names:
+            chunk_index[name] = frames[name]
+
+        # the first and last event time in every event frame
+        event_frames = np.flatnonzero(self._event_frames(frames))
+        starts, _, _ = cdte_frame_events(words, frames[event_frames])
+        if len(starts)>0:
+            in_frame = event_frames[np.searchsorted(frames['offset'][event_frames], starts)-1]
+            ti = words[starts+1].byteswap()
+            chunk_index['n_events'] = np.bincount(in_frame, minlength=len(frames))
+            firsts = np.flatnonzero(np.diff(in_frame, prepend=-1))
+            chunk_index['first_ti'][in_frame[firsts]] = ti[firsts]
+            lasts = np.append(firsts[1:], len(in_frame))-1
+            chunk_index['last_ti'][in_frame[lasts]] = ti[lasts]
+
+        chunk_index['offset'] += start
+        chunk_index['end'] += start
+        self._index_chunks.append(chunk_index)
@@ -1,501 +1,1023 @@
 import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import struct
-import statistics
-
-def CdTerawalldata2parser(datalist):
-    framesize = 32776#;  #static const int // 32780-4 //16396-4
-    framewordsize = 8194#;static const int
-
-    eventsize = 2048#;static const int
-    noofch = 64#;static const int
-    numofchip = 16#;static const int
-    numofallch_max = 2560#;static const int
-
-    sizeofeventdatabit = 40960#;static const int
-
-    hksize = 8192#;static const int  // 10288 byte;
-    numofalladc_max = 40#;static const int
-
-    framedata=[0]*framewordsize#];unsigned int
-    eventdata=[0]*eventsize#;unsigned int
-    data=[0]*8192#;unsigned int
-    tmpdata=0#;unsigned char
-    tmpintdata=0#;unsigned int
-
-    asicdatabits=[0]*sizeofeventdatabit#;unsigned int
-
-    numofdaisychains = 4#int ;
-    numofasicperdaisychains = 1#int ;
-    numofalladc= noofch * numofasicperdaisychains * numofdaisychains#int;; // = numofdaisychains * numofasicperdaisychains
-    numofallch= numofdaisychains * numofasicperdaisychains#int ; // = noofch * numofasicperdaisychains * numofdaisychains
-
-    #array_chflag[numofalladc_max][3]#unsigned int ;
-    ##array_adc[numofalladc_max][noofch]#unsigned short ;
-    array_ref=[0]*numofalladc_max#unsigned short ;
-    array_cmn=[0]*numofalladc_max#unsigned short ;
-    #array_index[numofalladc_max][noofch];unsigned short
-    array_hitnum=[0]*numofalladc_max#;unsigned short
-    array_cmn_ex=[0]*numofalladc_max#;double
-
-    ti=0#;unsigned int
-    livetime=0#;unsigned int
-    integral_livetime=0#;unsigned int
-    trighitpat=0#;unsigned int
-    eventid=0#;unsigned int
-    hkraw=[0]*hksize#unsigned int ;
-    hk_readsize=0#;unsigned int
-    unixtime=0#;unsigned int
-    adcclkcnt=0#;unsigned short
-
-    ti_upper=0#unsigned int ;
-    ti_lower=0#;unsigned int
-    ext1ti_upper=0#;unsigned int
-    ext1ti_lower=0#unsigned int ;
-    ext2ti_upper=0#unsigned int ;
-    ext2ti_lower=0#;unsigned int
-    pseudo_counter=0#;unsigned int
-    flag_pseudo=0#;unsigned short
-    flag_forcetrig=0#;unsigned short
-    flag_bgo=0#;unsigned short
-
-    framedataok=False#bool ;
-    hkflag=False
-    eventflag=False
-    frameflag=False
-
-
-    nword=0#  int ;
-    amari=0#;  int
-    tempint=0#;//  unsigned int
-    i,j, k=0,0,0#  int ;
-    ibit=0#  int ;
-    l=0#  int ;
-    offset = 0#  int ;
-    isize = 0#  int ;
-    iasic=0#  int ;
-    idchain=0#  int ;
-    framecount = 0#  int ;
-
-
-
-    adc=[0]*noofch#unsigned short
-    ref=0#              unsigned short
-    cmn=0#              unsigned short ;
-    chflag=[0]*3#              unsigned int ;
-    index = [0]*noofch#              unsigned short ;
-    hitnum = 0#              int ;
-
-    framedataok = False
-    unixtime = 0
-    nlist=0
-    nlist_max = len(datalist)
-    eventid=0
-    #print(nlist,nlist_max)
-
-    Lti = []
-    Lunixtime = []
-    Llivetime = []
-    Ladc_al = []
-    Ladc_pt = []
-    Ladccmn_al = []
-    Ladccmn_pt = []
-    Lcmn_al=[]
-    Lcmn_pt=[]
-    Lindex_al =[]
-    Lindex_pt =[]
-    Lhitnum_al =[]
-    Lhitnum_pt =[]
-    Lflag_pseudo=[]
-    #all_array_chflag=[]
-    all_array_adc=[]
-    all_array_index=[]
+
+# raw word markers (as read with "<I") of the CdTe frame/event structure
+CDTE_FRAME_START = 0x00efcdab # low 24 bits, top byte is the frame type
+CDTE_HK_FRAME = 0x03
+CDTE_EVENT_FRAME = 0x02
+CDTE_FRAME_END = 0x2301FFFF
+CDTE_EVENT_START = 0x00003c3c # low 16 bits
+CDTE_EVENT_END = 0x77770000
+
+CDTE_FRAME_WORDS = 8194 # words after the frame start word, includes unixtime and end word
+CDTE_EVENT_MAX_WORDS = 2048
+CDTE_EVENT_HEADER_WORDS = 7
+CDTE_NUM_ASICS = 4 # Pt: 0, 1 & Al: 2, 3
+CDTE_ASIC_CHANNELS = 64
+CDTE_ADC_BITS = 10
+
+# longest bit stream one ASIC can produce (all channels hit) after word padding
+_CDTE_ASIC_MAX_BITS = 32*(-(-(80+CDTE_ADC_BITS*CDTE_ASIC_CHANNELS+CDTE_ADC_BITS+1)//32)+1)
+_CDTE_ADC_WEIGHTS = (1 << np.arange(CDTE_ADC_BITS)).astype(np.int32)
+_CDTE_DECODE_CHUNK = 8192 # events decoded per vectorised pass to bound memory
+
+# one row per hit strip of a `CdTeHitList`, `side` is 0 for Pt and 1 for Al and `strip` runs 0-127 on each
+CDTE_HIT_DTYPE = np.dtype({'names':('event_id', 'side', 'strip', 'adc', 'adc_cmn'),
+                           'formats':('u4', 'u1', 'u1', 'i2', 'i2')})
+
+# one row per frame found in a raw CdTe stream, `offset` and `end` are the word index of the start and end word
+CDTE_FRAME_INDEX_DTYPE = np.dtype({'names':('offset', 'end', 'kind', 'unixtime', 'valid', 'truncated'),
+                                   'formats':('i8', 'i8', 'u1', 'u4', '?', '?')})
+
+
+def cdte_event_dtype(pseudo_counter=False, compact=False):
+    """
+    The structured array type the CdTe event parsers return.
+
+    Parameters
+    ----------
+    pseudo_counter : `bool`
+            Include the `pseudo_counter` field (as returned by 
+            `CdTerawdataframe2parser`).
+            Default: False
+
+    compact : `bool`
+            Store the 10-bit ADC values as `int16` and the common modes 
+            as `uint16` instead of 32-bit integers, using ~45% less 
+            memory per event. The field names and shapes are the same.
+            Default: False
+
+    Returns
+    -------
+    `numpy.dtype` :
+        The event data type.
+    """
+    adc, cmn = ('i2', 'u2') if compact else ('i4', 'i4')
+    names = ['ti', 'unixtime', 'livetime', 'adc_al', 'adc_pt', 'adc_cmn_al', 'adc_cmn_pt', 'cmn_al', 'cmn_pt', 'index_al', 'index_pt', 'hitnum_al', 'hitnum_pt', 'flag_pseudo', 'ext1ti_upper', 'ext1ti_lower']
+    formats = ['u4', 'u4', 'u4', f'(128,){adc}', f'(128,){adc}', f'(128,){adc}', f'(128,){adc}', f'(2,){cmn}', f'(2,){cmn}', '(128,)u1', '(128,)u1', 'u1', 'u1', 'u1', 'u4', 'u4'] # u1==np.uint8,u4==np.uint32, i4==int32, i2==int16, u2==np.uint16
+    if pseudo_counter:
+        names.append('pseudo_counter')
+        formats.append('u4')
+    return np.dtype({'names':names, 'formats':formats})
+
+
+def cdte_header_dtype():
+    """
+    The structured array type of the CdTe event headers alone, as 
+    returned by `CdTerawalldata2parser(header_only=True)`.
+
+    Returns
+    -------
+    `numpy.dtype` :
+        The event header data type.
+    """
+    return np.dtype({'names':('ti', 'unixtime', 'livetime', 'flag_pseudo', 'ext1ti_upper', 'ext1ti_lower', 'pseudo_counter'), 
+                     'formats':('u4', 'u4', 'u4', 'u1', 'u4', 'u4', 'u4')})
+
+
+def cdte_hit_event_dtype(pseudo_counter=False, compact=False):
+    """
+    The per-event fields of a `CdTeHitList`, `cdte_event_dtype` 
+    without the arrays padded to 128 strips.
+
+    Parameters
+    ----------
+    pseudo_counter, compact : `bool`, `bool`
+            See `cdte_event_dtype`.
+            Defaults: False, False
+
+    Returns
+    -------
+    `numpy.dtype` :
+        The per-event data type.
+    """
+    dt = cdte_event_dtype(pseudo_counter=pseudo_counter, compact=compact)
+    return np.dtype([(name, dt.fields[name][0]) for name in dt.names if name not in CdTeHitList.PADDED_FIELDS])
+
+
+def cdte_words(data):
+    """
+    View raw CdTe data as the `uint32` words (read with "<I") the 
+    parsers work on.
+
+    Buffers are viewed with `np.frombuffer` so no copy is made, any 
+    trailing bytes short of a full word are ignored. Note that an 
+    `mmap` cannot be closed while a view of it is still in use.
+
+    Parameters
+    ----------
+    data : `bytes`, `bytearray`, `memoryview`, `mmap.mmap`, `numpy.ndarray`, `list[int]`
+            The raw data, or the words already unpacked.
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        The raw data words.
+    """
+    if isinstance(data, np.ndarray):
+        return data if data.dtype==np.uint32 else data.astype(np.uint32)
+    if isinstance(data, (list, tuple)):
+        return np.array(data, dtype=np.uint32)
+    return np.frombuffer(data, dtype="<u4", count=memoryview(data).nbytes//4)
+
+
+def cdte_frame_index(data):
+    """
+    Index the HK and event frames in raw CdTe data without decoding 
+    them.
+
+    The frame start and end words are found with array searches over 
+    the whole buffer. A start word is only taken as a frame if it does 
+    not sit inside the previous frame, the same as reading the data 
+    word by word. The index stops after the first truncated frame.
+
+    Parameters
+    ----------
+    data : `bytes`, `bytearray`, `memoryview`, `mmap.mmap`, `numpy.ndarray`, `list[int]`
+            The raw data, see `cdte_words`.
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        Structured array (`CDTE_FRAME_INDEX_DTYPE`) with the word 
+        `offset` of the start word, the word index of the `end` word, 
+        the frame `kind` (`CDTE_HK_FRAME` or `CDTE_EVENT_FRAME`), the 
+        event frame `unixtime` (0 for HK frames), whether the frame is 
+        `valid` (ends on `CDTE_FRAME_END`) and whether it is 
+        `truncated` by the end of the data.
+
+    Example
+    -------
+    frames = cdte_frame_index(raw)
+    event_frames = frames[(frames['kind']==CDTE_EVENT_FRAME) & frames['valid']]
+    """
+    words = cdte_words(data)
+    n = len(words)
+    candidates = np.flatnonzero((words & 0x00FFFFFF) == CDTE_FRAME_START)
+    frameends = np.flatnonzero(words == CDTE_FRAME_END)
+    kind = (words[candidates] >> 24).astype(np.uint8)
+    hk = kind == CDTE_HK_FRAME
+    event = kind == CDTE_EVENT_FRAME
+
+    # the last word of each candidate's frame, other start words only cover themselves
+    end = candidates.copy()
+    end[event] = candidates[event]+CDTE_FRAME_WORDS
+    next_end = np.searchsorted(frameends, candidates[hk]+1)
+    end[hk] = np.append(frameends, n)[next_end]
+    truncated = end >= n
+
+    # follow the frames from the first candidate, skipping candidates inside a frame
+    following = np.searchsorted(candidates, end+1)
+    if np.all(following[:-1] == np.arange(1, len(candidates))):
+        stop = np.flatnonzero(truncated)
+        path = np.arange(len(candidates) if len(stop)==0 else stop[0]+1)
+    else:
+        path = []
+        c = 0
+        while c < len(candidates):
+            path.append(c)
+            if truncated[c]:
+                break
+            c = following[c]
+        path = np.array(path, dtype=np.int64)
+    path = path[hk[path] | event[path]]
+
+    frames = np.zeros(len(path), dtype=CDTE_FRAME_INDEX_DTYPE)
+    frames['offset'] = candidates[path]
+    frames['end'] = end[path]
+    frames['kind'] = kind[path]
+    frames['truncated'] = truncated[path]
+    complete = ~frames['truncated']
+    frames['valid'] = complete & (words[np.minimum(frames['end'], n-1)] == CDTE_FRAME_END)
+    timed = frames['valid'] & (frames['kind'] == CDTE_EVENT_FRAME)
+    frames['unixtime'][timed] = words[frames['end'][timed]-1]
+    return frames
+
+
+def cdte_frame_events(words, frames):
+    """
+    Find the events in a number of event frames.
+
+    Parameters
+    ----------
+    words : `numpy.ndarray`
+            The raw data words (see `cdte_words`).
+
+    frames : `numpy.ndarray`
+            Rows from `cdte_frame_index` of valid event frames.
+
+    Returns
+    -------
+    `tuple` of `numpy.ndarray`, `numpy.ndarray`, `numpy.ndarray` :
+        The word index of the start and end word of every event and 
+        the unixtime of the frame it is in, ready for 
+        `cdte_decode_events`.
+    """
+    starts, ends, unixtime = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.uint32)]
+    for frame in frames:
+        body = frame['offset']+1
+        frame_starts, frame_ends = cdte_event_bounds(words[body:body+CDTE_FRAME_WORDS])
+        starts.append(frame_starts+body)
+        ends.append(frame_ends+body)
+        unixtime.append(np.full(len(frame_starts), frame['unixtime'], dtype=np.uint32))
+    return np.concatenate(starts), np.concatenate(ends), np.concatenate(unixtime)
+
+
+def cdte_hk_frames(words, frames):
+    """
+    The registers of a number of CdTe HK frames, one row per frame.
+
+    All the register words are gathered into one array and byte-swapped 
+    together, the result being given a field for every register (see 
+    `cdte_hk_view`).
+
+    Parameters
+    ----------
+    words : `numpy.ndarray`
+            The raw data words (see `cdte_words`).
+
+    frames : `numpy.ndarray`
+            Rows from `cdte_frame_index` of complete HK frames.
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        Structured array, one row per frame, with a `uint32` field for 
+        each register named by its position in the frame as a 4-digit 
+        hex string ("0000", "0001", ...). Frames shorter than the 
+        longest are padded with zeros.
+
+    Example
+    -------
+    hk = cdte_hk_frames(words, frames[frames['kind']==CDTE_HK_FRAME])
+    register_0010 = hk['0010'] # for every frame
+    registers = cdte_hk_array(hk) # as a (frames, registers) array
+    """
+    lengths = (frames['end']-frames['offset']-1).astype(np.int64)
+    width = int(np.max(lengths)) if len(frames)>0 else 0
+    inside = np.arange(width) < lengths[:,None]
+
+    registers = np.zeros((len(frames), width), dtype=np.uint32)
+    registers[inside] = words[(frames['offset'][:,None]+1+np.arange(width))[inside]]
+    # registers are big-endian
+    registers.byteswap(inplace=True)
+    return cdte_hk_view(registers)
+
+
+def cdte_hk_view(registers):
+    """
+    View a `(frames, registers)` `uint32` array of HK registers as a 
+    structured array with a field for each register (named "0000", 
+    "0001", ...), without copying it.
+
+    Parameters
+    ----------
+    registers : `numpy.ndarray`
+            The registers, one row per frame.
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        The structured array, one row per frame.
+    """
+    registers = np.ascontiguousarray(registers, dtype=np.uint32)
+    if registers.shape[1]==0:
+        return np.zeros(len(registers), dtype=np.dtype({'names':[], 'formats':[]}))
+    names = [format(i,"04x") for i in range(registers.shape[1])]
+    return registers.view(np.dtype({'names':names, 'formats':['u4']*len(names)}))[:,0]
+
+
+def cdte_hk_array(hk):
+    """ The `(frames, registers)` `uint32` array behind a `cdte_hk_frames` result. """
+    return hk.view(np.uint32).reshape(len(hk), -1)
+
+
+def cdte_hk_registers(words, frame):
+    """
+    The registers of one CdTe HK frame.
+
+    Parameters
+    ----------
+    words : `numpy.ndarray`
+            The raw data words (see `cdte_words`).
+
+    frame : `numpy.void`
+            The `cdte_frame_index` row of a complete HK frame.
+
+    Returns
+    -------
+    `numpy.void` :
+        The frame row of `cdte_hk_frames`, registers looked up as 
+        `registers['0010']`.
+    """
+    return cdte_hk_frames(words, np.array([frame], dtype=frame.dtype))[0]
+
+
+def cdte_event_bounds(framewords):
+    """
+    Find the events in the body of a CdTe event frame.
+
+    An event starts on a word with `CDTE_EVENT_START` in its lower 16 
+    bits and finishes on the next `CDTE_EVENT_END` word. Start words 
+    found inside an event are skipped and an event longer than 
+    `CDTE_EVENT_MAX_WORDS` is dropped, the search restarting one word 
+    after its start.
+
+    Parameters
+    ----------
+    framewords : `numpy.ndarray`
+            The `CDTE_FRAME_WORDS` (raw, "<I") words after the frame 
+            start word.
+
+    Returns
+    -------
+    `tuple` of `numpy.ndarray`, `numpy.ndarray` :
+        The indices of the start and end words of each event in 
+        `framewords`.
+    """
+    framewords = np.asarray(framewords, dtype=np.uint32)
+    candidates = np.flatnonzero((framewords & 0x0000FFFF) == CDTE_EVENT_START)
+    ends = np.flatnonzero(framewords == CDTE_EVENT_END)
+
+    # the end word each candidate would finish on, no end means the frame ran out
+    next_end = np.searchsorted(ends, candidates)
+    complete = next_end < len(ends)
+    cand_ends = np.full(len(candidates), len(framewords))
+    cand_ends[complete] = ends[next_end[complete]]
+
+    # a candidate is a real start if an end word sits between it and the previous candidate
+    accepted = np.ones(len(candidates), dtype=bool)
+    accepted[1:] = next_end[1:] > next_end[:-1]
+
+    over_long = (cand_ends-candidates >= CDTE_EVENT_MAX_WORDS) & (candidates+CDTE_EVENT_MAX_WORDS < len(framewords))
+    if not np.any(over_long & accepted):
+        keep = accepted & complete
+        return candidates[keep], cand_ends[keep]
+
+    # an over-long event restarts the search inside itself so walk the candidates in order
+    starts, stops = [], []
+    position = 0
+    for c, e, o in zip(candidates, cand_ends, over_long):
+        if c < position:
+            continue
+        if o:
+            position = c+1
+            continue
+        if e >= len(framewords):
+            break
+        starts.append(c)
+        stops.append(e)
+        position = e
+    return np.array(starts, dtype=np.int64), np.array(stops, dtype=np.int64)
+
+
+def cdte_decode_events(words, starts, ends, unixtime, dtype=None, sparse=False):
+    """
+    Decode CdTe events into the parser structured array.
+
+    All events are decoded together with array operations: the ASIC 
+    payloads are expanded with `np.unpackbits` and every field is 
+    gathered with shift-and-mask, one ASIC (daisy chain) at a time, 
+    across all events.
+
+    Parameters
+    ----------
+    words : `numpy.ndarray`
+            The raw ("<I") `uint32` words holding the events.
+
+    starts, ends : `numpy.ndarray`, `numpy.ndarray`
+            Index in `words` of the start and end word of every event 
+            (see `cdte_event_bounds`).
+
+    unixtime : `numpy.ndarray`, `int`
+            The frame unixtime for each event.
+
+    dtype : `numpy.dtype`
+            The structured type to fill, fields not present are not 
+            decoded.
+            Default: `cdte_event_dtype()` or `cdte_hit_event_dtype()` 
+            if `sparse`
+
+    sparse : `bool`
+            Return the hit strips as a `CdTeHitList` instead of 
+            padding every event to 128 strips a side.
+            Default: False
+
+    Returns
+    -------
+    `numpy.ndarray` or `CdTeHitList` :
+        The events.
+    """
+    if dtype is None:
+        dtype = cdte_hit_event_dtype() if sparse else cdte_event_dtype()
+    words = np.asarray(words, dtype=np.uint32)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    unixtime = np.broadcast_to(np.asarray(unixtime, dtype=np.uint32), starts.shape)
+
+    df = np.zeros(len(starts), dtype=dtype)
+    hits = [np.zeros(0, dtype=CDTE_HIT_DTYPE)]
+    for c in range(0, len(starts), _CDTE_DECODE_CHUNK):
+        chunk = slice(c, c+_CDTE_DECODE_CHUNK)
+        chunk_hits = _cdte_decode_event_chunk(df[chunk], words, starts[chunk], ends[chunk], unixtime[chunk], hits=sparse)
+        if sparse:
+            chunk_hits['event_id'] += c
+            hits.append(chunk_hits)
+
+    if sparse:
+        return CdTeHitList(df, np.concatenate(hits))
+    return df
+
+
+def _cdte_decode_event_chunk(df, words, starts, ends, unixtime, hits=False):
+    """ 
+    Fill `df` in place from one chunk of events, returning the hit 
+    list of the chunk if `hits`. 
+    """
+    if len(starts)==0:
+        return np.zeros(0, dtype=CDTE_HIT_DTYPE)
+    names = df.dtype.names
+
+    # header words are big-endian, the byte-swap of the raw word
+    header = words[starts[:,None]+np.arange(1, CDTE_EVENT_HEADER_WORDS)].byteswap()
+    if 'ti' in names:
+        df['ti'] = header[:,0]
+    if 'unixtime' in names:
+        df['unixtime'] = unixtime
+    if 'livetime' in names:
+        df['livetime'] = header[:,1]
+    if 'flag_pseudo' in names:
+        df['flag_pseudo'] = header[:,2] & 0x00000001
+    if 'ext1ti_upper' in names:
+        df['ext1ti_upper'] = header[:,3]
+    if 'ext1ti_lower' in names:
+        df['ext1ti_lower'] = header[:,4]
+    if 'pseudo_counter' in names:
+        df['pseudo_counter'] = header[:,5]
+    padded = 'index_pt' in names
+    if not (padded or hits or {'cmn_pt', 'cmn_al', 'hitnum_pt', 'hitnum_al'}.intersection(names)):
+        # only the header was asked for, no need to touch the ASIC data
+        return
+
+    bits, bitoffset = _cdte_payload_bits(words, starts, ends)
+
+    n = len(starts)
+    channels = np.arange(CDTE_ASIC_CHANNELS)
+    adc_bits = np.arange(CDTE_ADC_BITS)
+    if padded:
+        index = np.full((2, n, 2*CDTE_ASIC_CHANNELS), 2*CDTE_ASIC_CHANNELS, dtype=np.uint8)
+        adc = np.zeros((2, n, 2*CDTE_ASIC_CHANNELS), dtype=np.int32)
+        adc_cmn = np.zeros((2, n, 2*CDTE_ASIC_CHANNELS), dtype=np.int32)
+    cmn = np.zeros((2, n, 2), dtype=np.int32)
+    hitnum = np.zeros((2, n), dtype=np.int64)
+    asic_hit_lists = []
+
+    for asic in range(CDTE_NUM_ASICS):
+        side, half = divmod(asic, 2)
+
+        # second bit says whether the ASIC was read out, else only 5 bits are sent
+        readout = bits[bitoffset+1].astype(bool)
+        flags = bits[(bitoffset+5)[:,None]+channels].astype(bool) & readout[:,None]
+        asic_hits = np.sum(flags, axis=1)
+        rank = np.cumsum(flags, axis=1)-1
+        evt, chan = np.nonzero(flags)
+        hit = rank[evt, chan]
+
+        # 10-bit values are sent least significant bit first
+        hit_adc = bits[(bitoffset[evt]+80+CDTE_ADC_BITS*hit)[:,None]+adc_bits].astype(np.int32) @ _CDTE_ADC_WEIGHTS
+        asic_cmn = bits[(bitoffset+80+CDTE_ADC_BITS*asic_hits)[:,None]+adc_bits].astype(np.int32) @ _CDTE_ADC_WEIGHTS
+        asic_cmn[~readout] = 0
+
+        # hits from the second ASIC on a side follow on from the first
+        slot = hit+hitnum[side][evt]
+        strip = chan+CDTE_ASIC_CHANNELS*half
+        if padded:
+            index[side][evt, slot] = strip
+            adc[side][evt, slot] = hit_adc
+            adc_cmn[side][evt, slot] = hit_adc-asic_cmn[evt]
+        if hits:
+            asic_hit_lists.append((evt, np.full(len(evt), side), strip, slot, hit_adc, hit_adc-asic_cmn[evt]))
+        cmn[side][:, half] = asic_cmn
+        hitnum[side] += asic_hits
+
+        bitoffset = np.where(readout, bitoffset+80+CDTE_ADC_BITS*asic_hits+CDTE_ADC_BITS+1, bitoffset+5)
+        bitoffset = -(-bitoffset//32)*32+32
+
+    for side, name in enumerate(("pt", "al")):
+        for field, values in (('cmn_', cmn), ('hitnum_', hitnum)):
+            if field+name in names:
+                df[field+name] = values[side]
+        if padded:
+            for field, values in (('index_', index), ('adc_', adc), ('adc_cmn_', adc_cmn)):
+                if field+name in names:
+                    df[field+name] = values[side]
+
+    if not hits:
+        return
+    # order the hits by event, then Pt before Al, then as in the padded arrays
+    evt, side, strip, slot, hit_adc, hit_adc_cmn = [np.concatenate(h) for h in zip(*asic_hit_lists)]
+    order = np.lexsort((slot, side, evt))
+    chunk_hits = np.zeros(len(order), dtype=CDTE_HIT_DTYPE)
+    chunk_hits['event_id'] = evt[order]
+    chunk_hits['side'] = side[order]
+    chunk_hits['strip'] = strip[order]
+    chunk_hits['adc'] = hit_adc[order]
+    chunk_hits['adc_cmn'] = hit_adc_cmn[order]
+    return chunk_hits
+
+
+def _cdte_payload_bits(words, starts, ends):
+    """
+    The bits of the ASIC payloads of events, and the bit each event's 
+    payload starts at.
+
+    The payload is read most significant bit first from the file bytes. 
+    Events more than a frame apart (e.g., frames picked out of a log) 
+    are unpacked as separate runs of words so the words between them 
+    are never expanded to bits. Each run is followed by enough zeros 
+    for the longest ASIC data.
+    """
+    order = np.argsort(starts, kind="stable")
+    run_starts, run_ends = starts[order], np.maximum.accumulate(ends[order])
+    new_run = np.concatenate(([True], run_starts[1:]>run_ends[:-1]+CDTE_FRAME_WORDS))
+    run = np.cumsum(new_run)-1
+    firsts = run_starts[new_run]+CDTE_EVENT_HEADER_WORDS
+    lasts = np.maximum(firsts, run_ends[np.concatenate((np.flatnonzero(new_run)[1:]-1, [len(order)-1]))])
+
+    pieces, run_bits = [], np.zeros(len(firsts), dtype=np.int64)
+    for r, (first, last) in enumerate(zip(firsts, lasts)):
+        payload = np.ascontiguousarray(words[first:last], dtype='<u4')
+        pieces += [np.unpackbits(payload.view(np.uint8)), np.zeros(CDTE_NUM_ASICS*_CDTE_ASIC_MAX_BITS, dtype=np.uint8)]
+        run_bits[r] = 32*(last-first)+CDTE_NUM_ASICS*_CDTE_ASIC_MAX_BITS
+
+    bitoffset = np.zeros(len(starts), dtype=np.int64)
+    bitoffset[order] = (np.cumsum(run_bits)-run_bits)[run]+(run_starts+CDTE_EVENT_HEADER_WORDS-firsts[run])*32
+    return np.concatenate(pieces), bitoffset
+
+
+class CdTeHitList:
+    """
+    CdTe events with only the strips that were hit, rather than every 
+    event padded out to 128 strips a side.
+
+    The hits of all events are kept in one flat table (CSR-style) with 
+    `offsets[i]:offsets[i+1]` giving the hits of event `i`, the Pt-side 
+    hits first. Per-event fields are read as with the padded array 
+    (e.g., `hit_list['ti']`) and asking for a padded field (e.g., 
+    `hit_list['index_pt']`) builds it.
+
+    Parameters
+    ----------
+    events : `numpy.ndarray`
+            The per-event fields (`cdte_hit_event_dtype`).
+
+    hits : `numpy.ndarray`
+            The hits (`CDTE_HIT_DTYPE`) ordered by event, side (Pt=0, 
+            Al=1), then in the padded array order.
+
+    offsets : `numpy.ndarray`
+            Index of the first hit of each event, one longer than 
+            `events`. Worked out from the hit numbers if not given.
+            Default: None
+    """
+
+    PADDED_FIELDS = ('adc_al', 'adc_pt', 'adc_cmn_al', 'adc_cmn_pt', 'index_al', 'index_pt')
+
+    def __init__(self, events, hits, offsets=None):
+        self.events = events
+        self.hits = hits
+        if offsets is None:
+            offsets = np.zeros(len(events)+1, dtype=np.int64)
+            np.cumsum(events['hitnum_pt'].astype(np.int64)+events['hitnum_al'], out=offsets[1:])
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.events)
+
+    def __getitem__(self, key):
+        if key in self.events.dtype.names:
+            return self.events[key]
+        if key in self.PADDED_FIELDS:
+            return self.padded()[key]
+        raise KeyError(key)
+
+    @property
+    def dtype(self):
+        """ The per-event data type. """
+        return self.events.dtype
+
+    @property
+    def nbytes(self):
+        """ The bytes held by the events, hits and offsets. """
+        return self.events.nbytes+self.hits.nbytes+self.offsets.nbytes
+
+    def side_hits(self, side):
+        """ The hits of one side, 0 (or "pt") for Pt and 1 (or "al") for Al. """
+        side = {"pt":0, "al":1}.get(side, side)
+        return self.hits[self.hits['side']==side]
+
+    def hit_slots(self):
+        """ Where each hit sits along its side in the padded arrays. """
+        event_id = self.hits['event_id']
+        pt_hits = self.events['hitnum_pt'][event_id].astype(np.int64)
+        return np.arange(len(self.hits))-self.offsets[event_id]-np.where(self.hits['side']==1, pt_hits, 0)
+
+    def padded(self, dtype=None):
+        """
+        Build the padded event array the parsers return by default.
+
+        Parameters
+        ----------
+        dtype : `numpy.dtype`
+                The event data type.
+                Default: `cdte_event_dtype` matching the per-event fields
+
+        Returns
+        -------
+        `numpy.ndarray` :
+            The structured array of events.
+        """
+        names = self.events.dtype.names
+        if dtype is None:
+            dtype = cdte_event_dtype(pseudo_counter='pseudo_counter' in names, compact=self.events['cmn_pt'].dtype==np.uint16)
+        df = np.zeros(len(self), dtype=dtype)
+        for name in names:
+            if name in dtype.names:
+                df[name] = self.events[name]
+
+        slots = self.hit_slots()
+        for side, name in enumerate(("pt", "al")):
+            on_side = self.hits['side']==side
+            evt, slot, hits = self.hits['event_id'][on_side], slots[on_side], self.hits[on_side]
+            index = np.full((len(self), 2*CDTE_ASIC_CHANNELS), 2*CDTE_ASIC_CHANNELS, dtype=np.uint8)
+            index[evt, slot] = hits['strip']
+            df['index_'+name] = index
+            for field in ('adc', 'adc_cmn'):
+                values = np.zeros((len(self), 2*CDTE_ASIC_CHANNELS), dtype=df[field+'_'+name].dtype)
+                values[evt, slot] = hits[field]
+                df[field+'_'+name] = values
+        return df
+
+    @classmethod
+    def from_padded(cls, df):
+        """
+        Make the hit list of a padded event array.
+
+        Parameters
+        ----------
+        df : `numpy.ndarray`
+                The structured array of events from the parsers.
+
+        Returns
+        -------
+        `CdTeHitList` :
+            The events as a hit list.
+        """
+        events = np.zeros(len(df), dtype=np.dtype([(name, df.dtype.fields[name][0]) for name in df.dtype.names if name not in cls.PADDED_FIELDS]))
+        for name in events.dtype.names:
+            events[name] = df[name]
+
+        sides = []
+        for side, name in enumerate(("pt", "al")):
+            evt, slot = np.nonzero(np.arange(2*CDTE_ASIC_CHANNELS) < df['hitnum_'+name][:,None])
+            sides.append((evt, np.full(len(evt), side), slot, df['index_'+name][evt, slot], df['adc_'+name][evt, slot], df['adc_cmn_'+name][evt, slot]))
+        evt, side, slot, strip, adc, adc_cmn = [np.concatenate(s) for s in zip(*sides)]
+        order = np.lexsort((slot, side, evt))
+
+        hits = np.zeros(len(order), dtype=CDTE_HIT_DTYPE)
+        hits['event_id'] = evt[order]
+        hits['side'] = side[order]
+        hits['strip'] = strip[order]
+        hits['adc'] = adc[order]
+        hits['adc_cmn'] = adc_cmn[order]
+        return cls(events, hits)
+
+    @classmethod
+    def concatenate(cls, hit_lists):
+        """ Join a number of hit lists, in order, into one. """
+        hit_lists = list(hit_lists)
+        events = np.concatenate([h.events for h in hit_lists])
+        hits = np.concatenate([h.hits for h in hit_lists])
+        # move the event numbers on by the events before each list
+        first_event = np.cumsum([0]+[len(h) for h in hit_lists[:-1]])
+        hits['event_id'] += np.repeat(first_event, [len(h.hits) for h in hit_lists]).astype(np.uint32)
+        return cls(events, hits)
+
+    def split(self, indices):
+        """ Split into a number of hit lists before the given events, as `np.split`. """
+        bounds = np.concatenate(([0], np.asarray(indices, dtype=np.int64), [len(self)]))
+        hit_lists = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            hits = self.hits[self.offsets[start]:self.offsets[stop]].copy()
+            hits['event_id'] -= np.uint32(start)
+            hit_lists.append(CdTeHitList(self.events[start:stop].copy(), hits, self.offsets[start:stop+1]-self.offsets[start]))
+        return hit_lists
+
+
+def CdTerawalldata2parser(datalist, compact=False, sparse=False, header_only=False):
+    """
+    Parse all HK and event frames in raw CdTe data.
+
+    The frames are located with `cdte_frame_index` and the events of 
+    every event frame are then decoded together by 
+    `cdte_decode_events`.
+
+    Parameters
+    ----------
+    datalist : `bytes`, `bytearray`, `memoryview`, `mmap.mmap`, `numpy.ndarray`, `list[int]`
+            The raw data, see `cdte_words`. Buffers are used directly 
+            so there is no need to unpack them into a list first.
+
+    compact : `bool`
+            Return the events with the compact data type, see 
+            `cdte_event_dtype`.
+            Default: False
+
+    sparse : `bool`
+            Return the events as a `CdTeHitList` of only the hit strips
+            rather than padded to 128 strips a side.
+            Default: False
+
+    header_only : `bool`
+            Only read the event headers (`cdte_header_dtype`), skipping 
+            the ASIC data, for quick count rate and livetime values. 
+            Takes precedence over `compact` and `sparse`.
+            Default: False
+
+    Returns
+    -------
+    `list`, `numpy.ndarray` or `CdTeHitList`, `numpy.ndarray` :
+        The `[hkflag, eventflag, errorflag]` flags, the structured 
+        array of events, and the registers of every HK frame (see 
+        `cdte_hk_frames`, e.g., `all_hkdicts[0]['0010']`).
+    """
+    datawords = cdte_words(datalist)
+    frames = cdte_frame_index(datawords)
+
+    flags, eventframes, all_hkdicts = _cdte_walk_frames(datawords, frames)
+
+    # decode the events from all frames in one go
+    if header_only:
+        df = cdte_decode_events(datawords, *cdte_frame_events(datawords, frames[eventframes]), dtype=cdte_header_dtype())
+    else:
+        df = cdte_decode_events(datawords, *cdte_frame_events(datawords, frames[eventframes]), dtype=_cdte_output_dtype(compact, sparse), sparse=sparse)
+
+    return flags,df,all_hkdicts
+
+
+def _cdte_output_dtype(compact, sparse, pseudo_counter=False):
+    """ The event data type the parsers return. """
+    if sparse:
+        return cdte_hit_event_dtype(pseudo_counter=pseudo_counter, compact=compact)
+    return cdte_event_dtype(pseudo_counter=pseudo_counter, compact=compact)
+
+
+def _cdte_walk_frames(datawords, frames):
+    """ 
+    Go through the indexed frames as `CdTerawalldata2parser` does, 
+    decoding the HK frames and picking out the event frames to decode.
+    """
     hkflag=False
     eventflag=False
     errorflag=False
 
-    all_hkdicts=[]
+    hkframes=np.zeros(len(frames), dtype=bool)
+    eventframes=np.zeros(len(frames), dtype=bool)
 
+    for f, frame in enumerate(frames):
+        #-----------------------------------------------HK  DATA----------------------------------------------------------------
+        if(frame['kind'] == CDTE_HK_FRAME):# //11
+            print("hkstart")
+            if(frame['truncated']):
+                print("************ERROR: STOP in PROCESSING HK DATA, ***********************",len(datawords),len(datawords))
+                break
 
+            print("hk finish")
+            hkflag=True
+            hkframes[f]=True
 
+       #-----------------------------------------------Detector  DATA----------------------------------------------------------------
+        elif(frame['kind'] == CDTE_EVENT_FRAME):#//10
+            print("eventframestart")
+            if(frame['truncated']):
+                print("************Caution: STOP in PROCESSING EVENT DATA, LAST FRAME is BROKEN***********************",frame['offset']+1,len(datawords))
+                errorflag=True
+                break
 
-    while(True):
-        if(nlist>=nlist_max):
-           # print("************END: ALL DATA IS PROCESSED *********************")
-            break
+            if(not frame['valid']):
+                errorflag=True
+                print("************ERROR: FRAME DATA STRUCTURE( OF THE END) IS NOT CORRECT************")
+                continue
 
-        tmpintdata=datalist[nlist]
-        nlist+=1
-        if( (tmpintdata & 0x00FFFFFF) != 0x00efcdab ):
-            continue
+            eventframes[f]=True
+            eventflag=True
 
-        tmpdata = (tmpintdata & 0xFF000000) >> 24#;                //11111111000000000000000000000000(1*8,0*24)
-        #print(tmpdata)
+    if(eventflag and hkflag):
+        errorflag = True
+        print("CAUTION!! : INPUT DATA IS FRAME DATA? BOTH HK AND EVENT DATA ARE FOUND")
 
-        #-----------------------------------------------HK  DATA----------------------------------------------------------------
-        if(tmpdata == 0x03):# //11
-            print("hkstart")
-            i=0
-            while(True):
-                if(nlist>=nlist_max):
-                    print("************ERROR: STOP in PROCESSING HK DATA, ***********************",nlist,nlist_max)
-                    errorflag=False
-                    break
+    flags=[hkflag,eventflag, errorflag]
 
-                data[0]=datalist[nlist]
-                nlist+=1
+    # decode the registers of all HK frames in one go
+    all_hkdicts = cdte_hk_frames(datawords, frames[hkframes])
 
-                if(data[0] == 0x2301FFFF):
-                    print("hk finish")
-                    hkflag=True
-                    hk_readsize = i
-                    #print(hkraw,hk_readsize)
-                    list1=[format(i,"04x") for i in range(hk_readsize)]
-                    #hktree->Fill();
-                    framecount+=1
-                    all_hkdicts.append(dict(zip(list1,hkraw)))
-                    #if(eventflag and hkflag):
-                        #errorflag = True
-                        #print("CAUTION!! : INPUT DATA IS FRAME DATA? BOTH HK AND EVENT DATA ARE FOUND")
-                    #return Flags,dict(zip(list1,hkraw))
-                    break
+    return flags,eventframes,all_hkdicts
 
 
-                else:
-                    hkraw[i] = ((data[0]&0xff000000)>>24) + ((data[0]&0x00ff0000)>>8)+ ((data[0]&0x0000ff00)<<8)+ ((data[0]&0x000000ff)<<24)#
-                    i+=1
 
+def CdTeparallelparser(data, max_workers=None, frames_per_batch=64, compact=False, sparse=False):
+    """
+    Parse raw CdTe data as `CdTerawalldata2parser` does but decode the 
+    event frames in batches across a pool of processes.
 
+    The data is split on frame boundaries from `cdte_frame_index`, each 
+    batch of frames is decoded by a worker and the results are joined 
+    back together in order. Giving a file name lets every worker read 
+    its own part of the file rather than being sent it.
 
+    Parameters
+    ----------
+    data : `str`, `bytes`, `bytearray`, `memoryview`, `mmap.mmap`, `numpy.ndarray`
+            The raw data file name or the raw data (see `cdte_words`).
 
-       #-----------------------------------------------Detector  DATA----------------------------------------------------------------
+    max_workers : `int`
+            The number of worker processes, `None` for one per CPU.
+            Default: None
 
-        elif(tmpdata == 0x02):#//10
-            print("eventframestart")
-            
-            if(nlist+framewordsize>nlist_max):
-                print("************Caution: STOP in PROCESSING EVENT DATA, LAST FRAME is BROKEN***********************",nlist,nlist_max)
-                errorflag=True
-                break
-            
-            framedata=datalist[nlist:nlist+framewordsize+1]
-            nlist+=framewordsize
-        
-            try:
-                if( not((framedata[framewordsize-1] == 0x2301FFFF))):
-                    errorflag=True
-                    print("************ERROR: FRAME DATA STRUCTURE( OF THE END) IS NOT CORRECT************")
-
-                else:
-                    unixtime =  framedata[framewordsize-2]
-                    framedataok = True
-                    
-            except IndexError:
-                # to test full files being artificially split-up  - kris
-                print("A non-full frame was encountered.")
-                break
+    frames_per_batch : `int`
+            The number of event frames decoded by a worker at a time.
+            Default: 64
 
-            if(framedataok):
-                j=0
-                framecount+=1
-                while(True):
-                    while( (framedata[j] & 0x0000FFFF) != 0x00003c3c and j<framewordsize):
-                        j+=1
-                        if(j>=framewordsize):
-                            break
-                    i=0
-                    offset = j
-                    
-                    if(j>=framewordsize):
-                        print("eventframe end! Sum of Nevent:",eventid)
-                        eventflag=True
-                        break
-
-                    while(framedata[j] != 0x77770000 and i<eventsize and  j<framewordsize):
-                        eventdata[i] = ((framedata[j]&0xff000000)>>24)+ ((framedata[j]&0x00ff0000)>>8)+ ((framedata[j]&0x0000ff00)<<8)+ ((framedata[j]&0x000000ff)<<24)
-                        j+=1
-                        i+=1
-                    isize = i
-
-                    if(j>=framewordsize):
-                        print("eventframe end! Sum of Nevent:",eventid)
-                        eventflag=True
-                        break
-
-                    if(i >= eventsize):
-                        j = offset +1
-
-                    elif(j<framewordsize):
-                        ti = eventdata[1]
-                        livetime = eventdata[2]
-                        integral_livetime = (eventdata[3] & 0xffff0000) >>16
-                        flag_pseudo = (eventdata[3] & 0x00000001)
-                        flag_forcetrig = (eventdata[3] & 0x00000002) >> 1
-                        flag_bgo = (eventdata[3] & 0x0000003c) >> 2
-                        trighitpat = (eventdata[3] & 0x0000ffc0) >> 6
-                        adcclkcnt = 0
-
-                        pseudo_counter = eventdata[6]
-                        ti_upper = 0
-                        ti_lower = 0
-                        ext1ti_upper = eventdata[4]
-                        ext1ti_lower = eventdata[5]
-                        ext2ti_upper = 0
-                        ext2ti_lower = 0
-
-                        #if(eventid ==1):
-                            #print(ti,livetime,integral_livetime,trighitpat)
-
-                        #for(i=0;i<sizeofeventdatabit;i++):
-                            #asicdatabits[i] = 0
-
-                        for ibit in range(32*(isize-7)):
-                            amari = ibit%32
-                            nword =7+(ibit-amari)//32
-                            asicdatabits[ibit] = (eventdata[nword] >> (31-amari)) & 0x00000001
-
-                        bitoffset = 0;
-                        for idchain in range(numofdaisychains):
-                            for iasic in range(numofasicperdaisychains):
-                                adc=[0]*noofch#unsigned short
-                                ref=0#              unsigned short
-                                cmn=0#              unsigned short ;
-                                chflag=[0]*3#              unsigned int ;
-                                index = [0]*noofch#              unsigned short ;
-                                hitnum = 0#              int ;
-                                chflag[0] = (asicdatabits[0+bitoffset] << 31)+ (asicdatabits[1+bitoffset]<<30)+ (asicdatabits[2+bitoffset]<<29)+ (asicdatabits[3+bitoffset]<<28)
-
-                                if(asicdatabits[1+bitoffset] == 0):
-                                    chflag[0] += (asicdatabits[4+bitoffset]<< 27)
-                                    bitoffset += 5
-                                else:
-                                    chflag[0] += (asicdatabits[4+bitoffset]<<1)
-                                    chflag[1] =0
-                                    chflag[2] =0
-                                    for l in range(noofch):
-                                        if(l<32):
-                                            chflag[1] += (asicdatabits[5+l+bitoffset] << (31-l))
-                                        else:
-                                            chflag[2] += (asicdatabits[5+l+bitoffset] << (63-l))
-                                        if(asicdatabits[5+l+bitoffset]==1):
-                                            #print(hitnum)
-                                            index[hitnum] = l
-                                            hitnum+=1
-
-                                    chflag[0] += (asicdatabits[69+bitoffset])
-
-                                    for l in range(10):
-                                        ref += (asicdatabits[70+l+bitoffset] << l)
-                                        for i in range(hitnum):
-                                            adc[i] += (asicdatabits[80+10*i+l+bitoffset] << l)
-                                        cmn += (asicdatabits[80+10*hitnum+l+bitoffset] << l)
-
-                                    chflag[0] += (asicdatabits[80+10*hitnum+10+bitoffset]<< 27)
-                                    bitoffset += (80+10*hitnum+10+1)
-
-                                k= iasic + idchain * numofasicperdaisychains;
-                                #print(k, iasic , idchain)
-
-                                #if( not(eventid % 1000) and k==0):
-                                    #print(eventid)
-                                if(k==0):
-                                    array_chflag=[]
-                                    array_adc=[]
-                                    array_adccmn=[]
-                                    array_index=[]
-                                    array_cmn=[]
-
-                                array_chflag.append([chflag[0],chflag[1],chflag[2]])
-                                array_cmn_ex[k] =statistics.median(adc)
-                                array_ref[k] = ref
-                                array_hitnum[k] = hitnum
-
-                                if(k==0):
-                                    array_adc.append([])
-                                    array_adccmn.append([])
-                                    array_index.append([])
-                                    array_cmn.append([])
-                                    for i in range(hitnum):
-                                        array_adc[0].append(adc[i])
-                                        array_adccmn[0].append(adc[i]-cmn)
-                                        array_index[0].append(index[i])
-                                    array_cmn[0].append(cmn)
-
-                                elif(k==1):
-                                    for i in range(hitnum):
-                                        array_adc[0].append(adc[i])
-                                        array_adccmn[0].append(adc[i]-cmn)
-                                        array_index[0].append(index[i]+64)
-                                    array_cmn[0].append(cmn)
-                                    if(array_hitnum[0]+array_hitnum[1]<noofch*2):
-                                        for i in range(noofch*2-(array_hitnum[0]+array_hitnum[1])):
-                                            array_adc[0].append(0)
-                                            array_adccmn[0].append(0)
-                                            array_index[0].append(128)
-                                    
-
-                                elif(k==2):
-                                    array_adc.append([])
-                                    array_adccmn.append([])
-                                    array_index.append([])
-                                    array_cmn.append([])
-                                    for i in range(hitnum):
-                                        array_adc[1].append(adc[i])
-                                        array_adccmn[1].append(adc[i]-cmn)
-                                        array_index[1].append(index[i])
-                                    array_cmn[1].append(cmn)
-
-                                elif(k==3):
-                                    for i in range(hitnum):
-                                        array_adc[1].append(adc[i])
-                                        array_adccmn[1].append(adc[i]-cmn)
-                                        array_index[1].append(index[i]+64)
-                                    array_cmn[1].append(cmn)
-                                    if(array_hitnum[2]+array_hitnum[3]<noofch*2):
-                                        for i in range(noofch*2-(array_hitnum[2]+array_hitnum[3])):
-                                            array_adc[1].append(0)
-                                            array_adccmn[1].append(0)
-                                            array_index[1].append(128)
-
-                                #if (eventid == 1):
-                                    #print(iasic,idchain,k,i, array_index,array_adccmn)
-
-                                
-
-                            if (bitoffset % 32 != 0):
-                                bitoffset += (32 - bitoffset % 32)
-                            bitoffset += 32
-                    eventid+=1
-
-
-                    hitnum_al = array_hitnum[2]+array_hitnum[3]
-                    hitnum_pt = array_hitnum[0]+array_hitnum[1]
-
-                    Lti.append(ti)
-                    #print(unixtime)
-                    Lunixtime.append(unixtime)
-                    Llivetime.append(livetime)
-                    Ladc_al.append(array_adc[1])
-                    Ladc_pt.append(array_adc[0])
-                    Ladccmn_al.append(array_adccmn[1])
-                    Ladccmn_pt.append(array_adccmn[0])
-                    Lcmn_al.append(array_cmn[1])
-                    Lcmn_pt.append(array_cmn[0])
-                    Lindex_al.append(array_index[1])
-                    Lindex_pt.append(array_index[0])
-                    Lhitnum_al.append(hitnum_al)
-                    Lhitnum_pt.append(hitnum_pt)
-                    Lflag_pseudo.append(flag_pseudo)
+    compact : `bool`
+            Return the events with the compact data type, see 
+            `cdte_event_dtype`.
+            Default: False
 
+    sparse : `bool`
+            Return the events as a `CdTeHitList` of only the hit strips
+            rather than padded to 128 strips a side.
+            Default: False
 
-    if(eventflag and hkflag):
-        errorflag = True
-        print("CAUTION!! : INPUT DATA IS FRAME DATA? BOTH HK AND EVENT DATA ARE FOUND")
+    Returns
+    -------
+    `list`, `numpy.ndarray` or `CdTeHitList`, `numpy.ndarray` :
+        As `CdTerawalldata2parser`.
 
-    # # Example of Numpy structured array
-    # >> dt = np.dtype({'names':('t',"y"),'formats':('(3,)f4', 'i4')})
-    # >> data = np.zeros(3, dtype=dt)
-    # >> data['t'] = np.array([[1,2,3],[4,5,6],[7,8,9]])
-    # >> data['y'] = np.array([56,87,23])
-    # >> data
-    # array([([1., 2., 3.], 56), ([4., 5., 6.], 87), ([7., 8., 9.], 23)],
-    #   dtype=[('t', '<f4', (3,)), ('y', '<i4')])
-
-    evt_num = len(Lti)
-    dt = np.dtype({'names':('ti', 'unixtime', 'livetime', 'adc_al', 'adc_pt', 'adc_cmn_al', 'adc_cmn_pt', 'cmn_al', 'cmn_pt', 'index_al', 'index_pt', 'hitnum_al', 'hitnum_pt', 'flag_pseudo'),
-                   'formats':('u4', 'u4', 'u4', '(128,)i4', '(128,)i4', '(128,)i4', '(128,)i4', '(2,)i4', '(2,)i4', '(128,)u1', '(128,)u1', 'u1', 'u1', 'u1')}) # u1==np.uint8,u4==np.uint32, i4==int32
-    df = np.zeros(evt_num, dtype=dt)
-    df['ti'] = np.array(Lti,dtype=np.uint32)
-    df['unixtime'] = np.array(Lunixtime,dtype=np.uint32)
-    df['livetime'] = np.array(Llivetime,dtype=np.uint32)
-    df['adc_al'] = np.array(Ladc_al,dtype=np.int32)
-    df['adc_pt'] = np.array(Ladc_pt,dtype=np.int32)
-    df['adc_cmn_al'] = np.array(Ladccmn_al,dtype=np.int32)
-    df['adc_cmn_pt'] = np.array(Ladccmn_pt,dtype=np.int32)
-    df['cmn_al'] = np.array(Lcmn_al,dtype=np.uint32)
-    df['cmn_pt'] = np.array(Lcmn_pt,dtype=np.uint32)
-    df['index_al'] = np.array(Lindex_al,dtype=np.uint8)
-    df['index_pt'] = np.array(Lindex_pt,dtype=np.uint8)
-    df['hitnum_al'] = np.array(Lhitnum_al,dtype=np.uint8)
-    df['hitnum_pt'] = np.array(Lhitnum_pt,dtype=np.uint8)
-    df['flag_pseudo'] = np.array(Lflag_pseudo,dtype=np.uint8)
+    Example
+    -------
+    if __name__=="__main__":
+        Flags, event_df, all_hkdicts = CdTeparallelparser(directory+raw_file, max_workers=8)
+    """
+    if isinstance(data, (str, os.PathLike)):
+        # map the file rather than read it all in, the workers read their own part
+        size = os.path.getsize(data)
+        datawords = np.memmap(data, dtype="<u4", mode="r", shape=(size//4,)) if size>=4 else cdte_words(b"")
+    else:
+        datawords = cdte_words(data)
+    frames = cdte_frame_index(datawords)
+
+    flags, eventframes, all_hkdicts = _cdte_walk_frames(datawords, frames)
+    eventframes = frames[eventframes]
+
+    batches = []
+    for b in range(0, len(eventframes), frames_per_batch):
+        batch = eventframes[b:b+frames_per_batch].copy()
+        first, last = batch['offset'][0], batch['end'][-1]+1
+        batch['offset'] -= first
+        batch['end'] -= first
+        source = (os.fspath(data), 4*first, 4*last) if isinstance(data, (str, os.PathLike)) else datawords[first:last].tobytes()
+        batches.append((source, batch, compact, sparse))
+
+    if len(batches)<=1 or max_workers==1:
+        chunks = [_cdte_decode_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunks = list(executor.map(_cdte_decode_batch, batches))
 
-    flags=[hkflag,eventflag, errorflag]
+    if sparse:
+        df = CdTeHitList.concatenate(chunks) if len(chunks)>0 else cdte_decode_events(datawords, [], [], [], dtype=_cdte_output_dtype(compact, sparse), sparse=True)
+    else:
+        df = np.concatenate(chunks) if len(chunks)>0 else np.zeros(0, dtype=_cdte_output_dtype(compact, sparse))
 
     return flags,df,all_hkdicts
 
 
+def _cdte_decode_batch(batch):
+    """ 
+    Decode a batch of event frames, the data is either given or a 
+    (file name, start byte, stop byte) to read it from. 
+    """
+    source, frames, compact, sparse = batch
+    if isinstance(source, tuple):
+        filename, start, stop = source
+        with open(filename, "rb") as f:
+            f.seek(start)
+            source = f.read(stop-start)
+    words = cdte_words(source)
+    return cdte_decode_events(words, *cdte_frame_events(words, frames), dtype=_cdte_output_dtype(compact, sparse), sparse=sparse)
+
+
+# size of a canister HK record in bytes
+CDTE_CANISTER_HK_SIZE = 816
+
+# byte offset of the DAQ parameters in a canister HK record, and of each parameter in them
+# all values from https://github.com/foxsi/CdTe_DE/blob/main/fig/DAQ_parameter_address.png
+CDTE_CANISTER_DAQ_OFFSET = 0x18
+CDTE_CANISTER_DAQ_PARAMS = {
+    "hv_exec":              0x00,
+    "hv_set":               0x04,
+    "data_copy_rate":       0x08,
+    "pseudo_onoff0":        0x0c,
+    "pseudo_rate0":         0x10,
+    "va_status":            0x20,
+    "module_status":        0x24,
+    "enable_flag":          0x38,
+    "extern_input_mode":    0x3c,
+    "peaking_time":         0x40,
+    "adc_clock_period":     0x44,
+    "readout_period":       0x48,     # may also be readout delay??
+    "trigpat_latch_timing": 0x54,
+    "reset_wait_time1":     0x58,
+    "reset_wait_time2":     0x5c,
+    "ti":                   0x60,
+    "integral_livetime":    0x64,
+    "deadtime":             0x68,
+    "test_data":            0x6c,
+    "cald_trigger_request": 0x70,
+    "ti_upper32":           0x90,
+    "ti_lower32":           0x94,
+    "ti_upper32_next":      0x98,
+    "timecode":             0x9c,
+    "ext1_ti_upper32":      0xa0,
+    "ext1_ti_lower32":      0xa4,
+    "ext2_ti_upper32":      0xb0,
+    "ext2_ti_lower32":      0xb4,
+    "pseudo_onoff1":        0xc0,
+    "pseudo_rate1":         0xc4,
+    "pseudo_counter":       0xc8,
+    "write_ptr":            0xd0,
+    "write_ptr_reset_req":  0xd4,
+}
+
+# lookup status label by raw status bytes
+CDTE_CANISTER_STATUS = {
+    b"\x5a\x5a\x01\x00\x00\x00\x00\x00\x5a\x5a\x5a\x5a": "idle",
+    b"\x5a\x5a\x01\x00\x01\x01\x01\x01\x5a\x5a\x5a\x5a": "started",
+    b"\x5a\x5a\x01\x00\x01\x01\x00\x00\x5a\x5a\x5a\x5a": "started/pointer reset",
+    b"\x5a\x5a\x01\x00\x02\x02\x02\x02\x5a\x5a\x5a\x5a": "stopped",
+    b"\x5a\x5a\x01\x00\x03\x03\x00\x00\x5a\x5a\x5a\x5a": "HV = 0 V",
+    b"\x5a\x5a\x01\x00\x03\x03\x01\x01\x5a\x5a\x5a\x5a": "HV = 60 V",
+    b"\x5a\x5a\x01\x00\x03\x03\x02\x02\x5a\x5a\x5a\x5a": "HV = 100 V",
+    b"\x5a\x5a\x01\x00\x03\x03\x03\x03\x5a\x5a\x5a\x5a": "HV = 200 V",
+    b"\x5a\x5a\x01\x00\x06\x06\x06\x06\x5a\x5a\x5a\x5a": "DAQ param update",
+    b"\x5a\x5a\x01\x00\x07\x07\x07\x07\x5a\x5a\x5a\x5a": "ASIC param update",
+    b"\x5a\x5a\x01\x00\x05\x05\x05\x05\x5a\x5a\x5a\x5a": "ended"
+}
+
+# the status label of each status code `CdTecanisterhklogparser` gives, -1 is an unknown status
+CDTE_CANISTER_STATUS_LABELS = tuple(CDTE_CANISTER_STATUS.values())
+
+# convert raw high voltage DAC setting to voltage
+CDTE_CANISTER_HV = {
+    0   : "0 V",
+    1600: "60 V",
+    2000: "100 V",
+    3500: "200 V",
+}
+
+# a canister HK record as it is in the file (big-endian), for `np.frombuffer`
+CDTE_CANISTER_HK_RECORD_DTYPE = np.dtype({'names':['status_raw', 'write_pointer', 'frame_count', 'unread_can_frame_count']+list(CDTE_CANISTER_DAQ_PARAMS),
+                                          'formats':['S12', '>u4', '>u4', '>u4']+['>u4']*len(CDTE_CANISTER_DAQ_PARAMS),
+                                          'offsets':[0, 0x314, 0x318, 0x32c]+[CDTE_CANISTER_DAQ_OFFSET+o for o in CDTE_CANISTER_DAQ_PARAMS.values()],
+                                          'itemsize':CDTE_CANISTER_HK_SIZE})
+
+# one row per canister HK record from `CdTecanisterhklogparser`, `status` is a code for `CDTE_CANISTER_STATUS_LABELS` and `hv` is in volts (-1 for both if unknown)
+CDTE_CANISTER_HK_DTYPE = np.dtype({'names':['status', 'hv']+list(CDTE_CANISTER_HK_RECORD_DTYPE.names[1:]),
+                                   'formats':['i1', 'i2']+['>u4']*(len(CDTE_CANISTER_HK_RECORD_DTYPE.names)-1)})
+
 
 def CdTecanisterhkparser(data: bytes):
     error_flag = False
-    frame_size = 816
+    frame_size = CDTE_CANISTER_HK_SIZE
     if len(data) % frame_size != 0:
         print("CdTecanisterhkparser() expects a input length to be a multiple of", frame_size)
         error_flag = True
         return [{},error_flag]
     
     # pull out data region for the DAQ parameters
-    daq_data = data[0x18:0xf0]
+    daq_data = data[CDTE_CANISTER_DAQ_OFFSET:0xf0]
     # pull out raw status bytes, frame data write pointer, and written frame counter
     status_raw          = data[0     :   0x0c]
     write_pointer_raw   = data[0x314 :   0x314+4]
     frame_count_raw     = data[0x318 :   0x318+4]
     unread_can_frame_count_raw  = data[0x32c :   0x32c+4]
     
-    # all values from https://github.com/foxsi/CdTe_DE/blob/main/fig/DAQ_parameter_address.png
-    daq_param_map = {
-        "hv_exec":              int.from_bytes(daq_data[0x00 : 0x00+4], 'big'),
-        "hv_set":               int.from_bytes(daq_data[0x04 : 0x04+4], 'big'),
-        "data_copy_rate":       int.from_bytes(daq_data[0x08 : 0x08+4], 'big'),
-        "pseudo_onoff0":        int.from_bytes(daq_data[0x0c : 0x0c+4], 'big'),
-        "pseudo_rate0":         int.from_bytes(daq_data[0x10 : 0x10+4], 'big'),
-        "va_status":            int.from_bytes(daq_data[0x20 : 0x20+4], 'big'),
-        "module_status":        int.from_bytes(daq_data[0x24 : 0x24+4], 'big'),
-        "enable_flag":          int.from_bytes(daq_data[0x38 : 0x38+4], 'big'),
-        "extern_input_mode":    int.from_bytes(daq_data[0x3c : 0x3c+4], 'big'),
-        "peaking_time":         int.from_bytes(daq_data[0x40 : 0x40+4], 'big'),
-        "adc_clock_period":     int.from_bytes(daq_data[0x44 : 0x44+4], 'big'),
-        "readout_period":       int.from_bytes(daq_data[0x48 : 0x48+4], 'big'),     # may also be readout delay??
-        "trigpat_latch_timing": int.from_bytes(daq_data[0x54 : 0x54+4], 'big'),
-        "reset_wait_time1":     int.from_bytes(daq_data[0x58 : 0x58+4], 'big'),
-        "reset_wait_time2":     int.from_bytes(daq_data[0x5c : 0x5c+4], 'big'),
-        "ti":                   int.from_bytes(daq_data[0x60 : 0x60+4], 'big'),
-        "integral_livetime":    int.from_bytes(daq_data[0x64 : 0x64+4], 'big'),
-        "deadtime":             int.from_bytes(daq_data[0x68 : 0x68+4], 'big'),
-        "test_data":            int.from_bytes(daq_data[0x6c : 0x6c+4], 'big'),
-        "cald_trigger_request": int.from_bytes(daq_data[0x70 : 0x70+4], 'big'),
-        "ti_upper32":           int.from_bytes(daq_data[0x90 : 0x90+4], 'big'),
-        "ti_lower32":           int.from_bytes(daq_data[0x94 : 0x94+4], 'big'),
-        "ti_upper32_next":      int.from_bytes(daq_data[0x98 : 0x98+4], 'big'),
-        "timecode":             int.from_bytes(daq_data[0x9c : 0x9c+4], 'big'),
-        "ext1_ti_upper32":      int.from_bytes(daq_data[0xa0 : 0xa0+4], 'big'),
-        "ext1_ti_lower32":      int.from_bytes(daq_data[0xa4 : 0xa4+4], 'big'),
-        "ext2_ti_upper32":      int.from_bytes(daq_data[0xb0 : 0xb0+4], 'big'),
-        "ext2_ti_lower32":      int.from_bytes(daq_data[0xb4 : 0xb4+4], 'big'),
-        "pseudo_onoff1":        int.from_bytes(daq_data[0xc0 : 0xc0+4], 'big'),
-        "pseudo_rate1":         int.from_bytes(daq_data[0xc4 : 0xc4+4], 'big'),
-        "pseudo_counter":       int.from_bytes(daq_data[0xc8 : 0xc8+4], 'big'),
-        "write_ptr":            int.from_bytes(daq_data[0xd0 : 0xd0+4], 'big'),
-        "write_ptr_reset_req":  int.from_bytes(daq_data[0xd4 : 0xd4+4], 'big'),
-    }
-
-    # lookup status label by raw status bytes
-    status_converter = {
-        b"\x5a\x5a\x01\x00\x00\x00\x00\x00\x5a\x5a\x5a\x5a": "idle",
-        b"\x5a\x5a\x01\x00\x01\x01\x01\x01\x5a\x5a\x5a\x5a": "started",
-        b"\x5a\x5a\x01\x00\x01\x01\x00\x00\x5a\x5a\x5a\x5a": "started/pointer reset",
-        b"\x5a\x5a\x01\x00\x02\x02\x02\x02\x5a\x5a\x5a\x5a": "stopped",
-        b"\x5a\x5a\x01\x00\x03\x03\x00\x00\x5a\x5a\x5a\x5a": "HV = 0 V",
-        b"\x5a\x5a\x01\x00\x03\x03\x01\x01\x5a\x5a\x5a\x5a": "HV = 60 V",
-        b"\x5a\x5a\x01\x00\x03\x03\x02\x02\x5a\x5a\x5a\x5a": "HV = 100 V",
-        b"\x5a\x5a\x01\x00\x03\x03\x03\x03\x5a\x5a\x5a\x5a": "HV = 200 V",
-        b"\x5a\x5a\x01\x00\x06\x06\x06\x06\x5a\x5a\x5a\x5a": "DAQ param update",
-        b"\x5a\x5a\x01\x00\x07\x07\x07\x07\x5a\x5a\x5a\x5a": "ASIC param update",
-        b"\x5a\x5a\x01\x00\x05\x05\x05\x05\x5a\x5a\x5a\x5a": "ended"
-    }
+    daq_param_map = {name: int.from_bytes(daq_data[offset : offset+4], 'big') for name, offset in CDTE_CANISTER_DAQ_PARAMS.items()}
 
     default_status = "..."
-    status = status_converter.get(status_raw, default_status)
+    status = CDTE_CANISTER_STATUS.get(status_raw, default_status)
     error_flag = True if status==default_status else error_flag
 
     # convert raw write_pointer and frame_count to `int`
@@ -503,14 +1025,7 @@ def CdTecanisterhkparser(data: bytes):
     frame_count = int.from_bytes(frame_count_raw, 'big')
     unread_can_frame_count = int.from_bytes(unread_can_frame_count_raw, 'big')
 
-    # convert raw high voltage DAC setting to voltage
-    hv_set_converter = {
-        0   : "0 V",
-        1600: "60 V",
-        2000: "100 V",
-        3500: "200 V",
-    }
-    hv = hv_set_converter[daq_param_map["hv_set"]]
+    hv = CDTE_CANISTER_HV[daq_param_map["hv_set"]]
 
     # create output dict
     parsed_data = {
@@ -527,10 +1042,136 @@ def CdTecanisterhkparser(data: bytes):
     return parsed_data, error_flag
 
 
+def CdTecanisterhklogparser(data):
+    """
+    Parse every record of a canister HK log at once.
+
+    The records are read with one `np.frombuffer` call using the field 
+    offsets in `CDTE_CANISTER_HK_RECORD_DTYPE`, then the status bytes 
+    and HV setting are turned into codes for all records together.
+
+    Parameters
+    ----------
+    data : `bytes`, `bytearray`, `memoryview`, `mmap.mmap`
+            The canister HK log, `CDTE_CANISTER_HK_SIZE` bytes a record. 
+            An incomplete record at the end is ignored.
+
+    Returns
+    -------
+    `numpy.ndarray`, `numpy.ndarray` :
+        The structured array of records (`CDTE_CANISTER_HK_DTYPE`) and 
+        an error flag for each record (an unknown status).
+
+    Example
+    -------
+    with open(hk_file, "rb") as f:
+        canister_hk, error_flags = CdTecanisterhklogparser(f.read())
+    plt.plot(canister_hk['frame_count'])
+    status_labels = np.array(CDTE_CANISTER_STATUS_LABELS+("...",))[canister_hk['status']]
+    """
+    records = np.frombuffer(data, dtype=CDTE_CANISTER_HK_RECORD_DTYPE, count=len(data)//CDTE_CANISTER_HK_SIZE)
+
+    parsed_data = np.zeros(len(records), dtype=CDTE_CANISTER_HK_DTYPE)
+    parsed_data['status'] = _cdte_lookup_codes(records['status_raw'], list(CDTE_CANISTER_STATUS))
+    # code -1 picks out the -1 volts on the end
+    hv_volts = np.array([int(v.split()[0]) for v in CDTE_CANISTER_HV.values()]+[-1])
+    parsed_data['hv'] = hv_volts[_cdte_lookup_codes(records['hv_set'], list(CDTE_CANISTER_HV))]
+    for name in CDTE_CANISTER_HK_RECORD_DTYPE.names[1:]:
+        parsed_data[name] = records[name]
+
+    return parsed_data, parsed_data['status']<0
+
+
+def cdte_canister_ti64(canister_hk, counter="ext1"):
+    """
+    The 64-bit `ti` counter values of canister HK records.
+
+    Parameters
+    ----------
+    canister_hk : `numpy.ndarray`
+            Records from `CdTecanisterhklogparser`.
+
+    counter : `str`
+            Which counter, "ext1" or "ext2" (the `ti` latched on an
+            external input) or "" (the `ti` when the record was made).
+            Default: "ext1"
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        The `uint64` counter of each record, e.g. for the `anchor` of
+        `cdte_timeline`.
+    """
+    prefix = f"{counter}_" if counter else ""
+    upper = canister_hk[f"{prefix}ti_upper32"].astype(np.uint64)
+    lower = canister_hk[f"{prefix}ti_lower32"].astype(np.uint64)
+    return (upper<<np.uint64(32))|lower
+
+
+def cdte_event_ext1ti64(events):
+    """
+    The 64-bit external `ti` counter (ext1) of events, latched from the 
+    canister clock when each event triggered.
+
+    Parameters
+    ----------
+    events : `numpy.ndarray` or `CdTeHitList`
+            Events with the `ext1ti_upper` and `ext1ti_lower` fields.
+
+    Returns
+    -------
+    `numpy.ndarray` :
+        The `uint64` counter of each event, e.g. for the `ext1ti` of 
+        `cdte_timeline`.
+    """
+    upper = np.asarray(events['ext1ti_upper']).astype(np.uint64)
+    lower = np.asarray(events['ext1ti_lower']).astype(np.uint64)
+    return (upper<<np.uint64(32))|lower
+
+
+def _cdte_lookup_codes(values, table):
+    """ The position in `table` of each of `values`, -1 if not there. """
+    table = np.array(table, dtype=values.dtype)
+    if len(values)==0 or len(table)==0:
+        return np.full(len(values), -1, dtype=np.int64)
+    found = values[:,None]==table[None,:]
+    return np.where(np.any(found, axis=1), np.argmax(found, axis=1), -1)
+
+
+# size of a DE HK record in bytes
+CDTE_DE_HK_SIZE = 32
+
+# lookup status label by raw status bytes
+CDTE_DE_STATUS = {
+    b"\x5a\x5a\x01\x00\x00\x00\x00\x00\x5a\x5a\x5a\x5a": "idle",
+    b"\x5a\x5a\x01\x00\x01\x01\x01\x01\x5a\x5a\x5a\x5a": "init",
+    b"\x5a\x5a\x01\x00\x02\x02\x02\x02\x5a\x5a\x5a\x5a": "standby",
+    b"\x5a\x5a\x01\x00\x03\x03\x03\x03\x5a\x5a\x5a\x5a": "observe",
+    b"\x5a\x5a\x01\x00\x04\x04\x04\x04\x5a\x5a\x5a\x5a": "end",
+    b"\x5a\x5a\x01\x00\x07\x07\x07\x07\x5a\x5a\x5a\x5a": "ping update",
+    b"\x5a\x5a\x01\x01\x01\x01\x01\x01\x5a\x5a\x5a\x5a": "start/pointer reset",
+    b"\x5a\x5a\x01\x01\x01\x01\x02\x02\x5a\x5a\x5a\x5a": "start",
+    b"\x5a\x5a\x01\x01\x02\x02\x02\x02\x5a\x5a\x5a\x5a": "stop",
+    b"\x5a\x5a\x01\x01\x05\x05\x05\x05\x5a\x5a\x5a\x5a": "canisters stopped",
+}
+
+# the status label of each status code `CdTedehklogparser` gives, -1 is an unknown status
+CDTE_DE_STATUS_LABELS = tuple(CDTE_DE_STATUS.values())
+
+# a DE HK record as it is in the file (big-endian), for `np.frombuffer`
+CDTE_DE_HK_RECORD_DTYPE = np.dtype({'names':['status_raw', 'ping', 'temp', 'cpu', 'df_GB', 'unixtime'],
+                                    'formats':['S12', '(4,)u1', '>u4', '>u4', '>u4', '>u4'],
+                                    'offsets':[0, 0x0c, 0x10, 0x14, 0x18, 0x1c],
+                                    'itemsize':CDTE_DE_HK_SIZE})
+
+# one row per DE HK record from `CdTedehklogparser`, `status` is a code for `CDTE_DE_STATUS_LABELS` (-1 if unknown) and `ping` has a byte for each canister
+CDTE_DE_HK_DTYPE = np.dtype({'names':['status', 'ping', 'temp', 'cpu', 'df_GB', 'unixtime'],
+                             'formats':['i1', '(4,)u1', '>u4', '>u4', '>u4', '>u4']})
+
 
 def CdTedehkparser(data: bytes):
     error_flag = False
-    frame_size = 32
+    frame_size = CDTE_DE_HK_SIZE
     if len(data) % frame_size != 0:
         print("CdTecanisterhkparser() expects a input length to be a multiple of", frame_size)
         error_flag = True
@@ -543,22 +1184,8 @@ def CdTedehkparser(data: bytes):
     df_raw          = data[0x18  :   0x18+4]
     unixtime_raw    = data[0x1c  :   0x1c+4]
 
-    # lookup status label by raw status bytes
-    status_converter = {
-        b"\x5a\x5a\x01\x00\x00\x00\x00\x00\x5a\x5a\x5a\x5a": "idle",
-        b"\x5a\x5a\x01\x00\x01\x01\x01\x01\x5a\x5a\x5a\x5a": "init",
-        b"\x5a\x5a\x01\x00\x02\x02\x02\x02\x5a\x5a\x5a\x5a": "standby",
-        b"\x5a\x5a\x01\x00\x03\x03\x03\x03\x5a\x5a\x5a\x5a": "observe",
-        b"\x5a\x5a\x01\x00\x04\x04\x04\x04\x5a\x5a\x5a\x5a": "end",
-        b"\x5a\x5a\x01\x00\x07\x07\x07\x07\x5a\x5a\x5a\x5a": "ping update",
-        b"\x5a\x5a\x01\x01\x01\x01\x01\x01\x5a\x5a\x5a\x5a": "start/pointer reset",
-        b"\x5a\x5a\x01\x01\x01\x01\x02\x02\x5a\x5a\x5a\x5a": "start",
-        b"\x5a\x5a\x01\x01\x02\x02\x02\x02\x5a\x5a\x5a\x5a": "stop",
-        b"\x5a\x5a\x01\x01\x05\x05\x05\x05\x5a\x5a\x5a\x5a": "canisters stopped",
-    }
-
     default_status = "..."
-    status = status_converter.get(status_raw, default_status)
+    status = CDTE_DE_STATUS.get(status_raw, default_status)
     error_flag = True if status==default_status else error_flag
 
     ping = [can_ping for can_ping in ping_raw]
@@ -579,19 +1206,55 @@ def CdTedehkparser(data: bytes):
     return parsed_data, error_flag
 
 
+def CdTedehklogparser(data):
+    """
+    Parse every record of a CdTe DE HK log at once.
+
+    The records are read with one `np.frombuffer` call using the field 
+    offsets in `CDTE_DE_HK_RECORD_DTYPE` and the status bytes of all 
+    records are turned into codes together.
+
+    Parameters
+    ----------
+    data : `bytes`, `bytearray`, `memoryview`, `mmap.mmap`
+            The DE HK log, `CDTE_DE_HK_SIZE` bytes a record. An 
+            incomplete record at the end is ignored.
+
+    Returns
+    -------
+    `numpy.ndarray`, `numpy.ndarray` :
+        The structured array of records (`CDTE_DE_HK_DTYPE`) and an 
+        error flag for each record (an unknown status).
+
+    Example
+    -------
+    with open(hk_file, "rb") as f:
+        de_hk = DECollection(CdTedehklogparser(f.read()))
+    plt.plot(*de_hk.time_series("temp"))
+    """
+    records = np.frombuffer(data, dtype=CDTE_DE_HK_RECORD_DTYPE, count=len(data)//CDTE_DE_HK_SIZE)
+
+    parsed_data = np.zeros(len(records), dtype=CDTE_DE_HK_DTYPE)
+    parsed_data['status'] = _cdte_lookup_codes(records['status_raw'], list(CDTE_DE_STATUS))
+    for name in CDTE_DE_HK_RECORD_DTYPE.names[1:]:
+        parsed_data[name] = records[name]
+
+    return parsed_data, parsed_data['status']<0
+
+
 
 if __name__ == "__main__":
     if len(sys.argv) > 2:
         with open(sys.argv[2], 'rb') as hk_file:
             data = hk_file.read()
             if "can" in sys.argv[1]:
-                for i in range(0,len(data),0x31c):
-                    print(i)
-                    CdTecanisterhkparser(data[i:i+0x31c])
+                canister_hk, error_flags = CdTecanisterhklogparser(data)
+                for i, record in enumerate(canister_hk):
+                    print(i*CDTE_CANISTER_HK_SIZE, record)
             elif "de" in sys.argv[1]:
-                for i in range(0,len(data),0x20):
-                    print(i)
-                    CdTedehkparser(data[i:i+0x20])
+                de_hk, error_flags = CdTedehklogparser(data)
+                for i, record in enumerate(de_hk):
+                    print(i*CDTE_DE_HK_SIZE, record)
             else:
                 print("usage:\n>\tpython CdTeparser.py <cdtede | canister> path/to/hk/file.log")
     else:
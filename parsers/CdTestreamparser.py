@@ -0,0 +1,167 @@
+"""
+Incremental parsing of a CdTe raw data stream, e.g., a growing log file.
+"""
+
+import os
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CDTE_FRAME_START, CDTE_HK_FRAME, CdTerawalldata2parser, cdte_words, cdte_frame_index
+
+# a HK frame still missing its end word after this many words is given up on
+CDTE_HK_MAX_WORDS = 8192
+
+class CdTeStreamDecoder:
+    """
+    Decode CdTe frames as the raw data arrives.
+
+    Bytes are fed in as they are read and only the frames completed by
+    them are parsed. Any partial frame at the end of a feed is kept and
+    finished by the next one so no frame is lost at a read boundary.
+
+    Parameters
+    ----------
+    filename : `str`
+            File to read the new data from with `feed_file`.
+            Default: None
+
+    compact : `bool`
+            Return the events with the compact data type, see 
+            `cdte_event_dtype`.
+            Default: False
+
+    sparse : `bool`
+            Return the events as a `CdTeHitList`, see 
+            `CdTerawalldata2parser`.
+            Default: False
+
+    header_only : `bool`
+            Only read the event headers, see `CdTerawalldata2parser`.
+            Default: False
+
+    start : `str`
+            Where the first `feed_file` reads `filename` from: "tail" 
+            for the last `blksize` bytes (as the GSE has read the file 
+            so far), "end" for only what is written after, or 
+            "beginning" for the whole file. Reading starts at the first 
+            frame start after this point.
+            Default: "tail"
+
+    blksize : `int`
+            The number of bytes read from the end of the file with 
+            `start="tail"`.
+            Default: 20_000_000
+
+    Example
+    -------
+    decoder = CdTeStreamDecoder(filename=directory+raw_file)
+    # on every refresh
+    Flags, event_df, all_hkdicts = decoder.feed_file()
+    if len(event_df)>0:
+        cdte_data = CdTeCollection((Flags, event_df, all_hkdicts))
+    """
+
+    def __init__(self, filename=None, compact=False, sparse=False, header_only=False, start="tail", blksize=20_000_000):
+        if start not in ("tail", "end", "beginning"):
+            raise ValueError(f"Start {start} is not one of ('tail', 'end', 'beginning').")
+        self.filename = filename
+        self.compact = compact
+        self.sparse = sparse
+        self.header_only = header_only
+        self.start = start
+        self.blksize = blksize
+
+        # position in `filename` read up to, set from `start` on the first read, and whether it is at a frame start yet
+        self.file_position = None
+        self._aligned = False
+
+        # bytes of a frame that has not been completed yet
+        self._pending = b""
+
+        self.frame_count = 0
+
+    def feed(self, data):
+        """
+        Parse the frames completed by some new raw data.
+
+        Parameters
+        ----------
+        data : `bytes`, `bytearray`, `memoryview`, `mmap.mmap`
+                The raw data following on from the previous feed.
+
+        Returns
+        -------
+        `list`, `numpy.ndarray`, `numpy.ndarray` :
+            As `CdTerawalldata2parser` but only for the frames
+            completed by `data`.
+        """
+        buffer = data if len(self._pending)==0 else self._pending+bytes(data)
+        words = cdte_words(buffer)
+        frames = cdte_frame_index(words)
+
+        # keep everything from an unfinished frame (or the partial last word) for next time
+        keep_from = len(words)
+        if len(frames)>0 and frames['truncated'][-1]:
+            keep_from = int(frames['offset'][-1])
+            if (frames['kind'][-1]==CDTE_HK_FRAME) and (len(words)-keep_from>CDTE_HK_MAX_WORDS+1):
+                # an HK frame never going to find its end word
+                keep_from += 1
+        self._pending = bytes(memoryview(buffer)[4*keep_from:])
+        self.frame_count += int(np.sum(frames['offset']<keep_from))
+
+        return CdTerawalldata2parser(memoryview(buffer)[:4*keep_from], compact=self.compact, sparse=self.sparse, header_only=self.header_only)
+
+    def feed_file(self, filename=None):
+        """
+        Parse the frames completed by data written to the file since
+        the last read.
+
+        Parameters
+        ----------
+        filename : `str`
+                The file to read, defaults to the one given on
+                initialisation.
+                Default: None
+
+        Returns
+        -------
+        `list`, `numpy.ndarray`, `numpy.ndarray` :
+            As `feed`.
+        """
+        filename = self.filename if filename is None else filename
+        if self.file_position is None:
+            self.file_position = self._start_position(filename)
+            self._aligned = self.file_position==0
+        with open(filename, "rb") as f:
+            f.seek(self.file_position)
+            data = f.read()
+        self.file_position += len(data)
+
+        if not self._aligned:
+            # started part way into the file, skip to the first frame start
+            starts = np.flatnonzero((cdte_words(data) & 0x00FFFFFF) == CDTE_FRAME_START)
+            if len(starts)==0:
+                # all in the middle of a frame, read the last partial word again next time
+                self.file_position -= len(data)%4
+                data = b""
+            else:
+                data = memoryview(data)[4*int(starts[0]):]
+                self._aligned = True
+        return self.feed(data)
+
+    def _start_position(self, filename):
+        """ The (word aligned) byte position the first read of the file starts from. """
+        size = os.path.getsize(filename)
+        if self.start=="beginning":
+            return 0
+        if self.start=="end":
+            return size-size%4
+        position = max(0, size-self.blksize)
+        return position-position%4
+
+    def reset(self):
+        """ Forget any partial frame and read the file again as on the first `feed_file`. """
+        self.file_position = None
+        self._aligned = False
+        self._pending = b""
+        self.frame_count = 0
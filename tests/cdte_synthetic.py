@@ -0,0 +1,95 @@
+"""
+Synthetic raw CdTe data: event frames with data thinning (only some
+ASICs and strips read out) and ones with every strip read out, with HK
+frames and stray words between them.
+"""
+
+import numpy as np
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CDTE_FRAME_END
+
+CDTE_FRAME_WORDS = 8192
+
+def _bits(value, n_bits):
+    """ The `n_bits` lowest bits of `value`, least significant first. """
+    return [(value>>b)&1 for b in range(n_bits)]
+
+def synthetic_event(rng, ti):
+    """
+    One event: its 7 word header, the bits of the 4 ASICs then the end
+    word. About 15% of the ASICs are not read out.
+    """
+    bits = []
+    for _ in range(4):
+        read = rng.random()>0.15
+        bits += [1, int(read), int(rng.integers(2)), int(rng.integers(2)), int(rng.integers(2))]
+        if read:
+            n_hits = int(rng.choice([0, 1, 1, 2, 2, 3, 5, 64])) if rng.random()<0.9 else int(rng.integers(0, 65))
+            channels = np.sort(rng.choice(64, n_hits, replace=False))
+            flags = np.zeros(64, dtype=int)
+            flags[channels] = 1
+            bits += list(flags)+[int(rng.integers(2))]+_bits(int(rng.integers(1024)), 10)
+            for _ in channels:
+                bits += _bits(int(rng.integers(1024)), 10)
+            bits += _bits(int(rng.integers(1024)), 10)+[int(rng.integers(2))]
+        # each ASIC ends on a word and is followed by an empty one
+        bits += [0]*(-len(bits)%32)+[0]*32
+    header = [0x3c3c0000|int(rng.integers(0xffff)), ti]+[int(v) for v in rng.integers(2**32, size=5)]
+    header = b"".join(h.to_bytes(4, "big") for h in header)
+    return b"\x3c\x3c"+header[2:]+np.packbits(np.array(bits, dtype=np.uint8)).tobytes()+(0x77770000).to_bytes(4, "little")
+
+def synthetic_event_frame(rng, ti, unixtime):
+    """ An event frame starting from `ti`, and the `ti` after it. """
+    body = b""
+    while True:
+        event = synthetic_event(rng, ti)
+        if len(body)+len(event)>4*CDTE_FRAME_WORDS-40:
+            break
+        body += event
+        ti = (ti+int(rng.integers(1, 2**26)))%2**32
+        if rng.random()<0.05:
+            body += b"\x00"*4*int(rng.integers(1, 5))
+    body += b"\x00"*(4*CDTE_FRAME_WORDS-len(body))
+    return (0x02efcdab).to_bytes(4, "little")+body+unixtime.to_bytes(4, "little")+CDTE_FRAME_END.to_bytes(4, "little"), ti
+
+def synthetic_hk_frame(rng, n_words=50):
+    """ A HK frame of random words. """
+    return (0x03efcdab).to_bytes(4, "little")+rng.integers(0, 2**31, n_words).astype("<u4").tobytes()+CDTE_FRAME_END.to_bytes(4, "little")
+
+def synthetic_stream(seed=0, n_frames=6, hk=True, junk=True):
+    """
+    Raw CdTe data of `n_frames` event frames, one second apart.
+
+    Parameters
+    ----------
+    seed : `int`
+            Seed of the random numbers.
+            Default: 0
+
+    n_frames : `int`
+            The number of event frames.
+            Default: 6
+
+    hk, junk : `bool`, `bool`
+            Add HK frames, and words that are not in a frame at the
+            start.
+            Defaults: True, True
+
+    Returns
+    -------
+    `bytes` :
+        The raw data.
+    """
+    rng = np.random.default_rng(seed)
+    raw = b""
+    ti = int(rng.integers(2**32))
+    if junk:
+        raw += b"\x01\x02\x03\x04"*3
+    if hk:
+        raw += synthetic_hk_frame(rng)
+    for frame in range(n_frames):
+        event_frame, ti = synthetic_event_frame(rng, ti, 1690000000+frame)
+        raw += event_frame
+        if hk and frame==2:
+            raw += synthetic_hk_frame(rng, 30)
+    return raw
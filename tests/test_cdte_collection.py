@@ -0,0 +1,261 @@
+"""
+Tests of the CdTe collections.
+"""
+
+import numpy as np
+import pytest
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTerawalldata2parser, CdTeHitList, cdte_event_dtype
+from FoGSE.telemetry_tools.collections.CdTeCollection import CdTeCollection, CDTE_GRADES, CDTE_GOOD_STRIPS, CDTE_REMAP_LUT, good_strip_lut, grid_histogram
+from FoGSE.telemetry_tools.collections.CdTeThresholdCollection import CdTeThresholdCollection
+from FoGSE.telemetry_tools.collections.CdTePedestalCollection import CdTePedestalCollection
+from FoGSE.telemetry_tools.collections.CdTeAccumulatorCollection import CdTeAccumulatorCollection
+
+from cdte_synthetic import synthetic_stream
+
+
+def _padded_events(rng, n_events, adc_range=(-20, 60)):
+    """ Events with every strip read out and random common mode subtracted ADC values. """
+    events = np.zeros(n_events, dtype=cdte_event_dtype())
+    events['livetime'] = 1_000_000
+    for side in ("pt", "al"):
+        events['hitnum_'+side] = 128
+        events['index_'+side] = np.arange(128)
+        events['adc_cmn_'+side] = rng.integers(*adc_range, size=(n_events, 128))
+        events['cmn_'+side] = 300
+        events['adc_'+side] = events['adc_cmn_'+side]+300
+    return events
+
+
+def test_grid_histogram_empty_and_float():
+    counts = grid_histogram((np.zeros(0), np.zeros(0)), (3, 4))
+    assert counts.shape==(3, 4) and np.sum(counts)==0
+
+    # floats are binned as their integer part and values off the grid are dropped
+    counts = grid_histogram((np.array([0., 2.7, 5., -1.]), np.array([1., 3., 0., 0.])), (3, 4))
+    expected = np.zeros((3, 4), dtype=np.int64)
+    expected[0,1] = expected[2,3] = 1
+    assert np.array_equal(counts, expected)
+
+
+def test_good_strip_lut():
+    lut = good_strip_lut(tuple(CDTE_GOOD_STRIPS["pt"]), tuple(CDTE_GOOD_STRIPS["al"]), bad_pt_strips=(3,), bad_al_strips=(140,))
+    assert lut.shape==(2, 256) and not lut.flags.writeable
+    # the padding (128) and anything above is never counted
+    assert not lut[:,128:].any()
+    # nor the Pt strips 59-68, the Al strips outside 4-123 or the bad strips
+    assert lut[0].nonzero()[0].tolist()==[s for s in range(128) if (s<59 or s>68) and s!=3]
+    assert lut[1].nonzero()[0].tolist()==[s for s in range(4, 124) if s!=12]
+
+    # a collection's bad strips are given as numbered before the remap
+    cdte_data = CdTeCollection(CdTerawalldata2parser(b""), bad_strips={"pt":[3], "al":[140]})
+    assert not cdte_data.strip_lut[0][CDTE_REMAP_LUT[3]] and not cdte_data.strip_lut[1][CDTE_REMAP_LUT[140]-128]
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize("remap", [True, False])
+def test_empty_collection_arrays(sparse, remap):
+    cdte_data = CdTeCollection(CdTerawalldata2parser(b"", sparse=sparse))
+
+    spectrogram = cdte_data.spectrogram_array(remap=remap)
+    image = cdte_data.image_array(remap=remap)
+    assert spectrogram.shape==(256, 1024) and np.nansum(spectrogram)==0
+    assert image.shape==(128, 128) and np.nansum(image)==0
+
+
+def test_thresholds_match_simple1():
+    rng = np.random.default_rng(2)
+    events = _padded_events(rng, 301)
+    thresholds = CdTeThresholdCollection()
+    thresholds.add((None, events[:100], None))
+    thresholds.add((None, events[100:], None))
+
+    # the same as "simple1" over all the events, even with the middle values split between two ADC values
+    simple1 = CdTeCollection((None, events, None)).single_event(events['adc_cmn_pt'], events['adc_cmn_al'], style="simple1")
+    assert np.allclose(thresholds.thresholds(sides=True), simple1)
+
+    positive = events['adc_cmn_pt']>0
+    assert np.array_equal(thresholds.median(strips=[0, 5]), [np.median(events['adc_cmn_pt'][positive[:,s],s]) for s in (0, 5)])
+    assert np.isnan(CdTeThresholdCollection().median(sides=True)).all()
+
+
+def test_pedestals_in_blocks():
+    rng = np.random.default_rng(0)
+    events = _padded_events(rng, 200)
+    pedestals = CdTePedestalCollection(hit_adc=50)
+    for block in (events[:50], events[50:120], events[120:]):
+        pedestals.add((None, block, None))
+
+    adc = events['adc_cmn_pt'].astype(np.float64)
+    below = adc<50
+    table = pedestals.pedestals()
+    assert np.array_equal(table['hits'][:128], np.sum(~below, axis=0))
+    assert np.allclose(table['pedestal'][:128], [np.mean(adc[below[:,s],s]) for s in range(128)])
+    assert np.allclose(table['noise'][:128], [np.std(adc[below[:,s],s]) for s in range(128)])
+    assert np.array_equal(pedestals.full_readouts, [200]*4)
+    assert np.allclose(pedestals.common_modes()[0], 300)
+
+
+def test_pedestals_of_thinned_data():
+    rng = np.random.default_rng(1)
+    events = _padded_events(rng, 100, adc_range=(-10, 10))
+    # data thinning: the second Pt ASIC is not read out and the first Al ASIC has 3 strips
+    thinned = events[50:]
+    thinned['hitnum_pt'], thinned['cmn_pt'][:,1] = 64, 0
+    thinned['hitnum_al'] = 67
+    thinned['index_al'][:,:67] = np.concatenate(([0, 1, 2], np.arange(64, 128)))
+    pedestals = CdTePedestalCollection()
+    pedestals.add((None, events, None))
+
+    # only ASICs with all their strips read out give pedestal samples, only ASICs read out common modes
+    assert np.array_equal(pedestals.full_readouts, [100, 50, 50, 100])
+    assert np.array_equal(pedestals.samples[[0, 64, 128, 192]], [100, 50, 50, 100])
+    assert np.allclose(pedestals.common_modes()[0], 300)
+    assert not pedestals.bad_strip_mask().any()
+
+
+# the Pt-side strips and ADC values of hand-built events, each with one Al-side hit
+GRADE_EVENTS = [[(10, 100)],                  # single
+                [(20, 50), (21, 80)],         # adjacent double
+                [(30, 60), (40, 70)],         # double on strips apart
+                [(1, 10), (2, 90), (3, 20)],  # triple
+                [(60, 100)],                  # only a strip that is not counted
+                [(5, -5)]]                    # single with no charge
+# the column of the count of each event for each grade, -1 for none
+GRADE_SLOTS = {"1":[0, -1, -1, -1, -1, 0], 
+               "2":[-1, 1, -1, -1, -1, -1], 
+               "1and2":[0, 1, -1, -1, -1, 0], 
+               "max_adc":[0, 1, 1, 1, -1, -1]}
+GRADE_SLOTS["2sum"], GRADE_SLOTS["1and2sum"] = GRADE_SLOTS["2"], GRADE_SLOTS["1and2"]
+
+def _graded_events():
+    events = np.zeros(len(GRADE_EVENTS), dtype=cdte_event_dtype())
+    events['ti'] = np.arange(1, len(events)+1)
+    events['index_pt'] = events['index_al'] = 128
+    for e, hits in enumerate(GRADE_EVENTS):
+        events['hitnum_pt'][e] = len(hits)
+        for slot, (strip, adc) in enumerate(hits):
+            events['index_pt'][e, slot], events['adc_cmn_pt'][e, slot] = strip, adc
+    events['hitnum_al'], events['index_al'][:,0], events['adc_cmn_al'][:,0] = 1, 10, 100
+    return events
+
+
+@pytest.mark.parametrize("grade", CDTE_GRADES)
+def test_grade_slots(grade):
+    events = _graded_events()
+    cdte_data = CdTeCollection((None, events, None))
+    pt, pt_adc = events['index_pt'], events['adc_cmn_pt']
+    selection = cdte_data.strip_lut[0][pt]
+
+    slots = cdte_data.grade_slots(cdte_data.classify_events(selection, pt, pt_adc), grade)
+    assert slots.tolist()==GRADE_SLOTS[grade]
+
+    # the hits give the same counts, as hit numbers
+    hit_list = CdTeHitList.from_padded(events)
+    hits = hit_list.hits
+    hit_selection = cdte_data.strip_lut[hits['side'], hits['strip']] & (hits['side']==0)
+    hit_slots = cdte_data.grade_slots(cdte_data.classify_hits(hit_selection, hits['event_id'], hits['strip'], hits['adc_cmn']), grade)
+    counted = slots>=0
+    assert np.array_equal(hit_slots>=0, counted)
+    assert np.array_equal(hits['strip'][hit_slots[counted]], pt[counted, slots[counted]])
+
+
+def test_grade_classes_and_unknown_grade():
+    events = _graded_events()
+    cdte_data = CdTeCollection((None, events, None))
+    classes = cdte_data.classify_events(cdte_data.strip_lut[0][events['index_pt']], events['index_pt'], events['adc_cmn_pt'])
+    assert classes['multiplicity'].tolist()==[1, 2, 2, 3, 0, 1]
+    assert classes['adjacent'].tolist()==[False, True, False, False, False, False]
+    assert classes['shared'].tolist()==[-1, 0, -1, -1, -1, -1]
+    with pytest.raises(ValueError):
+        cdte_data.grade_slots(classes, "3")
+    with pytest.raises(ValueError):
+        cdte_data.get_event_grade(cdte_data.strip_lut[0][events['index_pt']], "3", events['index_pt'], events['adc_cmn_pt'])
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize("grade", ["2sum", "1and2sum"])
+def test_summed_grades(sparse, grade):
+    events = _graded_events()
+    cdte_data = CdTeCollection((None, CdTeHitList.from_padded(events) if sparse else events, None))
+    counts = cdte_data.filter_counts_grades(cdte_data.event_dataframe, grade_al="1", grade_pt=grade)
+
+    # the adjacent double is counted with both strips' ADC values at their weighted position
+    double = counts['times'].tolist().index(2)
+    assert counts['pt_strip_adc'][double]==130
+    assert np.isclose(counts['pt_strip_positions'][double], (20*50+21*80)/130)
+    assert len(counts['times'])==(1 if grade=="2sum" else 3)
+
+
+def test_deprecated_grade_handlers():
+    events = _graded_events()
+    cdte_data = CdTeCollection((None, events, None))
+    pt, pt_adc = events['index_pt'], events['adc_cmn_pt']
+    selection = cdte_data.strip_lut[0][pt]
+    doubles = np.flatnonzero(np.sum(selection, axis=1)==2)
+
+    with pytest.warns(DeprecationWarning):
+        max_adc = cdte_data.grade_max_adc_handler(selection.copy(), pt_adc)
+    assert np.array_equal(max_adc, cdte_data.get_event_grade(selection, "max_adc", pt, pt_adc))
+    with pytest.warns(DeprecationWarning):
+        graded = cdte_data.grade_2_handler(selection.copy(), doubles, pt, pt_adc)
+    # only the double rows change, the strips apart lose both
+    assert graded[1].tolist()[:2]==[False, True] and not graded[2].any()
+    assert np.array_equal(graded[[0, 3]], selection[[0, 3]])
+    with pytest.warns(DeprecationWarning):
+        graded = cdte_data.grade_2_handler_take_max_count_if_double(selection.copy(), doubles, pt_adc)
+    assert graded[1].tolist()[:2]==[False, True] and graded[2].tolist()[:2]==[False, True]
+
+
+def _seconds_of_events(rng, seconds):
+    """ `s+1` events in each second `s`, every strip hit. """
+    events = _padded_events(rng, sum(s+1 for s in seconds), adc_range=(0, 60))
+    events['unixtime'] = np.repeat(seconds, [s+1 for s in seconds])
+    return events
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_accumulator_ring_wraps(sparse):
+    rng = np.random.default_rng(6)
+    accumulator = CdTeAccumulatorCollection(n_bins=4)
+    for seconds in ([0, 1, 2, 3], [4, 5]):
+        events = _seconds_of_events(rng, seconds)
+        accumulator.add((None, CdTeHitList.from_padded(events) if sparse else events, None))
+    # seconds 0 and 1 have been written over
+    assert accumulator.latest_unixtime()==5
+    assert sorted(accumulator.bin_numbers.tolist())==[2, 3, 4, 5]
+    times, counts, livetime = accumulator.lightcurve()
+    assert times.tolist()==[2, 3, 4, 5] and counts.tolist()==[3, 4, 5, 6]
+    assert np.allclose(livetime, counts*0.01)
+    assert np.sum(accumulator.spectrogram())==np.sum(accumulator.strip_counts)==256*18
+
+    # data older than the ring is dropped, not binned over newer seconds
+    accumulator.add((None, _seconds_of_events(rng, [1]), None))
+    assert accumulator.dropped_events==2
+    assert accumulator.lightcurve()[1].tolist()==[3, 4, 5, 6]
+
+
+def test_accumulator_hit_list_matches_padded():
+    events = CdTerawalldata2parser(synthetic_stream(seed=3))[1]
+    padded, sparse = CdTeAccumulatorCollection(n_bins=10), CdTeAccumulatorCollection(n_bins=10)
+    padded.add((None, events, None))
+    sparse.add((None, CdTerawalldata2parser(synthetic_stream(seed=3), sparse=True)[1], None))
+    for name in ("spectrograms", "strip_counts", "event_counts", "livetimes", "bin_numbers"):
+        assert np.array_equal(getattr(sparse, name), getattr(padded, name)), name
+    assert np.sum(padded.event_counts)==len(events)
+    assert np.sum(padded.strip_counts)==np.sum(events['hitnum_pt'].astype(np.int64)+events['hitnum_al'])
+
+
+def test_accumulator_lightcurve_options():
+    accumulator = CdTeAccumulatorCollection(n_bins=8)
+    accumulator.add((None, _seconds_of_events(np.random.default_rng(7), [0, 1, 2, 3, 4, 5]), None))
+
+    times, counts, livetime = accumulator.lightcurve(cadence=2)
+    assert times.tolist()==[0, 2, 4] and counts.tolist()==[3, 7, 11]
+    assert np.allclose(livetime, counts*0.01)
+    times, counts, _ = accumulator.lightcurve(last_seconds=2)
+    assert times.tolist()==[4, 5] and counts.tolist()==[5, 6]
+    # each event hits both strips once
+    times, counts, _ = accumulator.lightcurve(cadence=3, strips=[0, 130], last_seconds=5)
+    assert times.tolist()==[0, 3] and counts.tolist()==[2*(2+3), 2*(4+5+6)]
+    assert np.array_equal(accumulator.spectrogram(last_seconds=1), accumulator.spectrograms[5])
@@ -0,0 +1,49 @@
+"""
+Tests of the cache of decoded CdTe event frames.
+"""
+
+import numpy as np
+import pytest
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTerawalldata2parser, CdTeHitList
+from FoGSE.telemetry_tools.parsers.CdTeframecache import CdTeFrameCache
+
+from cdte_synthetic import synthetic_stream
+
+def _assert_events_equal(events, reference):
+    assert events.dtype==reference.dtype
+    for name in reference.dtype.names:
+        assert np.array_equal(events[name], reference[name]), name
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_cache_parse_matches_parser(sparse, tmp_path):
+    raw = synthetic_stream(seed=5)
+    reference = CdTerawalldata2parser(raw, sparse=sparse)[1]
+    cache = CdTeFrameCache(spill_directory=tmp_path)
+    for _ in range(2):
+        events = cache.parse(raw, identity="log", sparse=sparse)[1]
+        assert isinstance(events, CdTeHitList)==sparse
+        _assert_events_equal(events.padded() if sparse else events, reference.padded() if sparse else reference)
+    assert cache.misses==6 and cache.hits==6
+    if sparse:
+        # only the hits are kept, not padded events
+        assert cache.nbytes==sum(e.nbytes for e in cache._frames.values())<CdTerawalldata2parser(raw)[1].nbytes
+
+    # frames come back from the spill files
+    cache.clear()
+    events = cache.parse(raw, identity="log", sparse=sparse)[1]
+    _assert_events_equal(events.padded() if sparse else events, reference.padded() if sparse else reference)
+    assert cache.misses==6
+
+
+def test_cache_byte_limit_and_read_only():
+    raw = synthetic_stream(seed=6, n_frames=8)
+    frame_bytes = CdTeFrameCache().parse(raw)[1].nbytes/8
+    cache = CdTeFrameCache(max_bytes=3*frame_bytes)
+    cache.parse(raw, identity="log")
+    assert 0<len(cache)<=4 and cache.nbytes<=3*frame_bytes
+
+    key = next(iter(cache._frames))
+    with pytest.raises(ValueError):
+        cache.get(key)['ti'][0] = 0
@@ -0,0 +1,99 @@
+"""
+Tests of the bulk CdTe HK log parsers against the per-record parsers.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CDTE_CANISTER_HK_SIZE, CDTE_CANISTER_DAQ_OFFSET, CDTE_CANISTER_DAQ_PARAMS, CDTE_CANISTER_STATUS, CDTE_CANISTER_STATUS_LABELS, CDTE_CANISTER_HV, CdTecanisterhkparser, CdTecanisterhklogparser
+from FoGSE.telemetry_tools.parsers.CdTeparser import CDTE_DE_HK_SIZE, CDTE_DE_STATUS, CDTE_DE_STATUS_LABELS, CdTedehkparser, CdTedehklogparser
+from FoGSE.telemetry_tools.collections.DECollection import DECollection
+
+HK_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "housekeeping.log")
+
+@pytest.fixture(scope="module")
+def hk_log():
+    with open(HK_FILE, "rb") as f:
+        return f.read()
+
+def _status_label(code, labels):
+    return (labels+("...",))[code]
+
+
+def _canister_records(hk_log):
+    """ The first record of the HK log with each known status and HV setting, then one with an unknown status. """
+    base = bytearray(hk_log[:CDTE_CANISTER_HK_SIZE])
+    hv_offset = CDTE_CANISTER_DAQ_OFFSET+CDTE_CANISTER_DAQ_PARAMS["hv_set"]
+    records = b""
+    for n, status_raw in enumerate(list(CDTE_CANISTER_STATUS)+[b"\x5a"*12]):
+        record = bytearray(base)
+        record[:12] = status_raw
+        record[hv_offset:hv_offset+4] = list(CDTE_CANISTER_HV)[n%len(CDTE_CANISTER_HV)].to_bytes(4, "big")
+        records += record
+    return records
+
+
+def test_canister_log_matches_records(hk_log):
+    # the log ends part way into a record
+    data = _canister_records(hk_log)+hk_log[:100]
+    canister_hk, error_flags = CdTecanisterhklogparser(data)
+    assert len(canister_hk)==len(CDTE_CANISTER_STATUS)+1
+
+    for n, (record, error_flag) in enumerate(zip(canister_hk, error_flags)):
+        parsed_data, record_error_flag = CdTecanisterhkparser(data[n*CDTE_CANISTER_HK_SIZE:(n+1)*CDTE_CANISTER_HK_SIZE])
+        assert error_flag==record_error_flag==(n==len(CDTE_CANISTER_STATUS))
+        assert _status_label(record['status'], CDTE_CANISTER_STATUS_LABELS)==parsed_data.pop("status")
+        assert f"{record['hv']} V"==parsed_data.pop("hv")
+        for name, value in parsed_data.items():
+            assert record[name]==value, name
+
+
+def test_canister_log_unknown_hv(hk_log):
+    # the HK log is not from a canister, so its status and HV setting are unknown
+    canister_hk, error_flags = CdTecanisterhklogparser(hk_log)
+    assert len(canister_hk)==len(hk_log)//CDTE_CANISTER_HK_SIZE==1
+    assert error_flags[0] and canister_hk['status'][0]==-1 and canister_hk['hv'][0]==-1
+    assert canister_hk['hv_set'][0]==int.from_bytes(hk_log[CDTE_CANISTER_DAQ_OFFSET+4:CDTE_CANISTER_DAQ_OFFSET+8], "big")
+    assert len(CdTecanisterhklogparser(b"")[0])==0
+
+
+def _de_records(hk_log):
+    """ The HK log with the known DE statuses over its first records. """
+    records = bytearray(hk_log)
+    for n, status_raw in enumerate(CDTE_DE_STATUS):
+        records[n*CDTE_DE_HK_SIZE:n*CDTE_DE_HK_SIZE+12] = status_raw
+    return bytes(records)
+
+
+def test_de_log_matches_records(hk_log):
+    data = _de_records(hk_log)
+    de_hk, error_flags = CdTedehklogparser(data)
+    # the last 24 bytes are not a whole record
+    assert len(de_hk)==len(data)//CDTE_DE_HK_SIZE==36
+
+    for n, (record, error_flag) in enumerate(zip(de_hk, error_flags)):
+        parsed_data, record_error_flag = CdTedehkparser(data[n*CDTE_DE_HK_SIZE:(n+1)*CDTE_DE_HK_SIZE])
+        assert error_flag==record_error_flag==(n>=len(CDTE_DE_STATUS))
+        assert _status_label(record['status'], CDTE_DE_STATUS_LABELS)==parsed_data.pop("status")
+        assert record['ping'].tolist()==parsed_data.pop("ping")
+        for name, value in parsed_data.items():
+            assert record[name]==value, name
+
+
+def test_de_time_series(hk_log):
+    data = _de_records(hk_log)
+    de_hk = DECollection(CdTedehklogparser(data))
+    assert de_hk.is_series()
+    assert de_hk.get_status().tolist()==[_status_label(c, CDTE_DE_STATUS_LABELS) for c in de_hk.get_status_code()]
+
+    # the series of a log is the values of each record in turn
+    records = [DECollection(CdTedehkparser(data[n:n+CDTE_DE_HK_SIZE])) for n in range(0, len(de_hk.get_temp())*CDTE_DE_HK_SIZE, CDTE_DE_HK_SIZE)]
+    assert not records[0].is_series()
+    for name in ("status", "ping", "temp", "cpu", "df_GB"):
+        unixtime, values = de_hk.time_series(name)
+        record_series = [r.time_series(name) for r in records]
+        assert np.array_equal(unixtime, np.concatenate([t for t, _ in record_series]))
+        assert np.array_equal(values, np.array([v if name=="ping" else v[0] for _, v in record_series])), name
+    assert [r.get_status() for r in records]==de_hk.get_status().tolist()
@@ -0,0 +1,68 @@
+"""
+Tests of the random-access CdTe log reader against a full parse.
+"""
+
+import numpy as np
+import pytest
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CDTE_EVENT_FRAME, CDTE_FRAME_INDEX_DTYPE, CdTerawalldata2parser, cdte_words, cdte_frame_index
+from FoGSE.telemetry_tools.parsers.CdTelogreader import CdTeLogReader
+
+from cdte_synthetic import synthetic_stream
+
+def _assert_events_equal(events, reference, names=None):
+    for name in (reference.dtype.names if names is None else names):
+        assert np.array_equal(events[name], reference[name]), name
+
+@pytest.fixture(scope="module")
+def log(tmp_path_factory):
+    raw = synthetic_stream(seed=9, n_frames=8)
+    filename = tmp_path_factory.mktemp("log")/"cdte.log"
+    filename.write_bytes(raw)
+    return filename, raw, CdTerawalldata2parser(raw)[1]
+
+
+# whole file at once, frames across chunk boundaries, and frames longer than a chunk
+@pytest.mark.parametrize("chunk_words", [2**24, 20_000, 5_000])
+def test_index(log, chunk_words):
+    filename, raw, events = log
+    with CdTeLogReader(filename, chunk_words=chunk_words) as reader:
+        index = reader.index
+        assert len(reader)==len(index)
+    reference = cdte_frame_index(cdte_words(raw))
+    _assert_events_equal(index, reference, names=CDTE_FRAME_INDEX_DTYPE.names)
+
+    # each event frame of the synthetic log has its own unixtime
+    event_frames = index[(index['kind']==CDTE_EVENT_FRAME) & index['valid']]
+    assert len(event_frames)==8
+    for frame in event_frames:
+        in_frame = events[events['unixtime']==frame['unixtime']]
+        assert frame['n_events']==len(in_frame)
+        assert (frame['first_ti'], frame['last_ti'])==(in_frame['ti'][0], in_frame['ti'][-1])
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize("chunk_words", [2**24, 5_000])
+def test_frames_between(log, sparse, chunk_words):
+    filename, _, events = log
+    with CdTeLogReader(filename, sparse=sparse, chunk_words=chunk_words) as reader:
+        selected = reader.frames_between(1690000002, 1690000004)
+        everything = reader.frames_between(0, 2**32-1)
+        assert len(reader.frames_between(0, 1000))==0
+    if sparse:
+        selected, everything = selected.padded(), everything.padded()
+    in_range = (events['unixtime']>=1690000002) & (events['unixtime']<=1690000004)
+    _assert_events_equal(selected, events[in_range])
+    _assert_events_equal(everything, events)
+
+
+@pytest.mark.parametrize("chunk_words", [2**24, 20_000])
+def test_iter_event_headers(log, chunk_words):
+    filename, raw, events = log
+    with CdTeLogReader(filename, chunk_words=chunk_words) as reader:
+        chunks = list(reader.iter_event_headers())
+    assert (len(chunks)>1)==(chunk_words<len(raw)//4)
+    headers = np.concatenate([h for _, h, _ in chunks])
+    _assert_events_equal(headers, events, names=("ti", "unixtime", "livetime", "flag_pseudo", "ext1ti_upper", "ext1ti_lower"))
+    for frames, chunk_headers, rows in chunks:
+        assert np.array_equal(frames['unixtime'][rows], chunk_headers['unixtime'])
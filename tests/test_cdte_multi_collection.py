@@ -0,0 +1,56 @@
+"""
+Tests of the parallel CdTe detector pool.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTerawalldata2parser
+from FoGSE.telemetry_tools.parsers.CdTestreamparser import CdTeStreamDecoder
+from FoGSE.telemetry_tools.collections.CdTeCollection import CdTeCollection
+from FoGSE.telemetry_tools.collections.CdTeMultiCollection import CdTeDetectorPool
+
+from cdte_synthetic import synthetic_stream
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "test_berk_20230728_det05_00007_001")
+
+@pytest.fixture(scope="module")
+def pool():
+    with CdTeDetectorPool(block_bytes=400_000, bad_strips={"cdte2":{"pt":[47, 59], "al":[]}}) as pool:
+        yield pool
+
+def _assert_matches(cdte_data, detector, collection):
+    assert cdte_data.total_counts([detector])==collection.total_counts()
+    assert np.array_equal(cdte_data.spectrogram_array(detector), collection.spectrogram_array(remap=True, cmn_sub=True))
+    assert np.array_equal(cdte_data.image_array(detector), collection.image_array(remap=True, area_correction=True), equal_nan=True)
+
+
+def test_pool_file_written_part_way_through_a_word(pool, tmp_path):
+    # a log mid-write, its size not a whole number of words
+    with open(DATA_FILE, "rb") as f:
+        raw = f.read()
+    filename = tmp_path/"cdte.log"
+    filename.write_bytes(raw[:-2])
+
+    cdte_data = pool.refresh({"cdte1":filename})
+    parsed_data = CdTeStreamDecoder(filename, compact=True, blksize=400_000).feed_file()
+    assert len(parsed_data[1])>0
+    _assert_matches(cdte_data, "cdte1", CdTeCollection(parsed_data))
+
+
+def test_pool_several_detectors(pool, tmp_path):
+    sources = {"cdte1":synthetic_stream(seed=0), "cdte2":synthetic_stream(seed=1), "cdte4":b""}
+    filename = tmp_path/"cdte3.log"
+    filename.write_bytes(synthetic_stream(seed=2))
+    sources["cdte3"] = filename
+
+    cdte_data = pool.refresh(sources)
+    assert sorted(cdte_data.detectors)==["cdte1", "cdte2", "cdte3", "cdte4"]
+    for detector in ("cdte1", "cdte2", "cdte4"):
+        collection = CdTeCollection(CdTerawalldata2parser(sources[detector], compact=True), bad_strips=pool.bad_strips.get(detector))
+        _assert_matches(cdte_data, detector, collection)
+    # the synthetic log is smaller than `block_bytes`, so read whole
+    _assert_matches(cdte_data, "cdte3", CdTeCollection(CdTerawalldata2parser(synthetic_stream(seed=2), compact=True)))
+    assert cdte_data.total_counts()==sum(cdte_data.total_counts([d]) for d in cdte_data.detectors)
@@ -0,0 +1,99 @@
+"""
+Tests of the CdTe parsers against the list-based parser they replaced.
+"""
+
+import os
+import struct
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTerawalldata2parser, CdTeparallelparser, CdTeHitList
+
+import cdte_reference_parser
+from cdte_synthetic import synthetic_stream
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "test_berk_20230728_det05_00007_001")
+
+def _reference(raw):
+    """ The list-based parser's output for the raw data. """
+    return cdte_reference_parser.CdTerawalldata2parser([w[0] for w in struct.iter_unpack("<I", raw[:len(raw)//4*4])])
+
+@pytest.fixture(scope="module", params=["data_file", "synthetic_0", "synthetic_1"])
+def raw_and_reference(request):
+    if request.param=="data_file":
+        with open(DATA_FILE, "rb") as f:
+            raw = f.read()
+    else:
+        raw = synthetic_stream(seed=int(request.param.split("_")[1]))
+    return raw, _reference(raw)
+
+def _assert_events_equal(events, reference, names=None):
+    for name in (reference.dtype.names if names is None else names):
+        assert np.array_equal(events[name], reference[name]), name
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_padded_matches_reference(raw_and_reference, compact):
+    raw, (flags, events, hkdicts) = raw_and_reference
+    new_flags, new_events, new_hkdicts = CdTerawalldata2parser(raw, compact=compact)
+    assert list(new_flags)==list(flags)
+    assert len(new_events)==len(events)
+    _assert_events_equal(new_events, events)
+    # the HK comes as a structured array, with a field for each key of the dictionaries
+    assert len(new_hkdicts)==len(hkdicts)
+    for new_hk, hk in zip(new_hkdicts, hkdicts):
+        assert all(new_hk[key]==value for key, value in hk.items())
+
+
+def test_sparse_matches_reference(raw_and_reference):
+    raw, (_, events, _) = raw_and_reference
+    hit_list = CdTerawalldata2parser(raw, sparse=True)[1]
+    assert isinstance(hit_list, CdTeHitList)
+    _assert_events_equal(hit_list.padded(), events)
+    # the hits are the read out strips of the padded events
+    assert len(hit_list.hits)==np.sum(events['hitnum_pt'].astype(np.int64)+events['hitnum_al'])
+    _assert_events_equal(CdTeHitList.from_padded(events).padded(), events)
+
+
+def test_header_only_matches_reference(raw_and_reference):
+    raw, (_, events, _) = raw_and_reference
+    headers = CdTerawalldata2parser(raw, header_only=True)[1]
+    _assert_events_equal(headers, events, names=("ti", "unixtime", "livetime", "flag_pseudo"))
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize("from_file", [False, True])
+def test_parallel_parser_matches(tmp_path, sparse, from_file):
+    # 10 event frames in batches of 3 over 2 workers
+    raw = synthetic_stream(seed=8, n_frames=10)
+    data = raw
+    if from_file:
+        data = tmp_path/"cdte.log"
+        data.write_bytes(raw)
+    flags, events, hkdicts = CdTerawalldata2parser(raw, compact=True, sparse=sparse)
+    new_flags, new_events, new_hkdicts = CdTeparallelparser(data, max_workers=2, frames_per_batch=3, compact=True, sparse=sparse)
+    assert list(new_flags)==list(flags)
+    assert np.array_equal(new_hkdicts, hkdicts)
+    if sparse:
+        assert np.array_equal(new_events.hits, events.hits) and np.array_equal(new_events.offsets, events.offsets)
+        new_events, events = new_events.events, events.events
+    assert len(events)>0
+    _assert_events_equal(new_events, events)
+
+
+def test_frames_far_apart():
+    # 64 MB of words that are not in a frame between two runs of frames
+    raw = synthetic_stream(seed=7, hk=False, junk=False)
+    frame_bytes = len(raw)//6
+    gapped = raw[:3*frame_bytes]+bytes(64_000_000)+raw[3*frame_bytes:]
+
+    tracemalloc.start()
+    events = CdTerawalldata2parser(gapped)[1]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    _assert_events_equal(events, CdTerawalldata2parser(raw)[1])
+    # the gap is never expanded to bits (~2 GB)
+    assert peak<400_000_000
+
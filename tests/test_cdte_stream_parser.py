@@ -0,0 +1,52 @@
+"""
+Tests of the incremental CdTe stream decoder against a whole parse.
+"""
+
+import numpy as np
+import pytest
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTerawalldata2parser
+from FoGSE.telemetry_tools.parsers.CdTestreamparser import CdTeStreamDecoder
+
+from cdte_synthetic import synthetic_stream
+
+def _assert_events_equal(events, reference):
+    for name in reference.dtype.names:
+        assert np.array_equal(events[name], reference[name]), name
+
+
+@pytest.mark.parametrize("seed", [2, 3])
+def test_stream_decoder_split_feeds(seed):
+    raw = synthetic_stream(seed=seed)
+    whole = CdTerawalldata2parser(raw)[1]
+
+    # fed in pieces that split frames, events and words
+    rng = np.random.default_rng(seed)
+    cuts = np.sort(rng.integers(0, len(raw), 12))
+    decoder = CdTeStreamDecoder()
+    parts = [decoder.feed(raw[start:stop])[1] for start, stop in zip(np.concatenate(([0], cuts)), np.concatenate((cuts, [len(raw)])))]
+    _assert_events_equal(np.concatenate(parts), whole)
+    assert decoder.frame_count==8
+
+
+def test_stream_decoder_file_start(tmp_path):
+    filename = tmp_path/"cdte.log"
+    raw = synthetic_stream(seed=4, hk=False, junk=False)
+    frame_bytes = len(raw)//6
+    filename.write_bytes(raw[:2*frame_bytes+100])
+
+    beginning = CdTeStreamDecoder(filename, start="beginning")
+    end = CdTeStreamDecoder(filename, start="end")
+    # the tail starts part way into the first frame, so only the second is read
+    tail = CdTeStreamDecoder(filename, start="tail", blksize=frame_bytes+1000)
+    assert beginning.feed_file()[1]['unixtime'].tolist().count(1690000001)>0
+    assert len(end.feed_file()[1])==0
+    assert set(tail.feed_file()[1]['unixtime'].tolist())=={1690000001}
+
+    with open(filename, "ab") as f:
+        f.write(raw[2*frame_bytes+100:])
+    whole = CdTerawalldata2parser(raw)[1]
+    for decoder in (beginning, tail):
+        _assert_events_equal(decoder.feed_file()[1], whole[whole['unixtime']>=1690000002])
+    # the end was part way into the third frame, so reading starts from the fourth
+    _assert_events_equal(end.feed_file()[1], whole[whole['unixtime']>=1690000003])
@@ -0,0 +1,114 @@
+"""
+Tests of the unwrapped CdTe event timeline.
+"""
+
+import numpy as np
+import pytest
+
+from FoGSE.telemetry_tools.parsers.CdTeparser import CdTerawalldata2parser, cdte_header_dtype, cdte_event_ext1ti64
+from FoGSE.telemetry_tools.collections.CdTeRateCollection import CdTeRateCollection, cdte_timeline, cdte_frame_rates, EXT1TI_CLOCK_INT
+from FoGSE.telemetry_tools.collections.CdTeCollection import CdTeCollection
+
+from cdte_synthetic import synthetic_stream
+
+CLOCK = 160e-9
+
+
+def _events(seconds, unixtime, ti_start=123_456, ext1ti_start=None):
+    """ Header rows for events at `seconds`, read out in frames with `unixtime`. """
+    seconds = np.asarray(seconds, dtype=np.float64)
+    events = np.zeros(len(seconds), dtype=cdte_header_dtype())
+    counts = np.round(seconds/CLOCK).astype(np.int64)
+    events['ti'] = (ti_start+counts)%2**32
+    events['unixtime'] = unixtime
+    if ext1ti_start is not None:
+        ext1ti = np.uint64(ext1ti_start)+np.round(seconds/EXT1TI_CLOCK_INT).astype(np.uint64)
+        events['ext1ti_upper'], events['ext1ti_lower'] = ext1ti>>np.uint64(32), ext1ti&np.uint64(0xFFFFFFFF)
+    return events
+
+
+def test_long_frames():
+    # two 30 s frames of a low rate, each read out at the end of its 30 s
+    seconds = np.concatenate((np.linspace(970.05, 999.95, 300), np.linspace(1000.05, 1029.95, 300)))
+    unixtime = np.repeat([1000, 1030], 300)
+    ti64, times = cdte_timeline(_events(seconds, unixtime)['ti'], unixtime, ti_clock_interval=CLOCK)
+    assert np.isclose(times[-1]-times[0], seconds[-1]-seconds[0], atol=1e-6)
+    assert np.all(np.diff(ti64.astype(np.int64))>0)
+
+    rates = CdTeRateCollection((None, _events(seconds, unixtime), None))
+    assert np.isclose(rates.delta_time(handle_jumps=True), seconds[-1]-seconds[0], rtol=1e-3)
+
+
+def test_rollovers_between_frames():
+    # a gap of several `ti` rollovers (~687 s each) between frames
+    seconds = np.concatenate((np.linspace(0, 5, 50), np.linspace(3000, 3005, 50)))
+    unixtime = np.repeat([6, 3006], 50)
+    ti64, times = cdte_timeline(_events(seconds, unixtime, ti_start=2**32-1000)['ti'], unixtime, ti_clock_interval=CLOCK)
+    assert np.allclose(times-times[0], seconds-seconds[0], atol=1e-6)
+    assert ti64[0]==2**32-1000
+
+
+def test_reset_between_frames():
+    # `ti` starts again from 0 with the second frame
+    seconds = np.concatenate((np.linspace(0, 5, 50), np.linspace(6, 11, 50)))
+    unixtime = np.repeat([6, 12], 50)
+    ti = np.concatenate((_events(seconds[:50], 6)['ti'], _events(seconds[50:]-6, 12, ti_start=0)['ti']))
+    _, times = cdte_timeline(ti, unixtime, ti_clock_interval=CLOCK)
+    assert np.all(np.diff(times)>=0)
+    # the reset is bridged by the unixtime step
+    assert np.isclose(times[50]-times[49], 6, atol=1e-6)
+    assert np.allclose(times[50:]-times[50], seconds[50:]-seconds[50], atol=1e-6)
+
+
+def test_ext1ti_anchor():
+    seconds = np.concatenate((np.linspace(0, 5, 50), np.linspace(6, 11, 50)))
+    unixtime = np.repeat([6, 12], 50)
+    ext1ti_start = 5*2**32+7
+    events = _events(seconds, unixtime, ext1ti_start=ext1ti_start)
+    # `ti` resetting is replaced by the `ext1ti` step, to the clock count
+    events['ti'][50:] = _events(seconds[50:]-6, 12, ti_start=0)['ti']
+    ti64, times = cdte_timeline(events['ti'], unixtime, ti_clock_interval=CLOCK, ext1ti=cdte_event_ext1ti64(events))
+    assert np.allclose(times-times[0], seconds-seconds[0], atol=1e-6)
+    # the counts are on the `ext1ti` timebase
+    assert ti64[0]==round(ext1ti_start*EXT1TI_CLOCK_INT/CLOCK)
+
+
+def test_ext1ti_lower_word_wraps():
+    # a 100 s gap where the `ext1ti` lower word wraps (every ~43 s) without its upper word
+    seconds = np.concatenate((np.linspace(0, 5, 50), np.linspace(105, 110, 50)))
+    unixtime = np.repeat([6, 111], 50)
+    events = _events(seconds, unixtime, ext1ti_start=1000)
+    events['ext1ti_upper'] = 0
+    _, times = cdte_timeline(events['ti'], unixtime, ti_clock_interval=CLOCK, ext1ti=cdte_event_ext1ti64(events))
+    assert np.allclose(times-times[0], seconds-seconds[0], atol=1e-6)
+
+
+def test_anchor():
+    seconds = np.linspace(0, 1000, 200)
+    unixtime = np.floor(seconds)+2
+    ti64, times = cdte_timeline(_events(seconds, unixtime, ti_start=0)['ti'], unixtime, anchor=(3*2**32, -2*2**32*CLOCK), ti_clock_interval=CLOCK)
+    assert ti64[0]==5*2**32
+    assert np.allclose(times, seconds, atol=1e-6)
+
+
+# whole file at once, and in chunks that split frames
+@pytest.mark.parametrize("chunk_words", [2**24, 5_000])
+def test_frame_rates_sum_to_collection(tmp_path, chunk_words):
+    raw = synthetic_stream(seed=10)
+    filename = tmp_path/"cdte.log"
+    filename.write_bytes(raw)
+    rates = cdte_frame_rates(filename, chunk_words=chunk_words, ti_clock_interval=CLOCK)
+    cdte_data = CdTeCollection(CdTerawalldata2parser(raw))
+    events = cdte_data.event_dataframe
+
+    assert rates['unixtime'].tolist()==list(range(1690000000, 1690000006))
+    assert np.sum(rates['n_events'])==cdte_data.total_counts()
+    assert np.sum(rates['n_pseudo'])==cdte_data.total_pseudo_counts()
+    assert np.isclose(np.sum(rates['livetime'], dtype=np.float64), cdte_data.get_frame_seconds_livetime(), rtol=1e-6)
+
+    for frame in rates:
+        frame_rates = CdTeRateCollection((None, events[events['unixtime']==frame['unixtime']], None))
+        assert frame['n_events']==frame_rates.total_counts()
+        assert np.isclose(frame['livetime'], frame_rates.get_frame_seconds_livetime(), rtol=1e-6)
+        ti = frame_rates.event_dataframe['ti']
+        assert np.isclose(frame['ti_span'], ((int(ti[-1])-int(ti[0]))%2**32)*CLOCK, rtol=1e-6)